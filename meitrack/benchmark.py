@@ -0,0 +1,593 @@
+#!/usr/bin/env python
+"""
+Library for measuring the cost of parsing and building gprs messages.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from meitrack import metrics
+from meitrack.command import schema
+from meitrack.command.command_AAA import TrackerCommand
+from meitrack.common import CLIENT_TO_SERVER_PREFIX, DIRECTION_CLIENT_TO_SERVER, DIRECTION_SERVER_TO_CLIENT
+from meitrack.file_download import FileDownloadAggregator
+from meitrack.firmware_update import stc_send_ota_data
+from meitrack.gprs_protocol import GPRS, SAMPLE_FRAMES, StreamFramer, parse_data_payload, parse_many
+from meitrack.parallel import ParallelParser
+
+logger = logging.getLogger(__name__)
+
+LARGE_FRAME_COMMANDS = [b"D00", b"FC1"]
+HELD_FRAME_COUNT = 1000000
+# Budget in microseconds for the time spent importing the modules of the package
+IMPORT_TIME_BUDGET = 15000
+BASELINE_FILE = os.path.join(os.path.expanduser("~"), ".meitrack", "benchmark_baselines.json")
+# Allowed fractional drop in throughput or growth in allocations before a result is a regression
+REGRESSION_THRESHOLD = 0.1
+# One payload for each AAA field layout, falling back to these when the sample frames have none
+AAA_VARIANT_EVENTS = [b"35", b"37", b"39", b"50", b"109"]
+AAA_VARIANT_PAYLOADS = {
+    b"39": b"AAA,39,-33.815786,151.200165,180427170921,A,9,12,0,15,0.8,71,5146,263808,505|2|7D07|041C15F3,0100,"
+           b"0000|0000|0000|018D|0505,180427100921_C1E1_N2U1D1.jpg,108,0000,3,0,0|0000|0000|0000|0000|0000",
+}
+FILE_PACKET_SIZE = 1024
+FRAMER_CHUNK_SIZE = 1460
+OTA_FILE_SIZE = 65536
+OTA_CHUNK_SIZE = 512
+
+
+def sample_frames(command_types=None):
+    """
+    Function to select frames from the sample corpus by command type
+    :param command_types: List of command types to select or None for all frames
+    :return: List of frames as byte strings
+
+    >>> len(sample_frames([b"D00"]))
+    2
+    """
+    frames = []
+    for frame in SAMPLE_FRAMES:
+        gprs_list, _, _ = parse_data_payload(frame, frame_direction(frame), zero_copy=True)
+        for gprs in gprs_list:
+            if command_types is None or bytes(gprs.command_type) in command_types:
+                frames.append(bytes(gprs.payload))
+    return frames
+
+
+def frame_direction(frame):
+    """
+    Function to determine the direction of a frame from its prefix
+    :param frame: The frame as a byte string
+    :return: The enum definition of message directions
+
+    >>> frame_direction(b'$$D160,...')
+    1
+    """
+    if frame[0:2] == CLIENT_TO_SERVER_PREFIX:
+        return DIRECTION_CLIENT_TO_SERVER
+    return DIRECTION_SERVER_TO_CLIENT
+
+
+def measure_frame_memory(frames, zero_copy=False, copies=100):
+    """
+    Function to measure the memory held per parsed frame using tracemalloc.
+
+    The frames are joined into one buffer per direction before tracing starts,
+    so only the memory held by the parsed objects is counted.
+    :param frames: List of frames as byte strings
+    :param zero_copy: Parse to GPRSFrame objects rather than GPRS objects
+    :param copies: The number of times to repeat the frames in the buffer
+    :return: The number of bytes held per frame
+
+    >>> measure_frame_memory(sample_frames([b"D00"]), zero_copy=True, copies=2) < 1024
+    True
+    """
+    buffers = {}
+    for frame in frames:
+        buffers.setdefault(frame_direction(frame), []).append(frame)
+    buffers = {direction: b"".join(items) * copies for direction, items in buffers.items()}
+
+    tracemalloc.start()
+    try:
+        start_size, _ = tracemalloc.get_traced_memory()
+        held = []
+        for direction, buffer in buffers.items():
+            gprs_list, _, _ = parse_data_payload(buffer, direction, zero_copy=zero_copy)
+            held.extend(gprs_list)
+        end_size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    if not held:
+        return 0
+    return (end_size - start_size) / len(held)
+
+
+def measure_framer_memory(frames, zero_copy=False, copies=100, chunk_size=FRAMER_CHUNK_SIZE):
+    """
+    Function to measure the memory held per frame read through a StreamFramer using tracemalloc.
+
+    The frames are fed to the framer in socket sized chunks and every frame is
+    held, so copy mode counts the frame copies and zero copy mode counts the
+    read buffers the frames view.
+    :param frames: List of frames as byte strings
+    :param zero_copy: Read GPRSFrame objects over the read buffer rather than GPRS objects
+    :param copies: The number of times to repeat the frames in the stream
+    :param chunk_size: The number of bytes fed to the framer at a time
+    :return: The number of bytes held per frame
+
+    >>> frames = sample_frames([b"D00"])
+    >>> measure_framer_memory(frames, zero_copy=True, copies=5) < measure_framer_memory(frames, copies=5)
+    True
+    """
+    streams = {}
+    for frame in frames:
+        streams.setdefault(frame_direction(frame), []).append(frame)
+    streams = {direction: b"".join(items) * copies for direction, items in streams.items()}
+
+    tracemalloc.start()
+    try:
+        start_size, _ = tracemalloc.get_traced_memory()
+        held = []
+        for direction, stream in streams.items():
+            framer = StreamFramer(direction, zero_copy=zero_copy)
+            for position in range(0, len(stream), chunk_size):
+                held.extend(framer.feed(stream[position:position + chunk_size]))
+        end_size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    if not held:
+        return 0
+    return (end_size - start_size) / len(held)
+
+
+def benchmark_frame_memory(frames=None):
+    """
+    Function to compare the memory held per frame with and without zero copy parsing and framing
+    :param frames: List of frames as byte strings. Defaults to the large D00 and FC1 samples.
+    :return: Dictionary of bytes per frame for each mode
+    """
+    if frames is None:
+        frames = sample_frames(LARGE_FRAME_COMMANDS)
+    return {
+        "copy": measure_frame_memory(frames, zero_copy=False),
+        "zero_copy": measure_frame_memory(frames, zero_copy=True),
+        "framer": measure_framer_memory(frames, zero_copy=False),
+        "framer_zero_copy": measure_framer_memory(frames, zero_copy=True),
+    }
+
+
+def measure_held_frames(count=HELD_FRAME_COUNT, compact=False, frame=None):
+    """
+    Function to measure the memory held by a number of parsed AAA frames.
+
+    The enclosed data of every frame is accessed so the command is parsed and
+    held along with the frame.
+    :param count: The number of frames to hold
+    :param compact: Parse to CompactGPRS objects rather than GPRS objects
+    :param frame: The frame to repeat as a byte string. Defaults to the first AAA sample.
+    :return: The total number of bytes held
+
+    >>> measure_held_frames(100, compact=True) < measure_held_frames(100)
+    True
+    """
+    if frame is None:
+        frame = sample_frames([b"AAA"])[0]
+    buffer = frame * count
+
+    tracemalloc.start()
+    try:
+        start_size, _ = tracemalloc.get_traced_memory()
+        held = []
+        for gprs in parse_many(buffer, frame_direction(frame), compact=compact):
+            gprs.enclosed_data
+            held.append(gprs)
+        end_size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return end_size - start_size
+
+
+def benchmark_parallel_scaling(max_workers=None, copies=200, frames=None):
+    """
+    Function to measure how parse throughput scales with the number of worker processes
+    :param max_workers: The largest number of workers to try. Defaults to the number of cpus.
+    :param copies: The number of times to repeat the sample corpus
+    :param frames: List of frames as byte strings. Defaults to the sample corpus.
+    :return: Dictionary of worker count to frames parsed per second
+
+    >>> list(benchmark_parallel_scaling(max_workers=1, copies=1))
+    [1]
+    """
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    if frames is None:
+        frames = sample_frames()
+    frames = frames * copies
+
+    results = {}
+    for workers in range(1, max_workers + 1):
+        with ParallelParser(workers=workers) as parser:
+            if workers > 1:
+                # Start the pool outside of the timed section
+                parser.get_pool()
+            start = time.perf_counter()
+            parser.parse(frames)
+            elapsed = time.perf_counter() - start
+        results[workers] = len(frames) / elapsed
+    return results
+
+
+def benchmark_schema_timings(copies=1000, frames=None):
+    """
+    Function to measure the parse time of each field schema while parsing the sample frames
+    :param copies: The number of copies of the frames to parse
+    :param frames: List of frames to parse. Defaults to the sample frames.
+    :return: Dictionary of schema label to the count, total and mean parse time in seconds
+    """
+    if frames is None:
+        frames = sample_frames()
+    buffer = b"".join(frames) * copies
+    schema.reset_timings()
+    schema.enable_timings()
+    try:
+        for gprs in parse_many(buffer):
+            gprs.enclosed_data
+    finally:
+        schema.enable_timings(False)
+    return schema.timing_report()
+
+
+def benchmark_metrics_overhead(copies=300, frames=None, repeats=5):
+    """
+    Function to compare the parse time of the sample frames with metrics disabled and enabled
+    :param copies: The number of copies of the frames to parse
+    :param frames: List of frames to parse. Defaults to the sample frames.
+    :param repeats: The number of timed runs of each mode. The fastest run is kept.
+    :return: Dictionary of the best parse time in seconds for each mode
+    """
+    if frames is None:
+        frames = sample_frames()
+    buffer = b"".join(frames) * copies
+    enabled = metrics.registry.enabled
+    results = {}
+    try:
+        for mode in ("disabled", "enabled"):
+            metrics.enable_metrics(mode == "enabled")
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                for gprs in parse_many(buffer):
+                    gprs.enclosed_data
+                timings.append(time.perf_counter() - start)
+            results[mode] = min(timings)
+    finally:
+        metrics.enable_metrics(enabled)
+    return results
+
+
+def measure_import_time(module="meitrack.gprs_protocol", package="meitrack"):
+    """
+    Function to measure the time spent importing a module with python -X importtime.
+
+    The import runs in a fresh interpreter so nothing is already imported.
+    :param module: The module to import
+    :param package: Only modules of this package are counted in the package time
+    :return: Tuple of the total import time and the time spent in modules of the package in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import %s" % (module,)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+    )
+    total = 0
+    package_time = 0
+    for line in result.stderr.decode().splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        try:
+            self_time = int(self_time)
+        except ValueError:
+            # The header line
+            continue
+        total += self_time
+        name = name.strip()
+        if name == package or name.startswith(package + "."):
+            package_time += self_time
+    return total, package_time
+
+
+def check_import_budget(budget=IMPORT_TIME_BUDGET, module="meitrack.gprs_protocol"):
+    """
+    Function to check the time spent importing the package modules against a budget
+    :param budget: The budget in microseconds
+    :param module: The module to import
+    :return: Tuple of the package import time in microseconds and whether it is within the budget
+    """
+    _, package_time = measure_import_time(module)
+    return package_time, package_time <= budget
+
+
+def aaa_variant_payloads():
+    """
+    Function to select an AAA payload from the sample frames for each AAA field layout
+    :return: Dictionary of event code to AAA payload
+    >>> sorted(aaa_variant_payloads()) == sorted(AAA_VARIANT_EVENTS)
+    True
+    """
+    payloads = dict(AAA_VARIANT_PAYLOADS)
+    for frame in sample_frames([b"AAA"]):
+        payload = GPRS(frame).leftover
+        event_code = payload.split(b",", 2)[1]
+        if event_code in AAA_VARIANT_EVENTS:
+            payloads.setdefault(event_code, payload)
+    return payloads
+
+
+def framing_case(copies):
+    """
+    Function to prepare parse_data_payload over concatenated streams of the sample frames
+    :param copies: The number of copies of the frames in each stream
+    :return: Tuple of the function to time and the number of frames it parses
+    """
+    streams = {}
+    for frame in sample_frames():
+        streams.setdefault(frame_direction(frame), []).append(frame)
+    streams = {direction: b"".join(frames) * copies for direction, frames in streams.items()}
+    count = len(sample_frames()) * copies
+
+    def run():
+        for direction, stream in streams.items():
+            parse_data_payload(stream, direction)
+    return run, count
+
+
+def aaa_case(event_code):
+    """
+    Function to build the case preparing TrackerCommand parsing for an AAA event layout
+    :param event_code: The event code of the layout
+    :return: Function taking the number of copies and returning the function to time and the number of parses
+    """
+    def prepare(copies):
+        payload = aaa_variant_payloads()[event_code]
+        count = 100 * copies
+
+        def run():
+            for _ in range(count):
+                TrackerCommand(DIRECTION_CLIENT_TO_SERVER, payload)
+        return run, count
+    return prepare
+
+
+def encode_case(copies):
+    """
+    Function to prepare GPRS.as_bytes over the parsed sample frames
+    :param copies: The number of times to encode each frame
+    :return: Tuple of the function to time and the number of messages encoded
+    """
+    gprs_list = [GPRS(frame) for frame in sample_frames()]
+    for gprs in gprs_list:
+        gprs.as_bytes()
+
+    def run():
+        for _ in range(copies):
+            for gprs in gprs_list:
+                gprs.as_bytes()
+    return run, len(gprs_list) * copies
+
+
+def file_reassembly_case(copies):
+    """
+    Function to prepare FileDownloadAggregator.add_file_bytes reassembling files from packets
+    :param copies: The number of files to reassemble, each of ten packets from two devices
+    :return: Tuple of the function to time and the number of packets added
+    """
+    packets = 10
+    chunk = b"a" * FILE_PACKET_SIZE
+
+    def run():
+        aggregator = FileDownloadAggregator()
+        for file_number in range(copies):
+            file_name = b"%06d_C1E1_N1U1D1.jpg" % (file_number,)
+            for packet_number in range(packets):
+                for imei in (b"0407", b"0408"):
+                    aggregator.add_file_bytes(imei, file_name, packets, packet_number, chunk)
+    return run, copies * packets * 2
+
+
+def ota_chunking_case(copies):
+    """
+    Function to prepare stc_send_ota_data chunking a firmware file and encoding the chunks
+    :param copies: The number of times to chunk the file
+    :return: Tuple of the function to time and the number of chunks encoded
+    """
+    file_bytes = bytes(range(256)) * (OTA_FILE_SIZE // 256)
+
+    def run():
+        for _ in range(copies):
+            for gprs in stc_send_ota_data(b"0407", file_bytes, OTA_CHUNK_SIZE):
+                gprs.as_bytes()
+    return run, copies * -(-OTA_FILE_SIZE // OTA_CHUNK_SIZE)
+
+
+SUITE = {
+    "framing": framing_case,
+    "encode": encode_case,
+    "file_reassembly": file_reassembly_case,
+    "ota_chunking": ota_chunking_case,
+}
+for variant_event in AAA_VARIANT_EVENTS:
+    SUITE["aaa_" + variant_event.decode()] = aaa_case(variant_event)
+
+
+def run_case(case, copies=10, repeats=5):
+    """
+    Function to measure the throughput and allocations of a benchmark case.
+
+    The case is run once to warm caches before the timed runs. Allocations
+    are measured in a separate run under tracemalloc so tracing does not slow
+    the timed runs.
+    :param case: Function taking the number of copies and returning the function to time and its operation count
+    :param copies: The size of the workload passed to the case
+    :param repeats: The number of timed runs. The fastest run is kept.
+    :return: Dictionary of the copies, operations per second and peak traced bytes of a run
+    """
+    run, count = case(copies)
+    run()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        start_size, _ = tracemalloc.get_traced_memory()
+        run()
+        _, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "copies": copies,
+        "ops_per_second": count / min(timings),
+        "peak_bytes": peak_size - start_size,
+    }
+
+
+def run_suite(names=None, copies=10, repeats=5):
+    """
+    Function to run the benchmark suite
+    :param names: List of benchmark names to run or None for every benchmark in SUITE
+    :param copies: The size of the workload passed to each case
+    :param repeats: The number of timed runs of each case
+    :return: Dictionary of benchmark name to its results
+    >>> sorted(run_suite(["ota_chunking"], copies=1, repeats=1)["ota_chunking"])
+    ['copies', 'ops_per_second', 'peak_bytes']
+    """
+    if names is None:
+        names = list(SUITE)
+    results = {}
+    for name in names:
+        if name not in SUITE:
+            raise KeyError("Unknown benchmark %s" % (name,))
+        logger.info("Running benchmark %s", name)
+        results[name] = run_case(SUITE[name], copies, repeats)
+    return results
+
+
+def machine_key():
+    """
+    Function to build the key identifying the machine and interpreter a baseline was recorded on
+    :return: The host name, architecture and python version as a string
+    """
+    return "%s-%s-py%s" % (platform.node(), platform.machine(), platform.python_version())
+
+
+def load_baseline(path=BASELINE_FILE, machine=None):
+    """
+    Function to load the stored baseline results for a machine
+    :param path: The JSON file holding the baselines of each machine
+    :param machine: The machine key. Defaults to the current machine.
+    :return: Dictionary of benchmark name to its results, empty if no baseline is stored
+    """
+    if machine is None:
+        machine = machine_key()
+    try:
+        with open(path) as baseline_file:
+            baselines = json.load(baseline_file)
+    except FileNotFoundError:
+        return {}
+    return baselines.get(machine, {})
+
+
+def save_baseline(results, path=BASELINE_FILE, machine=None):
+    """
+    Function to store results as the baseline for a machine. Other benchmarks and machines are kept.
+    :param results: Dictionary of benchmark name to its results
+    :param path: The JSON file holding the baselines of each machine
+    :param machine: The machine key. Defaults to the current machine.
+    :return: None
+    """
+    if machine is None:
+        machine = machine_key()
+    try:
+        with open(path) as baseline_file:
+            baselines = json.load(baseline_file)
+    except FileNotFoundError:
+        baselines = {}
+    baselines.setdefault(machine, {}).update(results)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as baseline_file:
+        json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Function to compare results with a baseline
+    :param results: Dictionary of benchmark name to its results
+    :param baseline: Dictionary of benchmark name to its baseline results. Results recorded with a
+        different number of copies are not compared.
+    :param threshold: The allowed fractional drop in throughput or growth in allocations
+    :return: List of (name, metric, baseline value, current value) tuples for each regression
+    >>> find_regressions(
+    ...     {"encode": {"copies": 10, "ops_per_second": 850.0, "peak_bytes": 4096}},
+    ...     {"encode": {"copies": 10, "ops_per_second": 1000.0, "peak_bytes": 4096}}
+    ... )
+    [('encode', 'ops_per_second', 1000.0, 850.0)]
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or previous.get("copies") != result["copies"]:
+            continue
+        if result["ops_per_second"] < previous["ops_per_second"] * (1 - threshold):
+            regressions.append((name, "ops_per_second", previous["ops_per_second"], result["ops_per_second"]))
+        # Allow a little slack so small allocations do not flap
+        if result["peak_bytes"] > previous["peak_bytes"] * (1 + threshold) + 1024:
+            regressions.append((name, "peak_bytes", previous["peak_bytes"], result["peak_bytes"]))
+    return regressions
+
+
+def main():
+    """
+    Main section for running the benchmarks.
+    """
+    logging.getLogger('').setLevel(logging.CRITICAL)
+    results = benchmark_frame_memory()
+    for mode, bytes_per_frame in results.items():
+        print("{:<16} {:>10.0f} bytes per frame".format(mode, bytes_per_frame))
+
+    for compact in (False, True):
+        held_bytes = measure_held_frames(compact=compact)
+        print("{:<10} {:>10.0f} MB held for {} frames".format(
+            "compact" if compact else "full", held_bytes / 1024 / 1024, HELD_FRAME_COUNT
+        ))
+
+    for workers, frames_per_second in benchmark_parallel_scaling().items():
+        print("{:<2} workers {:>10.0f} frames per second".format(workers, frames_per_second))
+
+    package_time, within_budget = check_import_budget()
+    print("Package import time {} us, budget {} us: {}".format(
+        package_time, IMPORT_TIME_BUDGET, "ok" if within_budget else "over budget"
+    ))
+
+    overhead = benchmark_metrics_overhead()
+    print("Metrics overhead {:.1%}".format(overhead["enabled"] / overhead["disabled"] - 1))
+
+    for label, timing in sorted(benchmark_schema_timings().items()):
+        print("{:>8} parses {:>8.2f} us each: {}".format(timing["count"], timing["mean"] * 1000000, label))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""
+Library for building an index of the cell towers seen in AAA reports.
+
+Each cell is keyed by one integer packed from its mcc, mnc, lac and ci. The
+record for a cell holds the number of observations, a running centroid of the
+GPS fixes reported while connected to it and statistics of the reported
+signal strength. Reports without a GPS fix can then be given an approximate
+position from the cell they were sent through.
+"""
+import functools
+import logging
+import math
+
+from meitrack.error import GPRSParseError
+
+logger = logging.getLogger(__name__)
+
+POS_STATUS_VALID = b"A"
+# Bit widths of the lac and ci in a packed cell key
+LAC_BITS = 16
+CI_BITS = 28
+
+
+def pack_cell_key(mcc, mnc, lac, ci):
+    """
+    Function to pack the identity of a cell into one integer
+    :param mcc: The mobile country code
+    :param mnc: The mobile network code
+    :param lac: The location area code
+    :param ci: The cell id
+    :return: Integer key for the cell
+    >>> unpack_cell_key(pack_cell_key(466, 97, 0x527B, 0x01035DB4))
+    (466, 97, 21115, 16997812)
+    """
+    return (((mcc * 1000 + mnc) << LAC_BITS | lac) << CI_BITS) | ci
+
+
+def unpack_cell_key(key):
+    """
+    Function to unpack a cell key into the identity of the cell
+    :param key: Integer key for the cell
+    :return: Tuple of mcc, mnc, lac and ci
+    """
+    ci = key & ((1 << CI_BITS) - 1)
+    lac = key >> CI_BITS & ((1 << LAC_BITS) - 1)
+    mcc, mnc = divmod(key >> (CI_BITS + LAC_BITS), 1000)
+    return mcc, mnc, lac, ci
+
+
+def area_key(key):
+    """
+    Function to get the key of the location area of a cell
+    :param key: Integer key for the cell
+    :return: The cell key with the ci cleared
+    """
+    return key >> CI_BITS << CI_BITS
+
+
+@functools.lru_cache(maxsize=4096)
+def cell_key(base_station_info):
+    """
+    Function to convert a base station info field to a cell key, cached on the raw field
+    :param base_station_info: The mcc|mnc|lac|ci field with hexadecimal lac and ci
+    :return: Integer key for the cell, or None if no cell was reported
+    >>> cell_key(b'466|97|527B|01035DB4') == pack_cell_key(466, 97, 0x527B, 0x01035DB4)
+    True
+    >>> cell_key(b'0|0|0000|00000000') is None
+    True
+    >>> cell_key(b'466|97|527B')
+    Traceback (most recent call last):
+        ...
+    meitrack.error.GPRSParseError: Invalid base station info b'466|97|527B'
+    """
+    fields = base_station_info.split(b"|")
+    try:
+        if len(fields) != 4:
+            raise ValueError("Expected four fields")
+        mcc, mnc, lac, ci = int(fields[0]), int(fields[1]), int(fields[2], 16), int(fields[3], 16)
+    except ValueError:
+        raise GPRSParseError("Invalid base station info %s" % (base_station_info,))
+    if mnc >= 1000 or lac >> LAC_BITS or ci >> CI_BITS:
+        raise GPRSParseError("Invalid base station info %s" % (base_station_info,))
+    if mcc == 0:
+        return None
+    return pack_cell_key(mcc, mnc, lac, ci)
+
+
+class CellTowerRecord:
+    """
+    Observations of one cell or location area.
+    """
+    __slots__ = (
+        "observations", "fixes", "latitude", "longitude",
+        "signals", "signal_mean", "signal_m2", "signal_min", "signal_max",
+    )
+
+    def __init__(self):
+        """
+        Constructor for the cell tower record
+        >>> record = CellTowerRecord()
+        >>> record.add(-33.0, 151.0, 20); record.add(-33.2, 151.2, 24)
+        >>> record.observations, record.centroid(), record.signal_mean, record.signal_min, record.signal_max
+        (2, (-33.1, 151.1), 22.0, 20, 24)
+        """
+        self.observations = 0
+        self.fixes = 0
+        self.latitude = 0.0
+        self.longitude = 0.0
+        self.signals = 0
+        self.signal_mean = 0.0
+        self.signal_m2 = 0.0
+        self.signal_min = None
+        self.signal_max = None
+
+    def add(self, latitude=None, longitude=None, signal=None):
+        """
+        Function to add an observation of the cell
+        :param latitude: Latitude of the GPS fix, or None without a fix
+        :param longitude: Longitude of the GPS fix, or None without a fix
+        :param signal: The gsm signal strength, or None if not reported
+        :return: None
+        """
+        self.observations += 1
+        if latitude is not None and longitude is not None:
+            self.fixes += 1
+            self.latitude += (latitude - self.latitude) / self.fixes
+            self.longitude += (longitude - self.longitude) / self.fixes
+        if signal is not None:
+            self.signals += 1
+            delta = signal - self.signal_mean
+            self.signal_mean += delta / self.signals
+            self.signal_m2 += delta * (signal - self.signal_mean)
+            if self.signal_min is None or signal < self.signal_min:
+                self.signal_min = signal
+            if self.signal_max is None or signal > self.signal_max:
+                self.signal_max = signal
+
+    def centroid(self):
+        """
+        Function to get the mean position of the GPS fixes seen on the cell
+        :return: Tuple of latitude and longitude, or None if no fixes have been seen
+        """
+        if not self.fixes:
+            return None
+        return round(self.latitude, 6), round(self.longitude, 6)
+
+    def signal_stddev(self):
+        """
+        Function to get the standard deviation of the reported signal strength
+        :return: The standard deviation, or None if no signal has been reported
+        """
+        if not self.signals:
+            return None
+        return math.sqrt(self.signal_m2 / self.signals)
+
+    def __str__(self):
+        """
+        String representation of the cell tower record
+        :return: String representation of the cell tower record
+        """
+        return "%s observations, %s fixes, centroid %s, signal mean %.1f" % (
+            self.observations, self.fixes, self.centroid(), self.signal_mean
+        )
+
+
+def float_field(value):
+    """
+    Helper function to convert an optional numeric field
+    :param value: The field as bytes or None
+    :return: The field as a float, or None if empty or invalid
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class CellTowerIndex:
+    """
+    Class to index the cells and location areas seen in AAA reports.
+    """
+    def __init__(self):
+        """
+        Constructor for the cell tower index
+        """
+        self.cells = {}
+        self.areas = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def ingest(self, command):
+        """
+        Function to add the cell observation of a report to the index
+        :param command: TrackerCommand or CompactCommand for an AAA report
+        :return: The cell key, or None if the report has no valid base station info
+        >>> from meitrack.command.command_AAA import TrackerCommand
+        >>> index = CellTowerIndex()
+        >>> unpack_cell_key(index.ingest(TrackerCommand(
+        ...     1, b'AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176,1.3,83,7,1174,466|97|527B|01035DB4,0000'
+        ... )))
+        (466, 97, 21115, 16997812)
+        >>> index.estimate_position(TrackerCommand(1, b'AAA,35,0,0,180323023615,V,0,12,0,176,1.3,83,7,1174,'
+        ...     b'466|97|527B|01035DB4,0000'))
+        (24.819116, 121.026091)
+        """
+        base_station_info = command["base_station_info"]
+        if not base_station_info:
+            return None
+        try:
+            key = cell_key(base_station_info)
+        except GPRSParseError as err:
+            logger.error("Skipping cell observation: %s", err)
+            return None
+        if key is None:
+            return None
+
+        latitude = longitude = None
+        if command["pos_status"] == POS_STATUS_VALID:
+            latitude = float_field(command["latitude"])
+            longitude = float_field(command["longitude"])
+        signal = float_field(command["gsm_signal_strength"])
+
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = CellTowerRecord()
+        cell.add(latitude, longitude, signal)
+        area = self.areas.get(area_key(key))
+        if area is None:
+            area = self.areas[area_key(key)] = CellTowerRecord()
+        area.add(latitude, longitude, signal)
+        return key
+
+    def ingest_frames(self, frames):
+        """
+        Function to add the cell observations of the AAA reports in a list of frames
+        :param frames: Iterable of GPRS, GPRSFrame or CompactGPRS objects
+        :return: The number of observations added
+        """
+        added = 0
+        for frame in frames:
+            if bytes(frame.command_type) != b"AAA":
+                continue
+            try:
+                command = frame.enclosed_data
+            except GPRSParseError as err:
+                logger.error("Skipping frame: %s", err)
+                continue
+            if command is not None and self.ingest(command) is not None:
+                added += 1
+        return added
+
+    def lookup(self, mcc, mnc, lac, ci):
+        """
+        Function to find the record of a cell
+        :param mcc: The mobile country code
+        :param mnc: The mobile network code
+        :param lac: The location area code
+        :param ci: The cell id
+        :return: CellTowerRecord, or None if the cell has not been seen
+        """
+        return self.cells.get(pack_cell_key(mcc, mnc, lac, ci))
+
+    def estimate_position(self, command):
+        """
+        Function to estimate the position of a report from the cell it was sent through.
+
+        Uses the centroid of the cell, falling back to the centroid of its
+        location area when no fixes have been seen on the cell.
+        :param command: TrackerCommand or CompactCommand for an AAA report
+        :return: Tuple of latitude and longitude, or None if no fixes have been seen nearby
+        """
+        base_station_info = command["base_station_info"]
+        if not base_station_info:
+            return None
+        try:
+            key = cell_key(base_station_info)
+        except GPRSParseError:
+            return None
+        if key is None:
+            return None
+        for record in (self.cells.get(key), self.areas.get(area_key(key))):
+            if record is not None and record.fixes:
+                return record.centroid()
+        return None
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    main_logger = logging.getLogger('')
+    main_logger.setLevel(logging.DEBUG)
+    char_handler = logging.StreamHandler()
+    char_handler.setLevel(logging.DEBUG)
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    char_handler.setFormatter(formatter)
+    main_logger.addHandler(char_handler)
+
+    from meitrack.gprs_protocol import SAMPLE_FRAMES, parse_many
+
+    index = CellTowerIndex()
+    print("Added {} observations".format(index.ingest_frames(parse_many(b"".join(SAMPLE_FRAMES)))))
+    for key, record in index.cells.items():
+        print(unpack_cell_key(key), record)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+"""
+Library for calculating and verifying the checksum of gprs messages.
+
+The checksum is the sum of every byte up to and including the '*' before the
+trailer, modulo 256. It is written in the trailer as two hexadecimal digits.
+"""
+import logging
+
+from meitrack.error import GPRSParameterError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+CHECKSUM_REJECT = "reject"
+CHECKSUM_FLAG = "flag"
+CHECKSUM_COUNT = "count"
+CHECKSUM_MODES = [CHECKSUM_REJECT, CHECKSUM_FLAG, CHECKSUM_COUNT]
+
+# Length of the "*XX\r\n" trailer at the end of every frame
+TRAILER_LENGTH = 5
+
+HEX_VALUES = {ord(char): int(char, 16) for char in "0123456789abcdefABCDEF"}
+CHECKSUM_HEX = [("%02X" % value).encode() for value in range(256)]
+
+
+def calc_checksum(payload):
+    """
+    Function to calculate the checksum of a message
+    :param payload: The message as a bytes like object
+    :return: The checksum of the bytes up to and including the last '*'
+    >>> calc_checksum(b'1234ABCD*AA')
+    254
+    >>> calc_checksum(b'@@a14,0407,FC3*')
+    79
+    """
+    lastchar = payload.rfind(b'*')
+    return sum(memoryview(payload)[:lastchar+1]) & 0xFF
+
+
+def trailer_checksum(buffer, start=0, end=None):
+    """
+    Function to read the checksum from the trailer of a frame
+    :param buffer: The bytes like object holding the frame
+    :param start: Offset of the frame in the buffer
+    :param end: Offset one past the end of the frame
+    :return: The checksum as an integer or None if the trailer is malformed
+    >>> trailer_checksum(b'@@Q25,353358017784062,A10*6A\\r\\n')
+    106
+    >>> trailer_checksum(b'$$V28,353358017784062,D65,OK*OD\\r\\n') is None
+    True
+    """
+    if end is None:
+        end = len(buffer)
+    if end - start < TRAILER_LENGTH or buffer[end-TRAILER_LENGTH] != ord('*'):
+        return None
+    high = HEX_VALUES.get(buffer[end-4])
+    low = HEX_VALUES.get(buffer[end-3])
+    if high is None or low is None:
+        return None
+    return high << 4 | low
+
+
+def verify_frame(buffer, start=0, end=None):
+    """
+    Function to verify a frame against the checksum in its trailer
+    :param buffer: The bytes like object holding the frame
+    :param start: Offset of the frame in the buffer
+    :param end: Offset one past the end of the frame
+    :return: True if the checksum matches
+    >>> verify_frame(b'@@Q25,353358017784062,A10*6A\\r\\n')
+    True
+    >>> verify_frame(b'@@Q25,353358017784062,A10*6B\\r\\n')
+    False
+    """
+    if end is None:
+        end = len(buffer)
+    expected = trailer_checksum(buffer, start, end)
+    if expected is None:
+        return False
+    return sum(memoryview(buffer)[start:end-TRAILER_LENGTH+1]) & 0xFF == expected
+
+
+def verify_spans(buffer, spans):
+    """
+    Function to verify many frames held in one buffer in a single call.
+
+    Uses numpy to sum all of the frames at once when it is available.
+    :param buffer: The bytes, bytearray or mmap holding the frames
+    :param spans: List of (start, end) offsets of the frames in the buffer, in order
+    :return: List of booleans, True where the checksum matches
+    >>> verify_spans(b'@@Q25,353358017784062,A10*6A\\r\\n@@Q25,353358017784062,A10*6B\\r\\n', [(0, 30), (30, 60)])
+    [True, False]
+
+    Spans too short to hold a trailer are invalid on both the numpy and the pure python path.
+    >>> buffer = b'@@Q25,353358017784062,A10*6A\\r\\n@@Q'
+    >>> spans = [(0, 30), (30, 33), (33, 33)]
+    >>> verify_spans(buffer, spans), [verify_frame(buffer, start, end) for start, end in spans]
+    ([True, False, False], [True, False, False])
+    """
+    if numpy is None or not spans:
+        return [verify_frame(buffer, start, end) for start, end in spans]
+
+    data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+    starts = numpy.array([start for start, _ in spans], dtype=numpy.int64)
+    ends = numpy.array([end for _, end in spans], dtype=numpy.int64)
+    valid = (ends - starts) >= TRAILER_LENGTH
+    if not valid.any():
+        return [False] * len(spans)
+    stars = numpy.where(valid, ends - TRAILER_LENGTH, 0)
+
+    # Alternate boundaries so reduceat sums the signed part then the trailer of each frame.
+    # Spans too short for a trailer are already invalid, so their boundaries are clamped into the data.
+    last = ends.max() - 1
+    boundaries = numpy.empty(len(spans) * 2, dtype=numpy.int64)
+    boundaries[0::2] = numpy.minimum(starts, last)
+    boundaries[1::2] = numpy.minimum(stars + 1, last)
+    sums = numpy.add.reduceat(data[:last + 1], boundaries, dtype=numpy.int64)[0::2] & 0xFF
+
+    lookup = numpy.full(256, 255, dtype=numpy.uint8)
+    for char, value in HEX_VALUES.items():
+        lookup[char] = value
+    high = lookup[data[numpy.where(valid, ends - 4, 0)]]
+    low = lookup[data[numpy.where(valid, ends - 3, 0)]]
+    valid &= (data[stars] == ord('*')) & (high != 255) & (low != 255)
+    expected = high.astype(numpy.int64) << 4 | low
+    return (valid & (sums == expected)).tolist()
+
+
+def verify_frames(frames):
+    """
+    Function to verify a list of frames in a single call
+    :param frames: List of frames as byte strings
+    :return: List of booleans, True where the checksum matches
+    >>> verify_frames([b'@@Q25,353358017784062,A10*6A\\r\\n', b'$$V28,353358017784062,D65,OK*OD\\r\\n'])
+    [True, False]
+    """
+    spans = []
+    offset = 0
+    for frame in frames:
+        spans.append((offset, offset + len(frame)))
+        offset += len(frame)
+    return verify_spans(b"".join(frames), spans)
+
+
+class ChecksumVerifier:
+    """
+    Class to apply a checksum policy to inbound frames and count mismatches.
+
+    In reject mode frames with a bad checksum are dropped. In flag mode they
+    are kept and marked with checksum_valid set to False. In count mode they
+    are kept and only counted.
+    """
+    def __init__(self, mode=CHECKSUM_FLAG):
+        """
+        Constructor for the checksum verifier
+        :param mode: One of CHECKSUM_REJECT, CHECKSUM_FLAG or CHECKSUM_COUNT
+        >>> ChecksumVerifier("drop")
+        Traceback (most recent call last):
+            ...
+        meitrack.error.GPRSParameterError: Checksum mode must be one of ['reject', 'flag', 'count']. Was drop
+        """
+        if mode not in CHECKSUM_MODES:
+            raise GPRSParameterError("Checksum mode must be one of %s. Was %s" % (CHECKSUM_MODES, mode))
+        self.mode = mode
+        self.checked = 0
+        self.mismatches = 0
+
+    def check(self, buffer, start=0, end=None):
+        """
+        Function to verify a frame and record the result
+        :param buffer: The bytes like object holding the frame
+        :param start: Offset of the frame in the buffer
+        :param end: Offset one past the end of the frame
+        :return: True if the checksum matches
+        """
+        self.checked += 1
+        if verify_frame(buffer, start, end):
+            return True
+        self.mismatches += 1
+        logger.error("Checksum mismatch in frame %s", bytes(buffer[start:end]))
+        return False
+
+    def accept(self, valid):
+        """
+        Function to decide whether a frame should be kept
+        :param valid: The result of the checksum check
+        :return: False if the frame should be dropped
+        """
+        return valid or self.mode != CHECKSUM_REJECT
+
+    def __str__(self):
+        """
+        String representation of the checksum verifier
+        :return: String representation of the checksum verifier
+        """
+        return "mode: {}, checked: {}, mismatches: {}".format(self.mode, self.checked, self.mismatches)
@@ -5,7 +5,6 @@ Module for working with the meitrack commands
 import logging
 import time
 
-from meitrack.command.command_D00 import FileDownloadCommand
 from meitrack.command.common import Command
 from meitrack.common import DIRECTION_CLIENT_TO_SERVER, s2b
 from meitrack.error import GPRSParameterError
@@ -60,6 +59,8 @@ def cts_file_download(file_name, num_packets, packet_number, file_bytes):
     num_packets = s2b(num_packets)
     packet_number = s2b(packet_number)
     file_bytes = s2b(file_bytes)
+    # Imported here so the command package does not import every command module
+    from meitrack.command.command_D00 import FileDownloadCommand
     file_download = FileDownloadCommand(DIRECTION_CLIENT_TO_SERVER)
     file_download.build(file_name, num_packets, packet_number, file_bytes)
     return file_download
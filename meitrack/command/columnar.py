@@ -0,0 +1,188 @@
+"""
+Module for decoding batches of AAA location reports into columns.
+
+Each report is written straight into typed columns rather than into a
+TrackerCommand object with a dictionary of fields. The columns are returned as
+array.array objects, or as a numpy structured array when numpy is available.
+"""
+import array
+import logging
+
+from meitrack.command.command_AAA import TrackerCommand
+from meitrack.command.date_codec import MISSING_TIMESTAMP, meitrack_date_to_epoch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+MISSING_INT = -1
+MISSING_FLOAT = float("nan")
+
+
+def hex_to_int(value):
+    """
+    Function to convert a hexadecimal field to an integer
+    :param value: Byte representation of the hexadecimal value
+    :return: Integer value
+    >>> hex_to_int(b'0400')
+    1024
+    """
+    return int(value, 16)
+
+
+# Column name, converter, value when missing, array.array typecode and numpy dtype
+AAA_COLUMNS = [
+    ("event_code", int, MISSING_INT, "q", "i8"),
+    ("latitude", float, MISSING_FLOAT, "d", "f8"),
+    ("longitude", float, MISSING_FLOAT, "d", "f8"),
+    ("date_time", meitrack_date_to_epoch, MISSING_TIMESTAMP, "q", "datetime64[s]"),
+    ("speed", int, MISSING_INT, "q", "i8"),
+    ("direction", int, MISSING_INT, "q", "i8"),
+    ("altitude", int, MISSING_INT, "q", "i8"),
+    ("mileage", int, MISSING_INT, "q", "i8"),
+    ("run_time", int, MISSING_INT, "q", "i8"),
+    ("io_port_status", hex_to_int, MISSING_INT, "q", "i8"),
+]
+
+field_index_cache = {}
+
+
+def column_indices(event_code):
+    """
+    Function to look up the position of each column in the payload of an event
+    :param event_code: The event code from the payload as bytes
+    :return: Tuple of field positions in the same order as AAA_COLUMNS
+    >>> column_indices(b'35') == column_indices(b'37')
+    True
+    """
+    indices = field_index_cache.get(event_code)
+    if indices is None:
+        field_names = TrackerCommand.field_names_for_event(event_code)
+        indices = tuple(field_names.index(column[0]) for column in AAA_COLUMNS)
+        field_index_cache[event_code] = indices
+    return indices
+
+
+def decode_aaa(payloads, imeis=None, use_numpy=None):
+    """
+    Function to decode a batch of AAA command payloads into columns.
+
+    Payloads that are not AAA reports are skipped. Fields that are empty or can
+    not be converted are stored as the missing value for their column.
+    :param payloads: Iterable of AAA command payloads as bytes or memoryview
+    :param imeis: Optional iterable of the imei for each payload, stored as an integer column
+    :param use_numpy: Return a numpy structured array. Defaults to True when numpy is available.
+    :return: Dictionary of column name to array.array, or a numpy structured array
+    >>> columns = decode_aaa([
+    ...     b'AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176,1.3,83,7,1174,466|97|527B|01035DB4,0400,'
+    ...     b'0001|0000|0000|019A|0981,00000001,,3,,,36,23',
+    ...     b'AAA,109,-33.815813,151.200110,180616124101,A,8,15,,351,0.9,68,25412,269659,505|3|00FA|04E381F5,0000,'
+    ...     b'0000|0000|0000|0189|0562,,,108,0000,,6,0,,0|0000|0000|0000|0000|0000,,,20|180616124105',
+    ... ], use_numpy=False)
+    >>> columns["event_code"].tolist(), columns["speed"].tolist(), columns["io_port_status"].tolist()
+    ([35, 109], [0, -1], [1024, 0])
+    >>> columns["latitude"].tolist(), columns["date_time"].tolist()
+    ([24.819116, -33.815813], [1521772575, 1529152861])
+
+    Values too large for their column are stored as missing without affecting the rest of the batch.
+    >>> columns = decode_aaa([
+    ...     b'AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176,1.3,83,99999999999999999999,1174,466|97|527B|'
+    ...     b'01035DB4,0400,0001|0000|0000|019A|0981,00000001,,3,,,36,23',
+    ...     b'AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176,1.3,83,7,1174,466|97|527B|01035DB4,0400,'
+    ...     b'0001|0000|0000|019A|0981,00000001,,3,,,36,23',
+    ... ], imeis=[b'99999999999999999999', b'353358017784062'], use_numpy=False)
+    >>> columns["mileage"].tolist(), columns["run_time"].tolist(), columns["imei"].tolist()
+    ([-1, 7], [1174, 1174], [-1, 353358017784062])
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    columns = [array.array(column[3]) for column in AAA_COLUMNS]
+    converters = [(column[1], column[2]) for column in AAA_COLUMNS]
+    imei_column = array.array("q") if imeis is not None else None
+    imei_iter = iter(imeis) if imeis is not None else None
+
+    for payload in payloads:
+        imei = next(imei_iter) if imei_iter is not None else None
+        fields = bytes(payload).split(b',')
+        if len(fields) < 2 or fields[0] != b"AAA":
+            logger.log(13, "Skipping non AAA payload %s", fields[0])
+            continue
+        field_count = len(fields)
+        for column, (converter, missing), index in zip(columns, converters, column_indices(fields[1])):
+            if index < field_count and fields[index]:
+                try:
+                    column.append(converter(fields[index]))
+                    continue
+                except (ValueError, OverflowError):
+                    logger.error("Unable to convert field %s in payload %s", fields[index], payload)
+            column.append(missing)
+        if imei_column is not None:
+            try:
+                imei_column.append(int(imei))
+            except (TypeError, ValueError, OverflowError):
+                imei_column.append(MISSING_INT)
+
+    result = {}
+    if imei_column is not None:
+        result["imei"] = imei_column
+    for column, values in zip(AAA_COLUMNS, columns):
+        result[column[0]] = values
+    if not use_numpy:
+        return result
+    return columns_to_structured_array(result)
+
+
+def columns_to_structured_array(columns):
+    """
+    Function to convert array.array columns to a numpy structured array
+    :param columns: Dictionary of column name to array.array as returned by decode_aaa
+    :return: numpy structured array with one record per report
+    """
+    dtypes = {column[0]: column[4] for column in AAA_COLUMNS}
+    dtypes["imei"] = "i8"
+    dtype = [(name, dtypes[name]) for name in columns]
+    length = len(next(iter(columns.values())))
+    records = numpy.empty(length, dtype=dtype)
+    for name, values in columns.items():
+        records[name] = numpy.frombuffer(values, dtype=numpy.int64 if values.typecode == "q" else numpy.float64)\
+            .astype(dtypes[name])
+    return records
+
+
+def decode_aaa_frames(frames, use_numpy=None):
+    """
+    Function to decode the AAA reports in a batch of GPRS or GPRSFrame objects into columns
+    :param frames: Iterable of GPRS or GPRSFrame objects
+    :param use_numpy: Return a numpy structured array. Defaults to True when numpy is available.
+    :return: Dictionary of column name to array.array, or a numpy structured array
+    """
+    payloads = []
+    imeis = []
+    for frame in frames:
+        if bytes(frame.command_type) == b"AAA":
+            payloads.append(frame.leftover)
+            imeis.append(bytes(frame.imei))
+    return decode_aaa(payloads, imeis=imeis, use_numpy=use_numpy)
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    from meitrack.common import DIRECTION_CLIENT_TO_SERVER
+    from meitrack.gprs_protocol import SAMPLE_FRAMES, parse_many
+
+    frames = parse_many(b"".join(SAMPLE_FRAMES), DIRECTION_CLIENT_TO_SERVER, zero_copy=True)
+    columns = decode_aaa_frames(frames)
+    if numpy is not None:
+        print(columns)
+    else:
+        for name, values in columns.items():
+            print(name, values.tolist())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,52 @@
 """
 Module for working with the meitrack AAA command
 """
-import copy
 import logging
 
 from meitrack.command.common import Command
+from meitrack.command.schema import register_projection, resolve_projection
 from meitrack.error import GPRSParseError
 
 logger = logging.getLogger(__name__)
 
+# Fields needed to place a device on a live map
+LIVE_MAP_FIELDS = ["event_code", "latitude", "longitude", "date_time", "speed"]
+register_projection("live_map", LIVE_MAP_FIELDS)
+
+
+class ProjectedFieldDict(dict):
+    """
+    Field dictionary holding the projected fields of a command.
+
+    Reading a field of the command layout that is not in the projection parses
+    the remaining fields from the original payload.
+    """
+    def __init__(self, command, values):
+        super(ProjectedFieldDict, self).__init__(values)
+        self.command = command
+
+    def parse_if_missing(self, key):
+        """
+        Function to parse the remaining fields if a field is outside the projection
+        :param key: The field name being read
+        :return: None
+        """
+        if self.command.projection is not None and not dict.__contains__(self, key) \
+                and key in self.command.field_name_selector:
+            self.command.parse_remaining_fields()
+
+    def __contains__(self, key):
+        self.parse_if_missing(key)
+        return dict.__contains__(self, key)
+
+    def __getitem__(self, key):
+        self.parse_if_missing(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        self.parse_if_missing(key)
+        return dict.get(self, key, default)
+
 
 class TrackerCommand(Command):
     """
@@ -61,14 +99,45 @@ class TrackerCommand(Command):
         "unknown_1", "unknown_2", "unknown_3", "unknown_4", "taxi_meter_data",
     ]
 
-    def __init__(self, direction, payload=None, device_type=None):
+    @classmethod
+    def field_names_for_event(cls, event_code):
+        """
+        Function to select the field layout used by an event code
+        :param event_code: The event code from the payload as bytes
+        :return: The list of field names for the event
+        >>> TrackerCommand.field_names_for_event(b"37")[17]
+        'rfid'
+        >>> TrackerCommand.field_names_for_event(b"35") is TrackerCommand.field_names
+        True
+        """
+        if event_code in [b"50", b"51"]:
+            return cls.field_names_50_51
+        if event_code in [b"37"]:
+            return cls.field_names_37
+        if event_code in [b"39"]:
+            return cls.field_names_39
+        if event_code in [b"109"]:
+            return cls.field_names_109
+        return cls.field_names
+
+    supports_projection = True
+
+    def __init__(self, direction, payload=None, device_type=None, fields=None):
         """
         Constructor for setting tracker command parameters
         :param direction: The payload direction.
         :param payload: The payload to parse.
+        :param fields: Optional projection, a set of field names or a profile name, to parse
+            only those fields. Other fields are parsed from the payload when first read.
+        >>> command = TrackerCommand(1, b'AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176', fields="live_map")
+        >>> sorted(command.field_dict)
+        ['date_time', 'event_code', 'latitude', 'longitude', 'speed']
+        >>> command.num_sats, command.projection, len(command.field_dict)
+        (b'7', None, 10)
         """
         super(TrackerCommand, self).__init__(direction, payload=payload, device_type=device_type)
         self.field_name_selector = None
+        self.projection = resolve_projection(fields)
 
         if payload:
             self.parse_payload(payload)
@@ -82,27 +151,33 @@ class TrackerCommand(Command):
         :param max_split: The maximum number of times to split fields. Unused in this function
         :return: None
         """
-        fields = payload.split(b',')
+        fields = payload.split(b',', 2)
         if len(fields) < 2:
             raise GPRSParseError("Field length does not include event code", self.payload)
-        logger.log(13, "Fields is {}".format(fields[1]))
-
-        if fields[1] in [b"50", b"51"]:
-            self.field_name_selector = copy.deepcopy(self.field_names_50_51)
-        elif fields[1] in [b"37"]:
-            logger.log(13, "Setting AAA fields for license data payload")
-            self.field_name_selector = copy.deepcopy(self.field_names_37)
-        elif fields[1] in [b"39"]:
-            logger.log(13, "Setting AAA fields for file event payload")
-            self.field_name_selector = copy.deepcopy(self.field_names_39)
-        elif fields[1] in [B"109"]:
-            logger.log(13, "Setting AAA fields for taxi data event payload")
-            self.field_name_selector = copy.deepcopy(self.field_names_109)
+
+        self.field_name_selector = self.field_names_for_event(fields[1])
+
+        if self.projection is None:
+            super(TrackerCommand, self).parse_payload(payload, variant=fields[1])
         else:
-            logger.log(13, "Setting AAA to default fields")
-            self.field_name_selector = copy.deepcopy(self.field_names)
+            self.field_dict = ProjectedFieldDict(
+                self, self.field_schema(payload, fields[1]).parse_projection(payload, self.projection)
+            )
+
+    def parse_remaining_fields(self):
+        """
+        Function to parse the fields left out of the projection from the original payload.
 
-        super(TrackerCommand, self).parse_payload(payload)
+        Fields already set on the command are kept.
+        :return: None
+        """
+        if self.projection is None:
+            return
+        logger.log(13, "Parsing fields outside the projection")
+        self.projection = None
+        projected = dict(self.field_dict)
+        super(TrackerCommand, self).parse_payload(self.payload, variant=self.payload.split(b',', 2)[1])
+        self.field_dict.update(projected)
 
 
 def main():
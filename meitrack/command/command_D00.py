@@ -29,7 +29,7 @@ class FileDownloadCommand(Command):
         :param payload: The payload to parse.
         """
         super(FileDownloadCommand, self).__init__(direction, payload=payload, device_type=device_type)
-        logger.log(13, payload)
+        logger.log(13, "Payload is %s", payload)
         if direction == DIRECTION_SERVER_TO_CLIENT:
             self.field_name_selector = self.request_field_names
         else:
@@ -50,7 +50,7 @@ class FileDownloadCommand(Command):
         else:
             self.field_dict["command"] = b"D00"
 
-        logger.log(13, self.field_dict)
+        logger.log(13, "Fields are %s", self.field_dict)
 
     def build(self, file_name, number_of_data_packets, data_packet_number, file_bytes):
         """
@@ -41,7 +41,7 @@ class FileListCommand(Command):
         """
 
         super(FileListCommand, self).__init__(direction, payload=payload, device_type=device_type)
-        logger.log(13, payload)
+        logger.log(13, "Payload is %s", payload)
         if direction == DIRECTION_SERVER_TO_CLIENT:
             self.field_name_selector = self.request_field_names
         else:
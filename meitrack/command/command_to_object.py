@@ -1,22 +1,20 @@
 """
 Module for converting meitrack gprs commands to Command objects
+
+Command classes are named by import path in COMMAND_LIST and imported the first
+time a command of that type is converted. Command classes published by other
+packages through entry points are registered once when the module is imported,
+so they can replace the built in commands.
 """
+import importlib
 import logging
+import time
 
-from meitrack.command.command_AAA import TrackerCommand
-from meitrack.command.command_D00 import FileDownloadCommand
-from meitrack.command.command_D01 import FileListCommand
-from meitrack.command.command_E91 import RequestDeviceInfoCommand
-from meitrack.command.command_FC0 import AuthOtaUpdateCommand
-from meitrack.command.command_FC1 import SendOtaDataCommand
-from meitrack.command.command_FC2 import ObtainOtaChecksumCommand
-from meitrack.command.command_FC3 import StartOtaUpdateCommand
-from meitrack.command.command_FC4 import CancelOtaUpdateCommand
-from meitrack.command.command_FC5 import CheckDeviceCodeCommand
-from meitrack.command.command_FC6 import CheckFirmwareVersionCommand
-from meitrack.command.command_FC7 import SetOtaServerCommand
 from meitrack.command.common import Command
+from meitrack.command.schema import register_schema, schema_registry, unregister_schema
 from meitrack.common import DIRECTION_CLIENT_TO_SERVER, DIRECTION_SERVER_TO_CLIENT
+from meitrack.metrics import observe_command, register_command_types, registry
+from meitrack.trace import DISPATCH, tracer
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +32,8 @@ COMMAND_LIST = {
     b"A70": {"name": "Reading All Authorized Phone Numbers", "class": None},
     b"A71": {"name": "Setting Authorized Phone Numbers", "class": None},
     b"A73": {"name": "Setting the Smart Sleep Mode", "class": None},
-    b"AAA": {"name": "Automatic Event Report", "class": TrackerCommand},
+    b"AAA": {"name": "Automatic Event Report", "class": "meitrack.command.command_AAA.TrackerCommand",
+              "variants": [b"37", b"39", b"50", b"51", b"109"]},
     b"AFF": {"name": "Deleting a GPRS Event in the Buffer", "class": None},
     b"B05": {"name": "Setting a Geo-Fence", "class": None},
     b"B06": {"name": "Deleting a Geo-Fence", "class": None},
@@ -56,8 +55,8 @@ COMMAND_LIST = {
     b"C43": {"name": "Setting a Temperature Value for the High/Low Temperature Alarm and Logical Name", "class": None},
     b"C44": {"name": "Reading Temperature Sensor Parameters", "class": None},
     b"C46": {"name": "Checking Temperature Sensor Parameters", "class": None},
-    b"D00": {"name": "File download command", "class": FileDownloadCommand},
-    b"D01": {"name": "File list command", "class": FileListCommand},
+    b"D00": {"name": "File download command", "class": "meitrack.command.command_D00.FileDownloadCommand", "max_split": 4},
+    b"D01": {"name": "File list command", "class": "meitrack.command.command_D01.FileListCommand"},
     b"D10": {"name": "Authorizing an iButton key", "class": None},
     b"D11": {"name": "Authorizing iButton Keys in Batches", "class": None},
     b"D12": {"name": "Checking iButton Authorization", "class": None},
@@ -69,15 +68,15 @@ COMMAND_LIST = {
     b"D71": {"name": "Setting GPS Data Filtering", "class": None},
     b"D72": {"name": "Setting Output Triggering", "class": None},
     b"D73": {"name": "Allocating GPRS Cache and GPS LOG Storage Space", "class": None},
-    b"E91": {"name": "Reading Device's Firmware Version and SN", "class": RequestDeviceInfoCommand},
-    b"FC0": {"name": "Auth ota update", "class": AuthOtaUpdateCommand},
-    b"FC1": {"name": "Send ota data", "class": SendOtaDataCommand},
-    b"FC2": {"name": "Obtain ota checksum", "class": ObtainOtaChecksumCommand},
-    b"FC3": {"name": "Start ota update", "class": StartOtaUpdateCommand},
-    b"FC4": {"name": "Cancel ota update", "class": CancelOtaUpdateCommand},
-    b"FC5": {"name": "Check device code", "class": CheckDeviceCodeCommand},
-    b"FC6": {"name": "Check firmware version", "class": CheckFirmwareVersionCommand},
-    b"FC7": {"name": "Set ota server", "class": SetOtaServerCommand},
+    b"E91": {"name": "Reading Device's Firmware Version and SN", "class": "meitrack.command.command_E91.RequestDeviceInfoCommand"},
+    b"FC0": {"name": "Auth ota update", "class": "meitrack.command.command_FC0.AuthOtaUpdateCommand"},
+    b"FC1": {"name": "Send ota data", "class": "meitrack.command.command_FC1.SendOtaDataCommand", "max_split": 1},
+    b"FC2": {"name": "Obtain ota checksum", "class": "meitrack.command.command_FC2.ObtainOtaChecksumCommand", "max_split": 1},
+    b"FC3": {"name": "Start ota update", "class": "meitrack.command.command_FC3.StartOtaUpdateCommand"},
+    b"FC4": {"name": "Cancel ota update", "class": "meitrack.command.command_FC4.CancelOtaUpdateCommand"},
+    b"FC5": {"name": "Check device code", "class": "meitrack.command.command_FC5.CheckDeviceCodeCommand", "max_split": 2},
+    b"FC6": {"name": "Check firmware version", "class": "meitrack.command.command_FC6.CheckFirmwareVersionCommand"},
+    b"FC7": {"name": "Set ota server", "class": "meitrack.command.command_FC7.SetOtaServerCommand"},
     b"F01": {"name": "Restarting the GSM Module", "class": None},
     b"F02": {"name": "Restarting the GPS Module", "class": None},
     b"F08": {"name": "Setting the Mileage and Run Time", "class": None},
@@ -85,13 +84,193 @@ COMMAND_LIST = {
     b"F11": {"name": "Restoring Initial Settings", "class": None},
 }
 
+# Entry point group for command classes from other packages. The entry point
+# name is the command type and the value is the class.
+ENTRY_POINT_GROUP = "meitrack.commands"
+# Field layouts of the commands without a command class
+GENERIC_REQUEST_FIELD_NAMES = ["command", "parameters"]
+GENERIC_RESPONSE_FIELD_NAMES = ["command", "response"]
+
+command_classes = {}
+entry_points_loaded = False
+register_command_types(COMMAND_LIST)
+
+
+def import_class(class_path):
+    """
+    Function to import a class from its import path
+    :param class_path: The module and class name as "package.module.Class" or "package.module:Class"
+    :return: The class
+    >>> import_class("meitrack.command.common.Command")
+    <class 'meitrack.command.common.Command'>
+    """
+    if ":" in class_path:
+        module_name, class_name = class_path.split(":", 1)
+    else:
+        module_name, class_name = class_path.rsplit(".", 1)
+    logger.log(13, "Importing command class %s", class_path)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def register_command(command_type, name, class_path, max_split=None):
+    """
+    Function to add or replace a command in the command list.
+
+    The class is imported when a command of the type is first converted.
+    :param command_type: The command type as bytes
+    :param name: The description of the command
+    :param class_path: The import path of the command class, the class itself, or None for a generic command
+    :param max_split: The maximum number of times to split the payload
+    :return: None
+    """
+    COMMAND_LIST[command_type] = {"name": name, "class": class_path}
+    if max_split is not None:
+        COMMAND_LIST[command_type]["max_split"] = max_split
+    command_classes.pop(command_type, None)
+    register_command_types([command_type])
+
+
+def load_entry_points():
+    """
+    Function to register the command classes published by installed packages in the meitrack.commands group.
+
+    Called once when the module is imported. Entry points replace built in commands of the same type.
+    :return: None
+    """
+    global entry_points_loaded
+    if entry_points_loaded:
+        return
+    entry_points_loaded = True
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return
+    try:
+        group = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python before 3.10 returns a dictionary of groups
+        group = entry_points().get(ENTRY_POINT_GROUP, [])
+    for entry_point in group:
+        logger.log(13, "Registering command %s from entry point %s", entry_point.name, entry_point.value)
+        register_command(entry_point.name.encode(), entry_point.name, entry_point.value)
+
+
+load_entry_points()
+
+
+def register_command_schema(command_type, command_class):
+    """
+    Function to compile the field schema of a command for both directions
+    :param command_type: The command type as bytes
+    :param command_class: The command class or None for a generic command
+    :return: None
+    >>> from meitrack.command.schema import lookup_schema
+    >>> register_command_schema(b"A13", None)
+    >>> lookup_schema(b"A13", DIRECTION_CLIENT_TO_SERVER).names
+    ('command', 'response')
+    >>> command_to_object(DIRECTION_CLIENT_TO_SERVER, b"FC4", b"FC4,OK,EXTRA")
+    Traceback (most recent call last):
+        ...
+    meitrack.error.GPRSParseError: ('Incorrect number of fields for data. Data field length is ', 3, ...
+
+    Command classes without field name lists, such as those from other packages, have no schema registered.
+    >>> clear_command_classes()
+    >>> register_command_schema(b"A13", object)
+    >>> lookup_schema(b"A13", DIRECTION_CLIENT_TO_SERVER) is None
+    True
+    """
+    command_details = COMMAND_LIST[command_type]
+    max_split = command_details.get("max_split")
+    if command_class is None:
+        register_schema(command_type, DIRECTION_SERVER_TO_CLIENT, GENERIC_REQUEST_FIELD_NAMES, 1)
+        register_schema(command_type, DIRECTION_CLIENT_TO_SERVER, GENERIC_RESPONSE_FIELD_NAMES, 1)
+    elif "variants" in command_details:
+        register_schema(command_type, DIRECTION_CLIENT_TO_SERVER, command_class.field_names_for_event(None))
+        for variant in command_details["variants"]:
+            register_schema(
+                command_type, DIRECTION_CLIENT_TO_SERVER, command_class.field_names_for_event(variant),
+                variant=variant
+            )
+    else:
+        request_field_names = getattr(command_class, "request_field_names", None)
+        response_field_names = getattr(command_class, "response_field_names", None)
+        if request_field_names is not None:
+            register_schema(command_type, DIRECTION_SERVER_TO_CLIENT, request_field_names, max_split)
+        if response_field_names is not None:
+            register_schema(command_type, DIRECTION_CLIENT_TO_SERVER, response_field_names, max_split)
+        if request_field_names is None or response_field_names is None:
+            logger.log(13, "Command class %s does not list the field names of both directions", command_class)
+
+
+def command_class_for(command_type):
+    """
+    Function to get the class for a command type, importing it on first use
+    :param command_type: The command type as bytes
+    :return: The command class, or None for generic and unknown commands
+    >>> command_class_for(b"D00")
+    <class 'meitrack.command.command_D00.FileDownloadCommand'>
+    >>> from meitrack.command.schema import lookup_schema
+    >>> lookup_schema(b"D00", DIRECTION_SERVER_TO_CLIENT).max_split
+    4
+    >>> clear_command_classes()
+    """
+    try:
+        return command_classes[command_type]
+    except KeyError:
+        pass
+    command_details = COMMAND_LIST.get(command_type)
+    if command_details is None:
+        return None
+
+    command_class = command_details["class"]
+    if isinstance(command_class, str):
+        command_class = import_class(command_class)
+    register_command_schema(command_type, command_class)
+    command_classes[command_type] = command_class
+    return command_class
+
+
+def register_command_schemas():
+    """
+    Function to import every command class and compile its field schemas
+    :return: None
+    >>> register_command_schemas()
+    >>> from meitrack.command.schema import lookup_schema
+    >>> lookup_schema(b"AAA", DIRECTION_CLIENT_TO_SERVER, b"37").index["rfid"]
+    17
+    >>> lookup_schema(b"A10", DIRECTION_CLIENT_TO_SERVER).names
+    ('command', 'response')
+    >>> clear_command_classes()
+    """
+    for command_type in list(COMMAND_LIST):
+        command_class_for(command_type)
+
+
+def clear_command_classes():
+    """
+    Function to forget the imported command classes and the schemas registered for the command list.
 
-def command_to_object(direction, command_type, payload, device_type=None):
+    Classes and schemas are registered again when a command of the type is next converted.
+    :return: None
+    >>> _ = command_class_for(b"FC4")
+    >>> clear_command_classes()
+    >>> b"FC4" in command_classes, any(key[0] == b"FC4" for key in schema_registry)
+    (False, False)
+    """
+    for key in [key for key in schema_registry if key[0] in COMMAND_LIST]:
+        unregister_schema(*key)
+    command_classes.clear()
+
+
+def command_to_object(direction, command_type, payload, device_type=None, fields=None):
     """
     Function for converting a command byte strings to a command object.
     :param direction: Direction of message, client to server or server to client.
     :param command_type: The type of command to generate
     :param payload: The command payload to parse.
+    :param device_type: The string representation of the device type.
+    :param fields: Optional projection, a set of field names or a profile name. Commands that do not
+        support projection parse every field.
     :return: A command object from the incoming payload
     >>> command_to_object(DIRECTION_SERVER_TO_CLIENT, b"A11", b'A11,0').as_bytes()
     b'A11,0'
@@ -102,9 +281,32 @@ def command_to_object(direction, command_type, payload, device_type=None):
     >>> command_to_object(DIRECTION_CLIENT_TO_SERVER, b"AAA", b'')
     <meitrack.command.command_AAA.TrackerCommand object at ...>
     """
-    logger.log(13, "command type: %s, with payload %s", command_type, payload)
-    if command_type in COMMAND_LIST and COMMAND_LIST[command_type]["class"] is not None:
-        return COMMAND_LIST[command_type]["class"](direction, payload, device_type=device_type)
+    if tracer.enabled:
+        tracer.emit(DISPATCH, direction, command_type, payload)
+    if not registry.enabled:
+        return build_command(direction, command_type, payload, device_type, fields)
+    start = time.perf_counter()
+    try:
+        return build_command(direction, command_type, payload, device_type, fields)
+    finally:
+        observe_command(command_type, len(payload or b""), time.perf_counter() - start)
+
+
+def build_command(direction, command_type, payload, device_type=None, fields=None):
+    """
+    Function to build the command object for a command type from the registered command class
+    :param direction: Direction of message, client to server or server to client.
+    :param command_type: The type of command to generate
+    :param payload: The command payload to parse.
+    :param device_type: The string representation of the device type.
+    :param fields: Optional projection passed to command classes that support it
+    :return: A command object from the incoming payload
+    """
+    command_class = command_class_for(command_type)
+    if command_class is not None:
+        if fields is not None and command_class.supports_projection:
+            return command_class(direction, payload, device_type=device_type, fields=fields)
+        return command_class(direction, payload, device_type=device_type)
     return Command(direction, payload, device_type=device_type)
 
 
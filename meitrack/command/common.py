@@ -1,14 +1,14 @@
 """
 Common meitrack command functions
 """
-import binascii
 import datetime
+import functools
 import logging
 
-from license.cardreader import License
-from meitrack.command.event import event_to_name, event_to_id, EVENT_MAP_T333, EVENT_MAP_T366G
-from meitrack.common import b2s
-from meitrack.error import GPRSParseError
+from meitrack.command.date_codec import format_meitrack_date, parse_meitrack_date
+from meitrack.command.event import event_table_for, event_to_id
+from meitrack.command.io_state import IoState
+from meitrack.command.schema import lookup_schema, register_converter, schema_for
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +17,11 @@ class TaxiMeterData:
     """
     Class for working with taxi meter data from meitrack devices.
     """
+    __slots__ = (
+        "assisted_info", "start_time", "end_time", "fare_distance", "fare_price", "fare_trip_time",
+        "fare_waiting_time",
+    )
+
     def __init__(self, payload=None):
         """
         Constructor for the taxi meter data class.
@@ -125,6 +130,9 @@ class Command:
     """
     Base class for all meitrack command objects.
     """
+    # True for commands that accept a projection of the fields to parse
+    supports_projection = False
+
     def __init__(self, direction, payload=None, device_type=None):
         """
         Constructor for the command object
@@ -205,40 +213,45 @@ class Command:
         return None
         # raise AttributeError("Field %s not set" % (item,))
 
-    def parse_payload(self, payload, max_split=None):
+    def field_schema(self, payload, variant=None):
+        """
+        Function to find the schema for the field names of the command.
+
+        The schema registered for the command type, direction and variant is used
+        when it has the same field names, otherwise the shared schema for the names.
+        :param payload: The meitrack protocol payload, starting with the command type
+        :param variant: Optional variant of the layout, such as the event code of an AAA report
+        :return: The FieldSchema for the payload
+        >>> from meitrack.command.command_to_object import clear_command_classes, command_class_for
+        >>> from meitrack.common import DIRECTION_CLIENT_TO_SERVER
+        >>> command_class_for(b"FC5")(DIRECTION_CLIENT_TO_SERVER).field_schema(b'FC5,OK').max_split
+        2
+        >>> clear_command_classes()
+        """
+        comma = payload.find(b',')
+        command_type = payload if comma < 0 else payload[:comma]
+        schema = lookup_schema(command_type, self.direction, variant)
+        if schema is None or schema.names != tuple(self.field_name_selector):
+            schema = schema_for(self.field_name_selector)
+        return schema
+
+    def parse_payload(self, payload, max_split=None, variant=None):
         """
         Function to parse a payload building the parameters.
 
         Build the field dictionary from the incoming payload
         :param payload: The meitrack protocol payload
         :param max_split: The maximum number of times to split. Used when
-            field separators may be in the payload
+            field separators may be in the payload. Defaults to the value in the command schema.
+        :param variant: Optional variant of the layout, such as the event code of an AAA report
         :return: None
         """
-        if max_split:
-            fields = payload.split(b',', max_split)
-        else:
-            fields = payload.split(b',')
-        if len(fields) < 1:
-            raise GPRSParseError("Field length does not include event code", self.payload)
         if self.field_name_selector is None:
             logger.log(13, "No field names set")
             return
 
-        if len(self.field_name_selector) < len(fields):
-            logger.log(13, "%s %s", len(fields), len(self.field_name_selector))
-            logger.log(13, payload)
-            raise GPRSParseError(
-                "Incorrect number of fields for data. Data field length is ", len(fields),
-                " but should be ", len(self.field_name_selector), ". Fields should be ",
-                str(self.field_name_selector), ", Data was: ", str(payload)
-            )
-        for i in range(0, len(fields)):
-            field_name = self.field_name_selector[i]
-            if field_name == "date_time":
-                self.field_dict[field_name] = meitrack_date_to_datetime(fields[i])
-            else:
-                self.field_dict[field_name] = fields[i]
+        schema = self.field_schema(payload, variant)
+        self.field_dict.update(zip(schema.names, schema.parse(payload, max_split)))
 
     def get_analog_input_value(self, input_number):
         """
@@ -249,8 +262,6 @@ class Command:
         if self.field_dict.get("analog_input_value"):
             analog_list = self.field_dict.get("analog_input_value").split(b"|")
             if input_number <= len(analog_list):
-                logger.debug(analog_list[input_number-1])
-                logger.debug(int(analog_list[input_number-1], 16))
                 return int(analog_list[input_number-1], 16) / 100
         return None
 
@@ -281,16 +292,15 @@ class Command:
         :return: The gsm info as a dictionary
         """
         if self.field_dict.get("base_station_info"):
-            fields = self.field_dict.get("base_station_info").split(b"|")
-            if len(fields) == 4:
-                return_dict = {
-                    "mcc": fields[0],
-                    "mnc": fields[1],
-                    "lac": str(int(fields[2], 16)).encode(),
-                    "ci": str(int(fields[3], 16)).encode(),
+            cell = parse_base_station_info(self.field_dict.get("base_station_info"))
+            if cell is not None:
+                return {
+                    "mcc": cell[0],
+                    "mnc": cell[1],
+                    "lac": cell[2],
+                    "ci": cell[3],
                     "gsm_signal_strength": self.get_gsm_signal_strength()
                 }
-                return return_dict
         return None
 
     def get_gsm_signal_strength(self):
@@ -350,11 +360,8 @@ class Command:
 
         :return: The event name
         """
-        event_map = EVENT_MAP_T333
-        if self.device_type and self.device_type == "T366G":
-            event_map = EVENT_MAP_T366G
         if self.field_dict.get("event_code"):
-            return event_to_name(self.field_dict.get("event_code"), event_map=event_map)
+            return event_table_for(self.device_type).name(self.field_dict.get("event_code"))
         return None
 
     def get_firmware_version(self):
@@ -390,6 +397,8 @@ class Command:
         :return: The gsm signal strength
         """
         if self.field_dict.get("rfid"):
+            # Only needed for RFID reports so not imported with the module
+            from license.cardreader import License
             return License(self.field_dict.get("rfid"))
         return None
 
@@ -412,6 +421,19 @@ class Command:
             return meitrack_digital_pins_to_dict(self.field_dict.get("io_port_status"))
         return None
 
+    def get_io_state(self):
+        """
+        Helper function to retrieve the digital pin states from a meitrack command as a bitmask.
+
+        :return: The digital pin states as an IoState
+        """
+        if self.field_dict.get("io_port_status"):
+            try:
+                return IoState.from_hex(self.field_dict.get("io_port_status"))
+            except ValueError:
+                logger.error("Unable to convert io port status %s", self.field_dict.get("io_port_status"))
+        return None
+
     def get_analogue_pin_states(self):
         """
         Helper function to retrieve the analogue pin values from a meitrack command.
@@ -419,7 +441,7 @@ class Command:
         :return: The analogue pin values as a dictionary.
         """
         if self.field_dict.get("analog_input_value"):
-            return meitrack_analogue_pins_to_dict(b"0000|0000|0000|018D|0579")
+            return meitrack_analogue_pins_to_dict(self.field_dict.get("analog_input_value"))
         return None
 
     def get_device_type(self):
@@ -433,6 +455,27 @@ class Command:
         return None
 
 
+@functools.lru_cache(maxsize=4096)
+def parse_base_station_info(base_station_info):
+    """
+    Function to split a base station info field, cached as devices report from few cells.
+
+    :param base_station_info: The mcc|mnc|lac|ci field with hexadecimal lac and ci
+    :return: Tuple of mcc, mnc, lac and ci as decimal byte strings, or None if the field is invalid
+
+    >>> parse_base_station_info(b'466|97|527B|01035DB4')
+    (b'466', b'97', b'21115', b'16997812')
+    """
+    fields = bytes(base_station_info).split(b"|")
+    if len(fields) != 4:
+        return None
+    try:
+        return fields[0], fields[1], str(int(fields[2], 16)).encode(), str(int(fields[3], 16)).encode()
+    except ValueError:
+        logger.error("Unable to convert base station info %s", base_station_info)
+    return None
+
+
 # Example: 0400
 def meitrack_digital_pins_to_dict(io_string):
     """
@@ -444,23 +487,14 @@ def meitrack_digital_pins_to_dict(io_string):
     >>> meitrack_digital_pins_to_dict(b'0400')
     {0: False, 1: False, 2: False, 3: False, 4: False, 5: False, 6: False, 7: False, 8: False, 9: False, 10: True, 11: False, 12: False, 13: False, 14: False, 15: False}
     """
-    mapping = {}
+    # Only whole bytes are reported
+    if len(io_string) % 2:
+        return {}
     try:
-        data_bytes = binascii.unhexlify(io_string)
-    except binascii.Error:
+        return IoState.from_hex(io_string).to_dict()
+    except ValueError:
         return {}
 
-    for counter, byte in enumerate(data_bytes[::-1]):
-        logger.debug("byte is %s", byte)
-        for j in range(0, 8):
-            if (byte >> j & 1) == 1:
-                logger.debug("bit on %s %s", counter, j)
-                mapping[counter*8+j] = True
-            else:
-                mapping[counter*8+j] = False
-
-    return mapping
-
 
 # Example: 0400
 def meitrack_analogue_pins_to_dict(io_string):
@@ -493,10 +527,7 @@ def meitrack_date_to_datetime(date_time):
     """
     # yymmddHHMMSS
     try:
-        date_time_str = b2s(date_time)
-        date_time_str_utc = "%s%s" % (date_time_str, "Z")
-        d = datetime.datetime.strptime(date_time_str_utc, "%y%m%d%H%M%SZ")
-        return d
+        return parse_meitrack_date(date_time)
     except UnicodeDecodeError as err:
         logger.error("Unable to convert datetime field to a string %s with error: %s", date_time, err)
     except ValueError as err:
@@ -504,6 +535,9 @@ def meitrack_date_to_datetime(date_time):
     return None
 
 
+register_converter("date_time", meitrack_date_to_datetime)
+
+
 def datetime_to_meitrack_date(date_time):
     """
     Function to convert a datetime object to the meitrack date format
@@ -514,7 +548,7 @@ def datetime_to_meitrack_date(date_time):
     >>> datetime_to_meitrack_date(datetime.datetime(1977, 7, 4, 0, 0))
     b'770704000000'
     """
-    return date_time.strftime("%y%m%d%H%M%S").encode()
+    return format_meitrack_date(date_time)
 
 
 def main():
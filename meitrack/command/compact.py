@@ -0,0 +1,179 @@
+"""
+Module for compact command objects.
+
+CompactCommand stores the fields of a command as a tuple of values indexed by
+a FieldSchema shared between every command with the same layout, instead of a
+field dictionary and field name list per object.
+"""
+import collections.abc
+import logging
+
+from meitrack.command.command_AAA import TrackerCommand
+from meitrack.command.command_to_object import command_to_object
+from meitrack.command.common import Command
+from meitrack.command.schema import schema_for
+from meitrack.error import GPRSParseError
+
+logger = logging.getLogger(__name__)
+
+
+class FieldView(collections.abc.Mapping):
+    """
+    Read only mapping of field names to values over a schema and a value tuple.
+
+    Returned as the field_dict of a compact command so code written against the
+    field dictionary of a Command keeps working.
+    """
+    __slots__ = ("schema", "values")
+
+    def __init__(self, schema, values):
+        self.schema = schema
+        self.values = values
+
+    def __getitem__(self, item):
+        position = self.schema.index[item]
+        if position >= len(self.values):
+            raise KeyError(item)
+        return self.values[position]
+
+    def __iter__(self):
+        return iter(self.schema.names[:len(self.values)])
+
+    def __len__(self):
+        return len(self.values)
+
+
+class CompactCommand:
+    """
+    Slotted command object for AAA reports holding its fields as a tuple.
+    """
+    __slots__ = ("direction", "device_type", "schema", "values")
+
+    def __init__(self, direction, payload=None, device_type=None):
+        """
+        Constructor for the compact command
+        :param direction: The payload direction.
+        :param payload: The payload to parse.
+        :param device_type: The string representation of the device type.
+        >>> command = CompactCommand(1, b'AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176')
+        >>> command["latitude"], command.speed, command.rfid, command.get_event_name()
+        (b'24.819116', b'0', None, 'Track By Time Interval')
+        >>> command.as_bytes()
+        b'AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176'
+        >>> empty = CompactCommand(1)
+        >>> dict(empty.field_dict), str(empty), empty.speed, len(empty.field_name_selector)
+        ({}, '', None, 29)
+        """
+        self.direction = direction
+        self.device_type = device_type
+        # Commands without a payload use the default AAA layout with no values
+        self.schema = schema_for(TrackerCommand.field_names)
+        self.values = ()
+        if payload:
+            self.parse_payload(payload)
+
+    def parse_payload(self, payload):
+        """
+        Function to parse an AAA payload into the value tuple
+        :param payload: The meitrack protocol payload
+        :return: None
+        """
+        fields = payload.split(b',', 2)
+        if len(fields) < 2:
+            raise GPRSParseError("Field length does not include event code", payload)
+        self.schema = schema_for(TrackerCommand.field_names_for_event(fields[1]))
+        self.values = tuple(self.schema.parse(payload))
+
+    @property
+    def field_dict(self):
+        """
+        Read only view of the fields as a mapping
+        :return: FieldView over the schema and values
+        """
+        return FieldView(self.schema, self.values)
+
+    @property
+    def field_name_selector(self):
+        """
+        The field names of the command layout
+        :return: List of field names
+        """
+        return list(self.schema.names)
+
+    def __getitem__(self, item):
+        """
+        Helper function to return a particular field.
+
+        :param item: The item to return
+        :return: the raw parameter or None if not present
+        """
+        position = self.schema.index.get(item)
+        if position is None or position >= len(self.values):
+            return None
+        return self.values[position]
+
+    def __getattr__(self, item):
+        """
+        Helper function to return a particular field.
+
+        :param item: The item to return
+        :return: the raw parameter or None if not present
+        """
+        return self.__getitem__(item)
+
+    def as_bytes(self):
+        """
+        Calculate the byte array representation of the command.
+
+        :return: Byte array representation of the command.
+        """
+        return Command.as_bytes(self)
+
+    def to_command(self):
+        """
+        Function to convert to a full TrackerCommand object
+        :return: TrackerCommand with the same fields
+        """
+        return TrackerCommand(self.direction, self.as_bytes(), device_type=self.device_type)
+
+    def __str__(self):
+        """
+        String representation of the command
+        :return: String representation of the command
+        """
+        result_str = ""
+        for field, value in self.field_dict.items():
+            result_str += "\tField %s has value %s\n" % (field, value)
+        return result_str
+
+    get_analog_input_value = Command.get_analog_input_value
+    get_battery_voltage = Command.get_battery_voltage
+    get_battery_level = Command.get_battery_level
+    get_base_station_info = Command.get_base_station_info
+    get_gsm_signal_strength = Command.get_gsm_signal_strength
+    get_event_id = Command.get_event_id
+    get_event_name = Command.get_event_name
+    get_taxi_meter_data = Command.get_taxi_meter_data
+    get_license_data = Command.get_license_data
+    get_digital_pin_states = Command.get_digital_pin_states
+    get_io_state = Command.get_io_state
+    get_analogue_pin_states = Command.get_analogue_pin_states
+
+
+def compact_command_to_object(direction, command_type, payload, device_type=None):
+    """
+    Function for converting a command to a compact command object where one is available.
+
+    AAA reports are converted to CompactCommand objects. Other commands are
+    converted to their full command objects.
+    :param direction: Direction of message, client to server or server to client.
+    :param command_type: The type of command to generate
+    :param payload: The command payload to parse.
+    :param device_type: The string representation of the device type.
+    :return: A command object from the incoming payload
+    >>> compact_command_to_object(1, b"AAA", b'AAA,35,24.819116')
+    <meitrack.command.compact.CompactCommand object at ...>
+    """
+    if command_type == b"AAA" and payload:
+        return CompactCommand(direction, payload, device_type=device_type)
+    return command_to_object(direction, command_type, payload, device_type=device_type)
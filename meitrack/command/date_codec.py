@@ -0,0 +1,273 @@
+"""
+Module for converting between meitrack dates and python or numpy dates.
+
+Meitrack dates are twelve ascii digits in the form yymmddHHMMSS. The digits
+are read from fixed positions rather than through strptime, and the results
+are cached on the raw bytes as consecutive reports often carry the same
+timestamp.
+"""
+import array
+import datetime
+import functools
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from meitrack.trace import DATE_PARSE, tracer
+
+logger = logging.getLogger(__name__)
+
+DATE_CACHE_SIZE = 4096
+DATE_LENGTH = 12
+# Matches the integer representation of numpy.datetime64("NaT")
+MISSING_TIMESTAMP = -2**63
+# Stamp substituted for invalid stamps in batch conversion before they are marked missing
+PLACEHOLDER_DATE = b"700101000000"
+DAYS_IN_MONTH = [0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+ZERO = ord("0")
+
+
+def date_digits(date_time):
+    """
+    Function to read the fields of a twelve digit meitrack date
+    :param date_time: Byte representation of a meitrack datetime
+    :return: Tuple of year, month, day, hour, minute and second
+    >>> date_digits(b'180323023615')
+    (2018, 3, 23, 2, 36, 15)
+    >>> date_digits(b'690101000000')[0], date_digits(b'681231235959')[0]
+    (1969, 2068)
+    """
+    year = (date_time[0] - ZERO) * 10 + date_time[1] - ZERO
+    # Same pivot as the %y directive of strptime
+    year += 1900 if year >= 69 else 2000
+    return (
+        year,
+        (date_time[2] - ZERO) * 10 + date_time[3] - ZERO,
+        (date_time[4] - ZERO) * 10 + date_time[5] - ZERO,
+        (date_time[6] - ZERO) * 10 + date_time[7] - ZERO,
+        (date_time[8] - ZERO) * 10 + date_time[9] - ZERO,
+        (date_time[10] - ZERO) * 10 + date_time[11] - ZERO,
+    )
+
+
+def days_from_civil(year, month, day):
+    """
+    Function to count the days from the epoch to a date in the proleptic gregorian calendar.
+
+    Works on integers and on numpy integer arrays.
+    :param year: The year
+    :param month: The month from 1 to 12
+    :param day: The day of the month
+    :return: The number of days since 1970-01-01
+    >>> days_from_civil(1970, 1, 1), days_from_civil(2000, 3, 1), days_from_civil(1969, 12, 31)
+    (0, 11017, -1)
+    """
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def cached_datetime(date_time):
+    """
+    Function to convert the raw bytes of a meitrack date to a datetime, cached on the bytes
+    :param date_time: Byte representation of a meitrack datetime
+    :return: python datetime object
+    """
+    if len(date_time) == DATE_LENGTH and date_time.isdigit():
+        return datetime.datetime(*date_digits(date_time))
+    # strptime accepts fields that are not zero padded
+    return datetime.datetime.strptime(date_time.decode() + "Z", "%y%m%d%H%M%SZ")
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def cached_epoch(date_time):
+    """
+    Function to convert the raw bytes of a meitrack date to epoch seconds, cached on the bytes
+    :param date_time: Byte representation of a meitrack datetime
+    :return: Integer seconds since the epoch in UTC
+    """
+    if len(date_time) != DATE_LENGTH or not date_time.isdigit():
+        raise ValueError("Invalid meitrack date %s" % (date_time,))
+    year, month, day, hour, minute, second = date_digits(date_time)
+    if not 1 <= month <= 12 or not 1 <= day <= days_in_month(year, month) \
+            or hour > 23 or minute > 59 or second > 59:
+        raise ValueError("Invalid meitrack date %s" % (date_time,))
+    return days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+
+
+def days_in_month(year, month):
+    """
+    Function to get the number of days in a month
+    :param year: The year
+    :param month: The month from 1 to 12
+    :return: The number of days in the month
+    >>> days_in_month(2000, 2), days_in_month(2100, 2), days_in_month(2018, 4)
+    (29, 28, 30)
+    """
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+    return DAYS_IN_MONTH[month]
+
+
+def raw_date(date_time):
+    """
+    Function to get the hashable bytes of a meitrack date
+    :param date_time: The date as bytes, bytearray, memoryview or str
+    :return: The date as bytes
+    """
+    if isinstance(date_time, bytes):
+        return date_time
+    if isinstance(date_time, str):
+        return date_time.encode()
+    return bytes(date_time)
+
+
+def parse_meitrack_date(date_time):
+    """
+    Function to convert a meitrack date to a python datetime object
+    :param date_time: Byte representation of a meitrack datetime
+    :return: python datetime object
+    >>> parse_meitrack_date(b'180323023615')
+    datetime.datetime(2018, 3, 23, 2, 36, 15)
+    >>> parse_meitrack_date('770704000000')
+    datetime.datetime(1977, 7, 4, 0, 0)
+    >>> parse_meitrack_date(b'181323023615')
+    Traceback (most recent call last):
+        ...
+    ValueError: month must be in 1..12
+    """
+    parsed = cached_datetime(raw_date(date_time))
+    if tracer.enabled:
+        tracer.emit(DATE_PARSE, date_time, parsed)
+    return parsed
+
+
+def meitrack_date_to_epoch(date_time):
+    """
+    Function to convert a meitrack datetime to seconds since the epoch
+    :param date_time: Byte representation of a meitrack datetime
+    :return: Integer seconds since the epoch in UTC
+    >>> meitrack_date_to_epoch(b'770704000000')
+    236822400
+    >>> meitrack_date_to_epoch(b'180323023615')
+    1521772575
+    >>> meitrack_date_to_epoch(b'180230000000')
+    Traceback (most recent call last):
+        ...
+    ValueError: Invalid meitrack date b'180230000000'
+    """
+    return cached_epoch(raw_date(date_time))
+
+
+def format_meitrack_date(date_time):
+    """
+    Function to convert a datetime object to the meitrack date format
+    :param date_time: The input date time object
+    :return: Byte representation of the date.
+    >>> format_meitrack_date(datetime.datetime(2018, 3, 23, 2, 36, 15))
+    b'180323023615'
+    """
+    return b"%02d%02d%02d%02d%02d%02d" % (
+        date_time.year % 100, date_time.month, date_time.day,
+        date_time.hour, date_time.minute, date_time.second,
+    )
+
+
+def meitrack_dates_to_epoch(stamps, use_numpy=None):
+    """
+    Function to convert a batch of meitrack dates to seconds since the epoch.
+
+    Stamps that are empty or invalid are stored as MISSING_TIMESTAMP.
+    :param stamps: Iterable of meitrack dates as bytes
+    :param use_numpy: Convert with numpy array arithmetic. Defaults to True when numpy is available.
+    :return: numpy int64 array, or array.array of signed 64 bit integers without numpy
+    >>> meitrack_dates_to_epoch([b'770704000000', b'', b'180323023615'], use_numpy=False).tolist()
+    [236822400, -9223372036854775808, 1521772575]
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if not use_numpy:
+        epochs = array.array("q")
+        for stamp in stamps:
+            try:
+                epochs.append(cached_epoch(raw_date(stamp)))
+            except (TypeError, ValueError):
+                epochs.append(MISSING_TIMESTAMP)
+        return epochs
+
+    stamps = [raw_date(stamp) for stamp in stamps]
+    well_formed = numpy.array(
+        [len(stamp) == DATE_LENGTH and stamp.isdigit() for stamp in stamps], dtype=bool
+    )
+    joined = b"".join(
+        stamp if is_well_formed else PLACEHOLDER_DATE for stamp, is_well_formed in zip(stamps, well_formed)
+    )
+    digits = numpy.frombuffer(joined, dtype=numpy.uint8).reshape(-1, DATE_LENGTH).astype(numpy.int64) - ZERO
+    fields = digits[:, 0::2] * 10 + digits[:, 1::2]
+    year, month, day, hour, minute, second = fields.T
+    year = year + numpy.where(year >= 69, 1900, 2000)
+
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_length = numpy.array(DAYS_IN_MONTH)[numpy.clip(month, 0, 12)] + (leap & (month == 2))
+    valid = well_formed & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_length) \
+        & (hour <= 23) & (minute <= 59) & (second <= 59)
+
+    epochs = days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    epochs[~valid] = MISSING_TIMESTAMP
+    return epochs
+
+
+def meitrack_dates_to_datetime64(stamps):
+    """
+    Function to convert a batch of meitrack dates to a numpy datetime64 array.
+
+    Stamps that are empty or invalid are stored as NaT. Requires numpy.
+    :param stamps: Iterable of meitrack dates as bytes
+    :return: numpy datetime64[s] array
+    """
+    if numpy is None:
+        raise ImportError("numpy is required for datetime64 conversion")
+    return meitrack_dates_to_epoch(stamps, use_numpy=True).view("datetime64[s]")
+
+
+def clear_date_cache():
+    """
+    Function to empty the date conversion caches
+    :return: None
+    """
+    cached_datetime.cache_clear()
+    cached_epoch.cache_clear()
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    import time
+
+    stamps = [b"1803230236%02d" % (second % 60,) for second in range(100000)]
+    for name, function in (
+            ("strptime", lambda stamp: datetime.datetime.strptime(stamp.decode() + "Z", "%y%m%d%H%M%SZ")),
+            ("cached", parse_meitrack_date),
+            ("epoch", meitrack_date_to_epoch),
+    ):
+        clear_date_cache()
+        start = time.perf_counter()
+        for stamp in stamps:
+            function(stamp)
+        print("{:<10} {:.3f} seconds for {} dates".format(name, time.perf_counter() - start, len(stamps)))
+
+    start = time.perf_counter()
+    meitrack_dates_to_epoch(stamps)
+    print("{:<10} {:.3f} seconds for {} dates".format("batch", time.perf_counter() - start, len(stamps)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,8 @@
 """
 Library for managing event codes and mappings to text
 """
+import collections
 import logging
-from functools import singledispatch
 
 logger = logging.getLogger(__name__)
 
@@ -147,11 +147,135 @@ EVENT_MAP_T366 = {
 EVENT_MAP_T366G = EVENT_MAP_T366.copy()
 
 
-@singledispatch
-def event_to_name(event_code: int, event_map: dict=EVENT_MAP_T333) -> str:
+# Event codes below this are interned as bytes and strings
+INTERNED_EVENT_CODES = 256
+# The event code of an AAA command starts after "AAA," and is read from a prefix of this many bytes
+EVENT_CODE_START = 4
+EVENT_CODE_SCAN_SIZE = 8
+
+
+class EventTable:
+    """
+    Precompiled event lookup table for one event map.
+
+    Names are held in a list indexed by event code, and the byte and string
+    forms of the codes are interned in a dictionary so a lookup is two
+    indexing operations. The table is compiled from the map when it is built,
+    so it must be rebuilt after the map is changed.
+    """
+    __slots__ = ("event_map", "names", "codes")
+
+    def __init__(self, event_map):
+        """
+        Constructor for the event table
+        :param event_map: Dictionary of event code to event name
+        >>> table = EventTable(EVENT_MAP_T333)
+        >>> table.code(b"35"), table.name(b"35"), table.name(35), table.name("200")
+        (35, 'Track By Time Interval', 'Track By Time Interval', None)
+        """
+        self.rebuild(event_map)
+
+    def rebuild(self, event_map=None):
+        """
+        Function to recompile the table from its event map
+        :param event_map: Dictionary of event code to event name replacing the current map, or None to keep it
+        :return: None
+        >>> table = EventTable({2: "Engine On"})
+        >>> table.event_map[300] = "Custom"
+        >>> table.rebuild()
+        >>> table.name(b"300")
+        'Custom'
+        """
+        if event_map is not None:
+            self.event_map = event_map
+        event_map = self.event_map
+        self.names = [None] * (max(event_map) + 1)
+        for event_code, name in event_map.items():
+            self.names[event_code] = name
+        self.codes = {}
+        for event_code in range(max(len(self.names), INTERNED_EVENT_CODES)):
+            self.codes[str(event_code).encode()] = event_code
+            self.codes[str(event_code)] = event_code
+
+    def code(self, event_code):
+        """
+        Function to convert an event code to an integer
+        :param event_code: The event code as an integer, string or byte string
+        :return: The event code as an integer, or None if it is not a number
+        """
+        code = self.codes.get(event_code)
+        if code is not None or isinstance(event_code, int):
+            return event_code if code is None else code
+        try:
+            return int(event_code)
+        except (TypeError, ValueError) as err:
+            logger.error("Unable to process integer from %s with error: %s", event_code, err)
+        return None
+
+    def name(self, event_code):
+        """
+        Function to convert an event code to the event name
+        :param event_code: The event code as an integer, string or byte string
+        :return: The name of the event as a string, or None if unknown
+        """
+        code = self.codes.get(event_code)
+        if code is None:
+            code = self.code(event_code)
+        if code is not None and 0 <= code < len(self.names):
+            name = self.names[code]
+            if name is not None:
+                return name
+        logger.error("Unable to lookup event code %s", event_code)
+        return None
+
+
+EVENT_TABLE_T333 = EventTable(EVENT_MAP_T333)
+EVENT_TABLE_T366 = EventTable(EVENT_MAP_T366)
+EVENT_TABLE_T366G = EventTable(EVENT_MAP_T366G)
+# Tables for the event maps in this module, keyed by the identity of the map
+EVENT_TABLES = {
+    id(table.event_map): table for table in (EVENT_TABLE_T333, EVENT_TABLE_T366, EVENT_TABLE_T366G)
+}
+# Event tables of device types that do not use the T333 events
+DEVICE_EVENT_TABLES = {
+    "T366G": EVENT_TABLE_T366G,
+}
+
+
+def rebuild_event_tables():
+    """
+    Function to recompile the event tables after an EVENT_MAP_* dictionary in this module is changed or replaced
+    :return: None
+    >>> EVENT_MAP_T366G[300] = "Custom"
+    >>> rebuild_event_tables()
+    >>> event_table_for("T366G").name(b"300"), event_to_name(b"300", EVENT_MAP_T366G)
+    ('Custom', 'Custom')
+    >>> del EVENT_MAP_T366G[300]
+    >>> rebuild_event_tables()
+    """
+    EVENT_TABLE_T333.rebuild(EVENT_MAP_T333)
+    EVENT_TABLE_T366.rebuild(EVENT_MAP_T366)
+    EVENT_TABLE_T366G.rebuild(EVENT_MAP_T366G)
+    EVENT_TABLES.clear()
+    for table in (EVENT_TABLE_T333, EVENT_TABLE_T366, EVENT_TABLE_T366G):
+        EVENT_TABLES[id(table.event_map)] = table
+
+
+def event_table_for(device_type):
+    """
+    Function to select the event table for a device type
+    :param device_type: The string representation of the device type.
+    :return: The EventTable for the device type
+    >>> event_table_for("T366G") is EVENT_TABLE_T366G, event_table_for(None) is EVENT_TABLE_T333
+    (True, True)
     """
-    Function to convert event code as an integer to a event name string
-    :param event_code: The event code
+    return DEVICE_EVENT_TABLES.get(device_type, EVENT_TABLE_T333)
+
+
+def event_to_name(event_code, event_map=EVENT_MAP_T333):
+    """
+    Function to convert event code to a event name string
+    :param event_code: The event code as an integer, string or byte string
     :param event_map: The event mapping table to use
     :return: The name of the event as a string.
     >>> event_to_name(145)
@@ -164,49 +288,23 @@ def event_to_name(event_code: int, event_map: dict=EVENT_MAP_T333) -> str:
     'Engine On'
     >>> event_to_name(b"2", EVENT_MAP_T366)
     'Engine On'
+    >>> event_to_name(b"2", {2: "Custom"})
+    'Custom'
     """
-    return_str = event_map.get(event_code)
+    table = EVENT_TABLES.get(id(event_map))
+    if table is not None and table.event_map is event_map:
+        return table.name(event_code)
+    code = EVENT_TABLE_T333.code(event_code)
+    return_str = event_map.get(code)
     if not return_str:
         logger.error("Unable to lookup event code %s", event_code)
-
     return return_str
 
 
-@event_to_name.register(str)
-def _(event_code: str, event_map: dict=EVENT_MAP_T333) -> str:
+def event_to_id(event_code):
     """
-    Function to convert event code as an string to a event name string
-    :param event_code: The event code
-    :param event_map: The event mapping table to use
-    :return: The name of the event as a string.
-    """
-    try:
-        lookup_value = int(event_code)
-        return event_to_name(lookup_value, event_map=event_map)
-    except ValueError as err:
-        logger.error("Unable to process integer from string %s with error: %s", event_code, err)
-
-
-@event_to_name.register(bytes)
-def _(event_code: bytes, event_map: dict=EVENT_MAP_T333) -> str:
-    """
-    Function to convert event code as an byte string to a event name string
-    :param event_code: The event code
-    :param event_map: The event mapping table to use
-    :return: The name of the event as a string.
-    """
-    try:
-        lookup_value = int(event_code.decode())
-        return event_to_name(lookup_value, event_map=event_map)
-    except ValueError as err:
-        logger.error("Unable to process integer from bytes %s with error %s", event_code, err)
-
-
-@singledispatch
-def event_to_id(event_code: int) -> int:
-    """
-    Function to convert event code as an integer to a event code integer
-    :param event_code: The event code
+    Function to convert event code to a event code integer
+    :param event_code: The event code as an integer, string or byte string
     :return: The event code as an integer.
     >>> event_to_id(145)
     145
@@ -215,35 +313,48 @@ def event_to_id(event_code: int) -> int:
     >>> event_to_id(b"145")
     145
     """
-    return event_code
+    code = EVENT_TABLE_T333.codes.get(event_code)
+    if code is not None:
+        return code
+    if event_code is None or isinstance(event_code, int):
+        return event_code
+    return EVENT_TABLE_T333.code(event_code)
 
 
-@event_to_id.register(str)
-def _(event_code: str) -> str:
+def event_histogram(frames):
     """
-    Function to convert event code as a string to a event code string
-    :param event_code: The event code
-    :return: The name of the event as a string.
-    """
-    try:
-        lookup_value = int(event_code)
-        return event_to_id(lookup_value)
-    except ValueError as err:
-        logger.error("Unable to process integer from string %s with error: %s", event_code, err)
-
+    Function to count the events of the AAA reports in a list of frames by imei and event code.
 
-@event_to_id.register(bytes)
-def _(event_code: bytes) -> str:
-    """
-    Function to convert event code as a byte string to a event code string
-    :param event_code: The event code
-    :return: The name of the event as a string.
+    The event code is read from the command body without parsing the rest of the report.
+    :param frames: Iterable of GPRS, GPRSFrame or CompactGPRS objects
+    :return: Counter of (imei, event code) tuples
+    >>> from meitrack.gprs_protocol import GPRS
+    >>> event_histogram([GPRS(b'$$A35,0407,AAA,35,24.819116,121.026091*00\\r\\n')] * 2)
+    Counter({(b'0407', 35): 2})
+    >>> event_histogram([GPRS(b'$$A35,0407,AAA,109*00\\r\\n'), GPRS(b'$$A35,0407,AAA*00\\r\\n')])
+    Counter({(b'0407', 109): 1})
     """
-    try:
-        lookup_value = int(event_code.decode())
-        return event_to_id(lookup_value)
-    except ValueError as err:
-        logger.error("Unable to process integer from bytes %s with error: %s", event_code, err)
+    counts = collections.Counter()
+    codes = EVENT_TABLE_T333.codes
+    scan_end = EVENT_CODE_START + EVENT_CODE_SCAN_SIZE
+    for frame in frames:
+        if bytes(frame.command_type) != b"AAA":
+            continue
+        # Only the bytes up to the comma after the event code are copied
+        leftover = frame.leftover
+        event_code = bytes(leftover[EVENT_CODE_START:scan_end])
+        comma = event_code.find(b",")
+        if comma >= 0:
+            event_code = event_code[:comma]
+        elif len(leftover) > scan_end:
+            continue
+        code = codes.get(event_code)
+        if code is None:
+            code = EVENT_TABLE_T333.code(event_code)
+            if code is None:
+                continue
+        counts[(bytes(frame.imei), code)] += 1
+    return counts
 
 
 def main():
@@ -0,0 +1,298 @@
+"""
+Module for decoding the io port status and analog input fields of meitrack reports.
+
+The digital pin states are held as one integer bitmask so a pin test or a
+comparison with the previous report from a device is a single integer
+operation.
+"""
+import array
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+MISSING_MASK = -1
+MISSING_ANALOG = float("nan")
+# Analog inputs are reported in hundredths of a volt
+ANALOG_SCALE = 100
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+
+
+def hex_field_to_int(field):
+    """
+    Function to convert a hexadecimal io field to an integer.
+
+    Unlike int(field, 16) the 0x prefix, signs, underscores and whitespace are rejected.
+    :param field: The hexadecimal field as bytes
+    :return: The integer value
+    >>> hex_field_to_int(b'0401')
+    1025
+    >>> hex_field_to_int(b' -0x1')
+    Traceback (most recent call last):
+        ...
+    ValueError: Invalid hexadecimal field b' -0x1'
+    """
+    if not field or bytes(field).translate(None, HEX_DIGITS):
+        raise ValueError("Invalid hexadecimal field %s" % (field,))
+    return int(field, 16)
+
+
+class IoState:
+    """
+    Digital pin states of a report held as an integer bitmask. Pin 0 is the least significant bit.
+    """
+    __slots__ = ("mask", "width")
+
+    def __init__(self, mask=0, width=16):
+        """
+        Constructor for the io state
+        :param mask: The pin states as an integer bitmask
+        :param width: The number of pins reported
+        >>> state = IoState.from_hex(b'0401')
+        >>> state.is_set(10), state.is_set(1), state.set_pins()
+        (True, False, [0, 10])
+        """
+        self.mask = mask
+        self.width = width
+
+    @classmethod
+    def from_hex(cls, io_string):
+        """
+        Function to build the io state from the hexadecimal io_port_status field
+        :param io_string: The hexadecimal representation of the pin states
+        :return: IoState for the field
+        :raises ValueError: If the field is not hexadecimal digits
+        """
+        return cls(hex_field_to_int(io_string), len(io_string) * 4)
+
+    def is_set(self, pin):
+        """
+        Helper function to check whether a pin is on
+        :param pin: The pin number
+        :return: True if the pin is on
+        """
+        return self.mask >> pin & 1 == 1
+
+    def changed(self, previous):
+        """
+        Function to find the pins that changed since a previous state
+        :param previous: The previous IoState, or None to treat every pin as previously off
+        :return: Bitmask of the changed pins
+        >>> IoState(0b0110).changed(IoState(0b0011))
+        5
+        """
+        if previous is None:
+            return self.mask
+        return self.mask ^ previous.mask
+
+    def rising(self, previous):
+        """
+        Function to find the pins that turned on since a previous state
+        :param previous: The previous IoState, or None to treat every pin as previously off
+        :return: Bitmask of the pins that turned on
+        >>> IoState(0b0110).rising(IoState(0b0011))
+        4
+        """
+        return self.changed(previous) & self.mask
+
+    def falling(self, previous):
+        """
+        Function to find the pins that turned off since a previous state
+        :param previous: The previous IoState, or None to treat every pin as previously off
+        :return: Bitmask of the pins that turned off
+        >>> IoState(0b0110).falling(IoState(0b0011))
+        1
+        """
+        return self.changed(previous) & ~self.mask
+
+    def set_pins(self):
+        """
+        Function to list the pins that are on
+        :return: List of pin numbers
+        """
+        return [pin for pin in range(self.mask.bit_length()) if self.mask >> pin & 1]
+
+    def to_dict(self):
+        """
+        Function to convert the state to a dictionary of pin number to pin state
+        :return: Dictionary of pin states for every reported pin
+        """
+        return {pin: self.mask >> pin & 1 == 1 for pin in range(self.width)}
+
+    def __int__(self):
+        return self.mask
+
+    def __eq__(self, other):
+        if not isinstance(other, IoState):
+            return NotImplemented
+        return self.mask == other.mask
+
+    def __hash__(self):
+        return hash(self.mask)
+
+    def __repr__(self):
+        return "IoState(0x%0*X)" % (max(self.width // 4, 1), self.mask)
+
+
+class IoChangeTracker:
+    """
+    Class holding the last io bitmask of each device to detect pin edges across a fleet.
+
+    The first report from a device sets its baseline and reports no edges, so a
+    restart or reconnect does not report the pins already on as turning on.
+    """
+    def __init__(self, baseline=None):
+        """
+        Constructor for the change tracker
+        :param baseline: Bitmask unseen devices are compared against, or None to take the first report as the baseline
+        >>> tracker = IoChangeTracker()
+        >>> tracker.update(b'0407', 0b0011), tracker.update(b'0407', 0b0110)
+        ((0, 0), (4, 1))
+        >>> IoChangeTracker(baseline=0).update(b'0407', 0b0011)
+        (3, 0)
+        """
+        self.baseline = baseline
+        self.masks = {}
+
+    def update(self, device, mask):
+        """
+        Function to record the latest io bitmask of a device
+        :param device: The device key, such as the imei
+        :param mask: The io bitmask or IoState of the latest report
+        :return: Tuple of the bitmasks of the pins that turned on and turned off
+        """
+        mask = int(mask)
+        previous = self.masks.get(device, self.baseline)
+        self.masks[device] = mask
+        if previous is None:
+            return 0, 0
+        changed = previous ^ mask
+        return changed & mask, changed & previous
+
+
+def decode_io_states(io_strings, use_numpy=None):
+    """
+    Function to decode a batch of io_port_status fields into bitmasks.
+
+    Fields that are empty, not hexadecimal digits or too large for a signed 64 bit
+    integer are stored as MISSING_MASK.
+    :param io_strings: Iterable of hexadecimal io_port_status fields
+    :param use_numpy: Return a numpy array. Defaults to True when numpy is available.
+    :return: numpy int64 array, or array.array of signed 64 bit integers without numpy
+    >>> decode_io_states([b'0400', b'', b'0003', b'0x03', b' 3'], use_numpy=False).tolist()
+    [1024, -1, 3, -1, -1]
+    >>> decode_io_states([b'10000000000000000', b'FFFFFFFFFFFFFFFF', b'0400'], use_numpy=False).tolist()
+    [-1, -1, 1024]
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    masks = array.array("q")
+    for io_string in io_strings:
+        try:
+            masks.append(hex_field_to_int(io_string))
+        except (TypeError, ValueError, OverflowError):
+            masks.append(MISSING_MASK)
+    if not use_numpy:
+        return masks
+    return numpy.frombuffer(masks, dtype=numpy.int64)
+
+
+def decode_analog_inputs(analog_strings, channels=None, use_numpy=None):
+    """
+    Function to decode a batch of analog_input_value fields into volts for each channel.
+
+    Values that are empty or not hexadecimal digits are stored as MISSING_ANALOG.
+    :param analog_strings: Iterable of '|' separated hexadecimal analog_input_value fields
+    :param channels: The number of channels to decode. Defaults to the most found in a field.
+    :param use_numpy: Return a numpy array. Defaults to True when numpy is available.
+    :return: numpy float64 array with a row per field and a column per channel, or a list of
+        array.array columns, one per channel, without numpy
+    >>> columns = decode_analog_inputs([b'0000|0000|0000|018D|0579', b'0400'], use_numpy=False)
+    >>> [column.tolist()[0] for column in columns], columns[0][1], len(columns)
+    ([0.0, 0.0, 0.0, 3.97, 14.01], 10.24, 5)
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    rows = [analog_string.split(b"|") if analog_string else [] for analog_string in analog_strings]
+    if channels is None:
+        channels = max((len(row) for row in rows), default=0)
+    columns = [array.array("d") for _ in range(channels)]
+    for row in rows:
+        row_length = len(row)
+        for channel, column in enumerate(columns):
+            value = MISSING_ANALOG
+            if channel < row_length and row[channel]:
+                try:
+                    value = hex_field_to_int(row[channel]) / ANALOG_SCALE
+                except ValueError:
+                    logger.error("Unable to convert analog input %s", row[channel])
+            column.append(value)
+    if not use_numpy:
+        return columns
+    if not columns:
+        return numpy.empty((len(rows), 0))
+    return numpy.stack([numpy.frombuffer(column, dtype=numpy.float64) for column in columns], axis=1)
+
+
+def calibrate_analog(values, devices, calibrations):
+    """
+    Function to apply per device calibration tables to decoded analog inputs.
+
+    Each table is a list of (scale, offset) tuples, one per channel, giving
+    value * scale + offset. Devices without a table are left unchanged.
+    :param values: Analog values as returned by decode_analog_inputs
+    :param devices: Iterable of the device key, such as the imei, of each row
+    :param calibrations: Dictionary of device key to calibration table
+    :return: Calibrated values in the same form as the input
+    >>> columns = decode_analog_inputs([b'0064|00C8', b'0064|00C8'], use_numpy=False)
+    >>> calibrated = calibrate_analog(columns, [b'0407', b'0408'], {b'0407': [(2.0, 0.5), (1.0, -1.0)]})
+    >>> [column.tolist() for column in calibrated]
+    [[2.5, 1.0], [1.0, 2.0]]
+    >>> if numpy is not None:
+    ...     values = decode_analog_inputs([b'0064|00C8', b'0064|00C8'], use_numpy=True)
+    ...     calibrated = calibrate_analog(values, [b'0407', b'0408'], {b'0407': [(2.0, 0.5), (1.0, -1.0)]})
+    ...     assert calibrated.T.tolist() == [[2.5, 1.0], [1.0, 2.0]]
+    """
+    devices = list(devices)
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        # Row 0 of the stacked tables leaves devices without a calibration unchanged
+        channels = values.shape[1]
+        scales = numpy.ones((len(calibrations) + 1, channels))
+        offsets = numpy.zeros((len(calibrations) + 1, channels))
+        table_indices = {}
+        for index, (device, table) in enumerate(calibrations.items(), 1):
+            table = table[:channels]
+            table_indices[device] = index
+            scales[index, :len(table)] = [scale for scale, _ in table]
+            offsets[index, :len(table)] = [offset for _, offset in table]
+        rows = numpy.fromiter(
+            (table_indices.get(device, 0) for device in devices), dtype=numpy.intp, count=len(devices)
+        )
+        return values * scales[rows] + offsets[rows]
+
+    calibrated = [array.array("d", column) for column in values]
+    for row, device in enumerate(devices):
+        table = calibrations.get(device)
+        if table is None:
+            continue
+        for column, (scale, offset) in zip(calibrated, table):
+            column[row] = column[row] * scale + offset
+    return calibrated
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    state = IoState.from_hex(b"0401")
+    print(state, state.set_pins(), state.to_dict())
+    print(decode_io_states([b"0400", b"0401", b"0003"], use_numpy=False).tolist())
+    print([column.tolist() for column in decode_analog_inputs([b"0000|0000|0000|018D|0579"], use_numpy=False)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+"""
+Module for describing the field layout of meitrack commands.
+
+A schema is compiled once for each command layout and shared by every command
+with that layout, so parsing a payload is a single split followed by the
+converters for the few fields that need them.
+"""
+import logging
+import time
+
+from meitrack.error import GPRSParameterError, GPRSParseError
+from meitrack.metrics import ERROR_FIELD_COUNT, count_parse_error, registry
+from meitrack.trace import FIELD_SPLIT, tracer
+
+logger = logging.getLogger(__name__)
+
+timings_enabled = False
+schema_timings = {}
+field_converters = {}
+projection_profiles = {}
+
+
+def register_converter(name, converter):
+    """
+    Function to register the converter applied to a field name.
+
+    The converters of every cached and registered schema using the registered
+    field converters are recompiled.
+    :param name: The field name
+    :param converter: Function converting the raw field bytes
+    :return: None
+    >>> schema = schema_for(["command", "test_count"])
+    >>> register_converter("test_count", int)
+    >>> schema.parse(b'Z01,7')
+    [b'Z01', 7]
+    >>> unregister_converter("test_count")
+    >>> schema.parse(b'Z01,7')
+    [b'Z01', b'7']
+    >>> del schema_cache[(schema.names, None)]
+    """
+    field_converters[name] = converter
+    recompile_converters()
+
+
+def unregister_converter(name):
+    """
+    Function to remove the converter registered for a field name
+    :param name: The field name
+    :return: None
+    """
+    if field_converters.pop(name, None) is not None:
+        recompile_converters()
+
+
+def recompile_converters():
+    """
+    Function to recompile the converters of the cached and registered schemas after a converter changes
+    :return: None
+    """
+    for schema in set(schema_cache.values()) | set(schema_registry.values()):
+        if schema.default_converters:
+            schema.compile_converters(field_converters)
+
+
+class FieldSchema:
+    """
+    Class holding the ordered field names of a command layout, their positions and converters.
+    """
+    __slots__ = ("names", "index", "converters", "default_converters", "max_split", "label", "projections")
+
+    def __init__(self, names, converters=None, max_split=None, label=None):
+        """
+        Constructor for the field schema
+        :param names: The ordered list of field names
+        :param converters: Dictionary of field name to a function converting the raw field.
+            Defaults to the registered field converters.
+        :param max_split: The maximum number of times to split the payload
+        :param label: Name of the schema used when reporting timings
+        >>> schema = FieldSchema(["command", "event_code"], converters={"event_code": int})
+        >>> schema.names, schema.index["event_code"], schema.parse(b'AAA,35')
+        (('command', 'event_code'), 1, [b'AAA', 35])
+        """
+        self.names = tuple(names)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.default_converters = converters is None
+        self.max_split = max_split
+        self.label = label if label is not None else ",".join(self.names)
+        self.compile_converters(field_converters if converters is None else converters)
+
+    def __len__(self):
+        return len(self.names)
+
+    def compile_converters(self, converters):
+        """
+        Function to compile the converter slots of the schema and clear the compiled projections
+        :param converters: Dictionary of field name to a function converting the raw field
+        :return: None
+        """
+        self.converters = tuple(
+            (position, converters[name]) for position, name in enumerate(self.names) if name in converters
+        )
+        self.projections = {}
+
+    def parse(self, payload, max_split=None):
+        """
+        Function to split a payload into its field values
+        :param payload: The meitrack protocol payload
+        :param max_split: The maximum number of times to split. Defaults to the schema value.
+        :return: List of field values in schema order
+        >>> FieldSchema(["command", "response"]).parse(b'A11,OK,EXTRA')
+        Traceback (most recent call last):
+            ...
+        meitrack.error.GPRSParseError: ('Incorrect number of fields for data. Data field length is ', 3, ...
+        """
+        start = time.perf_counter() if timings_enabled else None
+        if max_split is None:
+            max_split = self.max_split
+        if max_split:
+            fields = payload.split(b',', max_split)
+        else:
+            fields = payload.split(b',')
+        if len(self.names) < len(fields):
+            raise self.field_count_error(len(fields), payload)
+        field_count = len(fields)
+        for position, converter in self.converters:
+            if position < field_count:
+                fields[position] = converter(fields[position])
+        if start is not None:
+            record_timing(self.label, time.perf_counter() - start)
+        if tracer.enabled:
+            tracer.emit(FIELD_SPLIT, self.label, payload, fields)
+        return fields
+
+    def field_count_error(self, field_count, payload):
+        """
+        Function to build the error for a payload with more fields than the schema
+        :param field_count: The number of fields in the payload
+        :param payload: The meitrack protocol payload
+        :return: GPRSParseError describing the payload
+        """
+        logger.log(13, "%s %s", field_count, len(self.names))
+        if registry.enabled:
+            count_parse_error(ERROR_FIELD_COUNT)
+        return GPRSParseError(
+            "Incorrect number of fields for data. Data field length is ", field_count,
+            " but should be ", len(self.names), ". Fields should be ",
+            str(list(self.names)), ", Data was: ", str(payload)
+        )
+
+    def projection(self, wanted):
+        """
+        Function to compile the split count and field slots needed for a set of field names
+        :param wanted: frozenset of the field names to parse
+        :return: Tuple of the number of splits and a tuple of (position, name, converter) slots
+        >>> FieldSchema(["command", "event_code", "latitude"]).projection(frozenset(["event_code"]))
+        (2, ((1, 'event_code', None),))
+        """
+        compiled = self.projections.get(wanted)
+        if compiled is None:
+            converters = dict(self.converters)
+            positions = sorted(self.index[name] for name in wanted if name in self.index)
+            compiled = (
+                positions[-1] + 1 if positions else 0,
+                tuple((position, self.names[position], converters.get(position)) for position in positions),
+            )
+            self.projections[wanted] = compiled
+        return compiled
+
+    def parse_projection(self, payload, wanted):
+        """
+        Function to parse only the wanted fields of a payload.
+
+        The payload is split only as far as the last wanted field and only the
+        wanted fields are converted.
+        :param payload: The meitrack protocol payload
+        :param wanted: frozenset of the field names to parse
+        :return: Dictionary of field name to value for the wanted fields present in the payload
+        >>> schema = FieldSchema(["command", "event_code", "latitude", "longitude"], converters={"latitude": float})
+        >>> schema.parse_projection(b'AAA,35,24.819116,121.026091', frozenset(["latitude"]))
+        {'latitude': 24.819116}
+        """
+        start = time.perf_counter() if timings_enabled else None
+        field_count = payload.count(b',') + 1
+        if len(self.names) < field_count:
+            raise self.field_count_error(field_count, payload)
+        splits, slots = self.projection(wanted)
+        fields = payload.split(b',', splits)
+        values = {}
+        for position, name, converter in slots:
+            if position < field_count:
+                values[name] = fields[position] if converter is None else converter(fields[position])
+        if start is not None:
+            record_timing(self.label + " projected", time.perf_counter() - start)
+        if tracer.enabled:
+            tracer.emit(FIELD_SPLIT, self.label + " projected", payload, values)
+        return values
+
+    def __str__(self):
+        """
+        String representation of the field schema
+        :return: String representation of the field schema
+        """
+        return "FieldSchema(%s)" % (", ".join(self.names),)
+
+
+schema_cache = {}
+
+
+def schema_for(names, max_split=None):
+    """
+    Function to get the shared schema for a list of field names
+    :param names: The ordered list of field names
+    :param max_split: The maximum number of times to split the payload if the schema is created
+    :return: The FieldSchema for the names
+    >>> schema_for(["command", "response"]) is schema_for(["command", "response"])
+    True
+    >>> schema_for(["command", "response"]) is schema_for(["command", "response"], max_split=1)
+    False
+    """
+    key = (tuple(names), max_split)
+    schema = schema_cache.get(key)
+    if schema is None:
+        logger.log(13, "Creating schema for %s", key)
+        schema = FieldSchema(names, max_split=max_split)
+        schema_cache[key] = schema
+    return schema
+
+
+schema_registry = {}
+
+
+def register_schema(command_type, direction, names, max_split=None, variant=None):
+    """
+    Function to compile and register the schema for a command, direction and variant.
+
+    Commands with the same layout share one schema, labelled with all of them.
+    :param command_type: The command type as bytes
+    :param direction: Direction of message, client to server or server to client.
+    :param names: The ordered list of field names
+    :param max_split: The maximum number of times to split the payload
+    :param variant: Optional variant of the layout, such as the event code of an AAA report
+    :return: The registered FieldSchema
+    >>> register_schema(b"Z01", 1, ["command", "test_value"], max_split=1).label
+    'Z01/1'
+    >>> register_schema(b"Z02", 1, ["command", "test_value"], max_split=1).label
+    'Z01/1 Z02/1'
+    >>> lookup_schema(b"Z01", 1, b"35") is lookup_schema(b"Z02", 1)
+    True
+    >>> register_schema(b"Z03", 1, ["command", "test_value"]).label
+    'Z03/1'
+    >>> for command_type in (b"Z01", b"Z02", b"Z03"): _ = unregister_schema(command_type, 1)
+    >>> lookup_schema(b"Z01", 1), (("command", "test_value"), 1) in schema_cache
+    (None, False)
+    """
+    label = schema_label(command_type, direction, variant)
+    key = (tuple(names), max_split)
+    schema = schema_cache.get(key)
+    if schema is None or schema.label == ",".join(schema.names):
+        schema = FieldSchema(names, max_split=max_split, label=label)
+        schema_cache[key] = schema
+    elif label not in schema.label.split(" "):
+        schema.label += " " + label
+    schema_registry[(command_type, direction, variant)] = schema
+    return schema
+
+
+def unregister_schema(command_type, direction, variant=None):
+    """
+    Function to remove the schema registered for a command, direction and variant.
+
+    The schema is dropped from the schema cache once no other command is registered with it.
+    :param command_type: The command type as bytes
+    :param direction: Direction of message, client to server or server to client.
+    :param variant: Optional variant of the layout
+    :return: The removed FieldSchema or None if none was registered
+    """
+    schema = schema_registry.pop((command_type, direction, variant), None)
+    if schema is None:
+        return None
+    if any(registered is schema for registered in schema_registry.values()):
+        label = schema_label(command_type, direction, variant)
+        schema.label = " ".join(part for part in schema.label.split(" ") if part != label)
+    else:
+        key = (schema.names, schema.max_split)
+        if schema_cache.get(key) is schema:
+            del schema_cache[key]
+    return schema
+
+
+def schema_label(command_type, direction, variant=None):
+    """
+    Helper function to build the label a command, direction and variant add to their schema
+    :param command_type: The command type as bytes
+    :param direction: Direction of message, client to server or server to client.
+    :param variant: Optional variant of the layout
+    :return: The label as a string
+    >>> schema_label(b"AAA", 1, b"37")
+    'AAA/1/37'
+    """
+    label = "%s/%s" % (command_type.decode(), direction)
+    if variant is not None:
+        label += "/%s" % (variant.decode(),)
+    return label
+
+
+def lookup_schema(command_type, direction, variant=None):
+    """
+    Function to find the registered schema for a command, falling back to the default variant
+    :param command_type: The command type as bytes
+    :param direction: Direction of message, client to server or server to client.
+    :param variant: Optional variant of the layout
+    :return: The registered FieldSchema or None
+    """
+    schema = schema_registry.get((command_type, direction, variant))
+    if schema is None and variant is not None:
+        schema = schema_registry.get((command_type, direction, None))
+    return schema
+
+
+def register_projection(name, names):
+    """
+    Function to register a named projection profile
+    :param name: The name of the profile
+    :param names: The field names parsed for the profile
+    :return: None
+    """
+    projection_profiles[name] = frozenset(names)
+
+
+def resolve_projection(fields):
+    """
+    Function to convert a projection to the set of field names it parses
+    :param fields: None, the name of a registered profile, or an iterable of field names
+    :return: frozenset of field names, or None to parse every field
+    >>> sorted(resolve_projection(["speed", "latitude"]))
+    ['latitude', 'speed']
+    >>> resolve_projection("unknown_profile")
+    Traceback (most recent call last):
+        ...
+    meitrack.error.GPRSParameterError: Unknown projection profile unknown_profile
+    """
+    if fields is None or isinstance(fields, frozenset):
+        return fields
+    if isinstance(fields, str):
+        try:
+            return projection_profiles[fields]
+        except KeyError:
+            raise GPRSParameterError("Unknown projection profile %s" % (fields,))
+    return frozenset(fields)
+
+
+def enable_timings(enabled=True):
+    """
+    Function to turn recording of per schema parse timings on or off
+    :param enabled: True to record timings
+    :return: None
+    """
+    global timings_enabled
+    timings_enabled = enabled
+
+
+def record_timing(label, elapsed):
+    """
+    Function to add a parse time to the totals for a schema
+    :param label: The schema label
+    :param elapsed: The parse time in seconds
+    :return: None
+    """
+    timing = schema_timings.get(label)
+    if timing is None:
+        schema_timings[label] = [1, elapsed]
+    else:
+        timing[0] += 1
+        timing[1] += elapsed
+
+
+def timing_report():
+    """
+    Function to summarise the recorded parse timings for each schema
+    :return: Dictionary of schema label to the count, total and mean parse time in seconds
+    >>> enable_timings()
+    >>> _ = FieldSchema(["command"], label="test").parse(b'A10')
+    >>> enable_timings(False)
+    >>> timing_report()["test"]["count"]
+    1
+    >>> del schema_timings["test"]
+    """
+    return {
+        label: {"count": count, "total": total, "mean": total / count}
+        for label, (count, total) in schema_timings.items()
+    }
+
+
+def reset_timings():
+    """
+    Function to clear the recorded parse timings
+    :return: None
+    """
+    schema_timings.clear()
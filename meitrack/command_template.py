@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+"""
+Library for building outbound gprs messages from precompiled templates.
+
+The checksum of a message is the byte sum of the message modulo 256, so it can
+be composed from the sum of the command body, which is calculated once per
+template, and the sums of the imei, data identifier and length field for each
+device.
+"""
+import collections
+import logging
+
+from meitrack.checksum import CHECKSUM_HEX
+from meitrack.common import END_OF_MESSAGE_STRING, s2b
+from meitrack.error import GPRSError
+from meitrack.gprs_protocol import counter_to_identifier
+from meitrack.trace import ENCODE, tracer
+
+logger = logging.getLogger(__name__)
+
+# Placeholder imei used when compiling a template from a builder
+TEMPLATE_IMEI = b"0"
+COMMA = ord(",")
+TEMPLATE_CACHE_SIZE = 1024
+# The checksum and end of message for each checksum value
+CHECKSUM_TRAILERS = [checksum + END_OF_MESSAGE_STRING for checksum in CHECKSUM_HEX]
+
+
+class CommandTemplate:
+    """
+    Class holding a pre-encoded command body ready to be stamped with an imei and counter.
+    """
+    __slots__ = ("direction", "data_identifier", "body", "tail", "base_sum", "base_length")
+
+    def __init__(self, direction, data_identifier, body):
+        """
+        Constructor for the command template
+        :param direction: The message prefix as a byte string
+        :param data_identifier: The data identifier used when no counter is given
+        :param body: The command and its parameters as a byte string
+        >>> template = CommandTemplate(b'@@', b'l', b'A11,3')
+        >>> template.render(b'0407')
+        b'@@l16,0407,A11,3*A2\\r\\n'
+        """
+        self.direction = direction
+        self.data_identifier = data_identifier
+        self.body = body
+        self.tail = b"," + body + b"*"
+        self.base_sum = sum(direction) + sum(self.tail) + COMMA
+        # Both commas, the '*', the checksum and the end of message around the imei and body
+        self.base_length = len(body) + len(END_OF_MESSAGE_STRING) + 5
+
+    def header(self, imei, counter=None):
+        """
+        Function to build the per device part of the message and its checksum
+        :param imei: The imei of the device as a byte string
+        :param counter: The counter to use in the message header
+        :return: Tuple of the header parts and the checksum value
+        """
+        data_identifier = self.data_identifier if counter is None else counter_to_identifier(counter)
+        data_length = str(self.base_length + len(imei)).encode()
+        checksum = (self.base_sum + data_identifier[0] + sum(data_length) + sum(imei)) & 0xFF
+        return (self.direction, data_identifier, data_length, b",", imei), checksum
+
+    def render(self, imei, counter=None):
+        """
+        Function to build the message for a device
+        :param imei: The imei of the device as a byte string
+        :param counter: The counter to use in the message header
+        :return: Byte representation of the gprs message
+        """
+        parts, checksum = self.header(imei, counter)
+        message = b"".join(parts + (self.tail, CHECKSUM_TRAILERS[checksum]))
+        if tracer.enabled:
+            tracer.emit(ENCODE, self, message)
+        return message
+
+    def render_into(self, output, imei, counter=None):
+        """
+        Function to append the message for a device to a bytearray
+        :param output: The bytearray to append the message to
+        :param imei: The imei of the device as a byte string
+        :param counter: The counter to use in the message header
+        :return: The number of bytes written
+        """
+        parts, checksum = self.header(imei, counter)
+        start = len(output)
+        for part in parts:
+            output += part
+        output += self.tail
+        output += CHECKSUM_TRAILERS[checksum]
+        if tracer.enabled:
+            tracer.emit(ENCODE, self, bytes(output[start:]))
+        return len(output) - start
+
+    def render_parts(self, imei, counter=None):
+        """
+        Function to build the message for a device as a list of buffers for writev.
+
+        The command body is shared between every device rather than copied.
+        :param imei: The imei of the device as a byte string
+        :param counter: The counter to use in the message header
+        :return: List of byte strings making up the message
+        """
+        parts, checksum = self.header(imei, counter)
+        return [b"".join(parts), self.tail, CHECKSUM_TRAILERS[checksum]]
+
+    @classmethod
+    def from_gprs(cls, gprs):
+        """
+        Function to compile a template from a gprs message
+        :param gprs: The GPRS object to compile
+        :return: CommandTemplate with the direction, identifier and command of the message
+        """
+        return cls(gprs.direction, gprs.data_identifier, gprs.leftover)
+
+    def __str__(self):
+        """
+        String representation of the command template
+        :return: String representation of the command template
+        """
+        return "Template %s%s: %s" % (self.direction, self.data_identifier, self.body)
+
+
+# Least recently used templates are dropped once the cache holds TEMPLATE_CACHE_SIZE of them
+template_cache = collections.OrderedDict()
+
+
+def template_for(builder, *args, **kwargs):
+    """
+    Function to get the cached template for a builder and its parameters.
+
+    The builder is any stc_* function that takes the imei as its first
+    parameter and returns a GPRS object or a list of GPRS objects. The cache
+    is bounded, so builders called with many different parameters, such as
+    file names, only keep the most recently used templates.
+    :param builder: The message building function
+    :param args: Parameters for the builder after the imei
+    :param kwargs: Keyword parameters for the builder
+    :return: CommandTemplate, or a list of them if the builder returns a list
+    >>> from meitrack.build_message import stc_set_heartbeat_interval
+    >>> template_for(stc_set_heartbeat_interval, 3) is template_for(stc_set_heartbeat_interval, 3)
+    True
+    >>> for minutes in range(TEMPLATE_CACHE_SIZE + 10): _ = template_for(stc_set_heartbeat_interval, minutes)
+    >>> len(template_cache) == TEMPLATE_CACHE_SIZE, (stc_set_heartbeat_interval, (3,), ()) in template_cache
+    (True, False)
+    >>> clear_templates()
+    """
+    key = (builder, args, tuple(sorted(kwargs.items())))
+    template = template_cache.get(key)
+    if template is not None:
+        template_cache.move_to_end(key)
+    else:
+        logger.log(13, "Compiling template for %s %s %s", builder.__name__, args, kwargs)
+        built = builder(TEMPLATE_IMEI, *args, **kwargs)
+        if built is None or isinstance(built, list) and None in built:
+            raise GPRSError("Builder %s did not return a message" % (builder.__name__,))
+        if isinstance(built, list):
+            template = [CommandTemplate.from_gprs(gprs) for gprs in built]
+        else:
+            template = CommandTemplate.from_gprs(built)
+        template_cache[key] = template
+        if len(template_cache) > TEMPLATE_CACHE_SIZE:
+            template_cache.popitem(last=False)
+    return template
+
+
+def render_command(builder, imei, *args, counter=None, **kwargs):
+    """
+    Function to build a message for a device from a cached template
+    :param builder: The message building function
+    :param imei: The imei of the device
+    :param args: Parameters for the builder after the imei
+    :param counter: The counter to use in the message header. Each further message of a list uses the next counter.
+    :param kwargs: Keyword parameters for the builder
+    :return: Byte representation of the message, or a list of them if the builder returns a list
+    >>> from meitrack.build_message import stc_set_heartbeat_interval
+    >>> render_command(stc_set_heartbeat_interval, b'0407', 3) == stc_set_heartbeat_interval(b'0407', 3).as_bytes()
+    True
+    >>> render_command(stc_set_heartbeat_interval, b'353358017784062', 3, counter=1)
+    b'@@B27,353358017784062,A11,3*BD\\r\\n'
+    >>> def stc_set_heartbeat_intervals(imei, minutes):
+    ...     return [stc_set_heartbeat_interval(imei, minutes), stc_set_heartbeat_interval(imei, minutes + 1)]
+    >>> frames = render_command(stc_set_heartbeat_intervals, b'0407', 3, counter=1)
+    >>> b"".join(frames) == fan_out(template_for(stc_set_heartbeat_intervals, 3), [(b'0407', 1)])[b'0407']
+    True
+    >>> render_command(lambda imei: None, b'0407')
+    Traceback (most recent call last):
+        ...
+    meitrack.error.GPRSError: Builder <lambda> did not return a message
+    >>> clear_templates()
+    """
+    imei = s2b(imei)
+    template = template_for(builder, *args, **kwargs)
+    if isinstance(template, list):
+        return [
+            each_template.render(imei, None if counter is None else counter + offset)
+            for offset, each_template in enumerate(template)
+        ]
+    return template.render(imei, counter)
+
+
+def fan_out(command, targets, connection_for=None, writev=False):
+    """
+    Function to encode one command for many devices, coalescing the frames for each connection.
+
+    The command body is encoded once and only the header and checksum are built
+    for each device.
+    :param command: A CommandTemplate, a GPRS object or a list of either
+    :param targets: Iterable of (imei, counter) tuples. The counter may be None.
+    :param connection_for: Optional function mapping an imei to its connection. Defaults to the imei.
+    :param writev: Return a list of buffers per connection for writev rather than one buffer
+    :return: Dictionary of connection to a bytearray, or to a list of byte strings when writev is set
+    >>> from meitrack.build_message import stc_set_heartbeat_interval
+    >>> frames = fan_out(stc_set_heartbeat_interval(b'0', 3), [(b'0407', 0), (b'0408', 1)])
+    >>> frames[b'0407'] == bytearray(stc_set_heartbeat_interval(b'0407', 3).as_bytes(0))
+    True
+    >>> fan_out(stc_set_heartbeat_interval(b'0', 3), [(b'0407', 0), (b'0408', 1)], lambda imei: "socket", True)
+    {'socket': [b'@@A16,0407', b',A11,3*', b'77\\r\\n', b'@@B16,0408', b',A11,3*', b'79\\r\\n']}
+    """
+    if not isinstance(command, list):
+        command = [command]
+    templates = [
+        template if isinstance(template, CommandTemplate) else CommandTemplate.from_gprs(template)
+        for template in command
+    ]
+
+    buffers = {}
+    for imei, counter in targets:
+        connection = imei if connection_for is None else connection_for(imei)
+        buffer = buffers.get(connection)
+        if buffer is None:
+            buffer = [] if writev else bytearray()
+            buffers[connection] = buffer
+        for offset, template in enumerate(templates):
+            frame_counter = None if counter is None else counter + offset
+            if writev:
+                buffer.extend(template.render_parts(imei, frame_counter))
+            else:
+                template.render_into(buffer, imei, frame_counter)
+    return buffers
+
+
+def clear_templates():
+    """
+    Function to empty the template cache
+    :return: None
+    """
+    template_cache.clear()
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    import time
+    from meitrack.build_message import stc_set_tracking_by_time_interval
+
+    imeis = [str(864507032228727 + count).encode() for count in range(100000)]
+    start = time.perf_counter()
+    for counter, imei in enumerate(imeis):
+        render_command(stc_set_tracking_by_time_interval, imei, 3, counter=counter)
+    print("Rendered {} messages in {:.3f} seconds".format(len(imeis), time.perf_counter() - start))
+    print(render_command(stc_set_tracking_by_time_interval, imeis[0], 3, counter=0))
+
+    start = time.perf_counter()
+    frames = fan_out(
+        template_for(stc_set_tracking_by_time_interval, 3), ((imei, counter) for counter, imei in enumerate(imeis))
+    )
+    print("Fanned out to {} connections in {:.3f} seconds".format(len(frames), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python
+"""
+Library for running an asyncio gateway that meitrack devices connect to.
+
+Each connection has its own StreamFramer and is bound to the IMEI of the first
+frame received on it. Messages for a device are held in a per device queue
+until the device is connected and the connection is accepting writes. Devices
+that are not connected have a shorter queue, and messages held longer than the
+queue ttl are dropped.
+"""
+import asyncio
+import collections
+import logging
+import time
+
+from meitrack.common import DIRECTION_CLIENT_TO_SERVER
+from meitrack.gprs_protocol import StreamFramer
+from meitrack.metrics import DROP_EXPIRED, DROP_QUEUE_FULL, count_dropped_messages, registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HIGH_WATER = 64 * 1024
+DEFAULT_LOW_WATER = 16 * 1024
+DEFAULT_MAX_QUEUE_LENGTH = 1000
+DEFAULT_MAX_OFFLINE_QUEUE_LENGTH = 100
+DEFAULT_QUEUE_TTL = 300
+DEFAULT_EVICT_INTERVAL = 30
+
+
+class DeviceConnection(asyncio.Protocol):
+    """
+    Protocol for a single device connection to the gateway.
+    """
+    def __init__(self, gateway):
+        """
+        Constructor for the device connection
+        :param gateway: The gateway that accepted the connection
+        """
+        self.gateway = gateway
+        self.framer = StreamFramer(
+            DIRECTION_CLIENT_TO_SERVER,
+            device_type=gateway.device_type,
+            idle_timeout=gateway.idle_timeout,
+            zero_copy=gateway.zero_copy,
+            verifier=gateway.verifier,
+        )
+        self.transport = None
+        self.imei = None
+        self.paused = False
+
+    def connection_made(self, transport):
+        """
+        Callback for a new connection
+        :param transport: The transport for the connection
+        :return: None
+        """
+        self.transport = transport
+        self.gateway.protocols.add(self)
+        transport.set_write_buffer_limits(high=self.gateway.high_water, low=self.gateway.low_water)
+        logger.log(13, "Connection from %s", transport.get_extra_info("peername"))
+
+    def data_received(self, data):
+        """
+        Callback for bytes read from the connection
+        :param data: The bytes read
+        :return: None
+        """
+        for gprs in self.framer.feed(data):
+            imei = bytes(gprs.imei)
+            if self.imei is None:
+                self.imei = imei
+                self.gateway.bind(imei, self)
+            elif imei != self.imei:
+                logger.error("Dropping frame for %s on connection bound to %s", imei, self.imei)
+                continue
+            self.gateway.call_hook(self.gateway.on_frame, imei, gprs)
+
+    def connection_lost(self, exc):
+        """
+        Callback for a closed connection
+        :param exc: The exception that closed the connection or None
+        :return: None
+        """
+        if exc is not None:
+            logger.error("Connection for %s lost: %s", self.imei, exc)
+        self.gateway.protocols.discard(self)
+        if self.imei is not None:
+            self.gateway.unbind(self.imei, self)
+        self.transport = None
+
+    def pause_writing(self):
+        """
+        Callback for the write buffer passing the high water mark
+        :return: None
+        """
+        logger.log(13, "Pausing writes to %s", self.imei)
+        self.paused = True
+
+    def resume_writing(self):
+        """
+        Callback for the write buffer draining below the low water mark
+        :return: None
+        """
+        logger.log(13, "Resuming writes to %s", self.imei)
+        self.paused = False
+        self.gateway.flush(self.imei)
+
+    def is_writable(self):
+        """
+        Helper function to check whether queued messages can be written
+        :return: True if the connection is open and not paused
+        """
+        return self.transport is not None and not self.paused and not self.transport.is_closing()
+
+
+class Gateway:
+    """
+    Class for accepting device connections and routing messages to and from them.
+
+    on_frame is called with the imei and the gprs object of every frame received.
+    on_connect and on_disconnect are called with the imei when a connection is
+    bound to or released from a device. Hooks may be plain functions or coroutine
+    functions.
+    """
+    def __init__(
+            self, on_frame=None, on_connect=None, on_disconnect=None, device_type=None,
+            high_water=DEFAULT_HIGH_WATER, low_water=DEFAULT_LOW_WATER, max_queue_length=DEFAULT_MAX_QUEUE_LENGTH,
+            idle_timeout=300, zero_copy=False, verifier=None, evict_interval=DEFAULT_EVICT_INTERVAL,
+            max_offline_queue_length=DEFAULT_MAX_OFFLINE_QUEUE_LENGTH, queue_ttl=DEFAULT_QUEUE_TTL
+    ):
+        """
+        Constructor for the gateway
+        :param on_frame: Hook called for every frame received
+        :param on_connect: Hook called when a device connects
+        :param on_disconnect: Hook called when a device disconnects
+        :param device_type: The string representation of the device type.
+        :param high_water: Write buffer size at which writes to a connection are paused
+        :param low_water: Write buffer size at which writes to a connection are resumed
+        :param max_queue_length: The largest number of messages held for one device
+        :param idle_timeout: Seconds after which a stalled partial frame is discarded.
+        :param zero_copy: Deliver GPRSFrame objects instead of GPRS objects.
+        :param verifier: Optional ChecksumVerifier to check each frame against its trailer.
+        :param evict_interval: Seconds between checks for stalled partial frames on idle connections
+            and expired messages for devices that are not connected
+        :param max_offline_queue_length: The largest number of messages held for a device that is not connected
+        :param queue_ttl: Seconds a message is held for a device before it is dropped unsent
+        """
+        self.on_frame = on_frame
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.device_type = device_type
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_queue_length = max_queue_length
+        self.idle_timeout = idle_timeout
+        self.zero_copy = zero_copy
+        self.verifier = verifier
+        self.evict_interval = evict_interval
+        self.max_offline_queue_length = max_offline_queue_length
+        self.queue_ttl = queue_ttl
+        self.protocols = set()
+        self.hook_tasks = set()
+        self.evictor = None
+        self.connections = {}
+        self.queues = {}
+        self.counters = {}
+        self.server = None
+
+    def protocol_factory(self):
+        """
+        Function to create the protocol for a new connection
+        :return: DeviceConnection for the gateway
+        """
+        return DeviceConnection(self)
+
+    async def start(self, host=None, port=None, **kwargs):
+        """
+        Function to start listening for device connections
+        :param host: The address to listen on
+        :param port: The port to listen on
+        :param kwargs: Extra arguments for loop.create_server
+        :return: The asyncio server
+        """
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(self.protocol_factory, host, port, **kwargs)
+        self.evictor = asyncio.ensure_future(self.evict_stale())
+        return self.server
+
+    async def close(self):
+        """
+        Function to stop listening and close all device connections, including those yet to send a frame
+        :return: None
+        >>> async def close_idle():
+        ...     gateway = Gateway()
+        ...     server = await gateway.start("127.0.0.1", 0)
+        ...     reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        ...     await asyncio.sleep(0.05)
+        ...     await asyncio.wait_for(gateway.close(), 1)
+        ...     return await reader.read(), len(gateway.protocols)
+        >>> asyncio.run(close_idle())
+        (b'', 0)
+        """
+        if self.evictor is not None:
+            self.evictor.cancel()
+            self.evictor = None
+        if self.server is not None:
+            self.server.close()
+        for connection in list(self.protocols):
+            if connection.transport is not None:
+                connection.transport.close()
+        if self.server is not None:
+            await self.server.wait_closed()
+            self.server = None
+
+    def call_hook(self, hook, *args):
+        """
+        Function to call a user hook, scheduling it if it is a coroutine function
+        :param hook: The hook to call or None
+        :param args: The arguments for the hook
+        :return: None
+        >>> from meitrack.build_message import stc_request_device_info
+        >>> async def failing_hook():
+        ...     gateway = Gateway(on_connect=lambda imei: 1 / 0)
+        ...     server = await gateway.start("127.0.0.1", 0)
+        ...     gateway.send(b'0407', stc_request_device_info(b'0407'))
+        ...     reply = await simulate_device("127.0.0.1", server.sockets[0].getsockname()[1], [
+        ...         b'$$S17,0407,A11,OK*CD\\r\\n'
+        ...     ], read_timeout=0.2)
+        ...     await gateway.close()
+        ...     return reply
+        >>> logging.disable(logging.CRITICAL)
+        >>> asyncio.run(failing_hook())
+        b'@@A14,0407,E91*22\\r\\n'
+        >>> logging.disable(logging.NOTSET)
+        """
+        if hook is None:
+            return
+        try:
+            result = hook(*args)
+        except Exception:
+            logger.exception("Hook %s failed", hook)
+            return
+        if asyncio.iscoroutine(result):
+            # Hold a reference so the task is not collected before it finishes
+            task = asyncio.ensure_future(result)
+            self.hook_tasks.add(task)
+            task.add_done_callback(self.hook_done)
+
+    def hook_done(self, task):
+        """
+        Callback for a finished coroutine hook, logging its exception
+        :param task: The task running the hook
+        :return: None
+        """
+        self.hook_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Hook task failed", exc_info=task.exception())
+
+    async def evict_stale(self):
+        """
+        Coroutine dropping stalled partial frames from connections that have stopped sending
+        and expired messages for devices that are not connected
+        :return: None
+        """
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            for connection in list(self.protocols):
+                connection.framer.evict_stale()
+            self.expire_queues()
+
+    def expire_queues(self, now=None):
+        """
+        Function to drop the messages held longer than the queue ttl for devices that are not connected
+        :param now: The current time.monotonic() value
+        :return: The number of messages dropped
+        >>> from meitrack.build_message import stc_request_device_info
+        >>> gateway = Gateway(queue_ttl=60)
+        >>> gateway.send(b'0407', stc_request_device_info(b'0407'))
+        True
+        >>> gateway.expire_queues(time.monotonic() + 30), gateway.expire_queues(time.monotonic() + 90), gateway.queues
+        (0, 1, {})
+        """
+        if now is None:
+            now = time.monotonic()
+        dropped = 0
+        for imei in [imei for imei in self.queues if imei not in self.connections]:
+            dropped += self.drop_expired(imei, now)
+        return dropped
+
+    def drop_expired(self, imei, now):
+        """
+        Function to drop the messages at the head of a device queue held longer than the queue ttl
+        :param imei: The imei of the device
+        :param now: The current time.monotonic() value
+        :return: The number of messages dropped
+        """
+        queue = self.queues[imei]
+        expires = now - self.queue_ttl
+        dropped = 0
+        while queue and queue[0][0] <= expires:
+            queue.popleft()
+            dropped += 1
+        if not queue:
+            del self.queues[imei]
+        if dropped:
+            logger.error("Dropped %s expired messages for %s", dropped, imei)
+            if registry.enabled:
+                count_dropped_messages(DROP_EXPIRED, dropped)
+        return dropped
+
+    def bind(self, imei, connection):
+        """
+        Function to bind a connection to a device, replacing any previous connection
+        :param imei: The imei of the device
+        :param connection: The DeviceConnection to bind
+        :return: None
+        """
+        previous = self.connections.get(imei)
+        if previous is not None and previous is not connection:
+            logger.warning("Replacing existing connection for %s", imei)
+            previous.imei = None
+            previous.transport.close()
+        self.connections[imei] = connection
+        self.call_hook(self.on_connect, imei)
+        self.flush(imei)
+
+    def unbind(self, imei, connection):
+        """
+        Function to release a device connection. Queued messages are kept for the next connection.
+        :param imei: The imei of the device
+        :param connection: The DeviceConnection to release
+        :return: None
+        """
+        if self.connections.get(imei) is connection:
+            del self.connections[imei]
+            self.call_hook(self.on_disconnect, imei)
+
+    def send(self, imei, gprs):
+        """
+        Function to queue a message for a device and write it if possible.
+
+        Devices that are not connected hold at most max_offline_queue_length messages.
+        :param imei: The imei of the device
+        :param gprs: The GPRS object to send
+        :return: False if the queue for the device is full and the message was dropped
+        >>> from meitrack.build_message import stc_request_device_info
+        >>> gateway = Gateway(max_offline_queue_length=2)
+        >>> [gateway.send(b'0407', stc_request_device_info(b'0407')) for _ in range(3)]
+        [True, True, False]
+        """
+        queue = self.queues.setdefault(imei, collections.deque())
+        max_queue_length = self.max_queue_length if imei in self.connections else self.max_offline_queue_length
+        if len(queue) >= max_queue_length:
+            logger.error("Outbound queue for %s is full. Dropping message", imei)
+            if registry.enabled:
+                count_dropped_messages(DROP_QUEUE_FULL)
+            return False
+        queue.append((time.monotonic(), gprs))
+        self.flush(imei)
+        return True
+
+    def flush(self, imei):
+        """
+        Function to write queued messages to a device until its write buffer is full
+        :param imei: The imei of the device
+        :return: The number of messages written
+        """
+        connection = self.connections.get(imei)
+        if connection is None or imei not in self.queues:
+            return 0
+        self.drop_expired(imei, time.monotonic())
+        queue = self.queues.get(imei)
+        if not queue:
+            return 0
+        written = 0
+        while queue and connection.is_writable():
+            counter = self.counters.get(imei, 0)
+            connection.transport.write(queue.popleft()[1].as_bytes(counter))
+            self.counters[imei] = counter + 1
+            written += 1
+        if not queue:
+            del self.queues[imei]
+        return written
+
+    def is_connected(self, imei):
+        """
+        Helper function to check whether a device is connected
+        :param imei: The imei of the device
+        :return: True if a connection is bound to the device
+        """
+        return imei in self.connections
+
+
+async def simulate_device(host, port, frames, read_timeout=1.0):
+    """
+    Coroutine that acts as a device, sending frames and collecting the replies.
+
+    Useful for testing a gateway against a local simulated device.
+    :param host: The address of the gateway
+    :param port: The port of the gateway
+    :param frames: List of frames to send as byte strings
+    :param read_timeout: Seconds to wait for more data before closing
+    :return: The bytes received from the gateway
+    >>> from meitrack.build_message import stc_request_device_info
+    >>> async def exchange():
+    ...     received = []
+    ...     gateway = Gateway(on_frame=lambda imei, gprs: received.append(gprs.command_type))
+    ...     server = await gateway.start("127.0.0.1", 0)
+    ...     gateway.send(b'0407', stc_request_device_info(b'0407'))
+    ...     reply = await simulate_device("127.0.0.1", server.sockets[0].getsockname()[1], [
+    ...         b'$$S17,0407,A11,OK*CD\\r\\n'
+    ...     ], read_timeout=0.2)
+    ...     await gateway.close()
+    ...     return received, reply
+    >>> asyncio.run(exchange())
+    ([b'A11'], b'@@A14,0407,E91*22\\r\\n')
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for frame in frames:
+            writer.write(frame)
+        await writer.drain()
+        received = b""
+        while True:
+            try:
+                data = await asyncio.wait_for(reader.read(65536), read_timeout)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+            received += data
+        return received
+    finally:
+        writer.close()
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    main_logger = logging.getLogger('')
+    main_logger.setLevel(logging.DEBUG)
+    char_handler = logging.StreamHandler()
+    char_handler.setLevel(logging.DEBUG)
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    char_handler.setFormatter(formatter)
+    main_logger.addHandler(char_handler)
+
+    def print_frame(imei, gprs):
+        print(imei, gprs)
+
+    async def run():
+        gateway = Gateway(on_frame=print_frame)
+        server = await gateway.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        await simulate_device("127.0.0.1", port, [
+            b'$$S28,353358017784062,A11,OK*FE\r\n',
+            b'$$D160,864507032228727,AAA,35,24.819116,121.026091,180323023615,A,7,16,0,176,1.3,83,7,1174,'
+            b'466|97|527B|01035DB4,0000,0001|0000|0000|019A|0981,00000001,,3,,,36,23*2E\r\n',
+        ], read_timeout=0.2)
+        await gateway.close()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
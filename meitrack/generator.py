@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+"""
+Library for generating synthetic AAA report streams for load testing.
+
+Each simulated device follows a random movement track with mileage and run
+time that advance with it. Reports are built from per event templates and
+framed with a valid length field and checksum, so the stream can be fed to
+the parser, written to a capture file or sent over a socket in random TCP
+sized fragments.
+"""
+import bisect
+import datetime
+import logging
+import math
+import multiprocessing
+import random
+import traceback
+from queue import Empty
+
+from meitrack.checksum import CHECKSUM_HEX
+from meitrack.command.date_codec import format_meitrack_date
+from meitrack.common import CLIENT_TO_SERVER_PREFIX, END_OF_MESSAGE_STRING
+from meitrack.error import GPRSError
+from meitrack.gprs_protocol import counter_to_identifier
+
+logger = logging.getLogger(__name__)
+
+# Relative weights of the AAA event codes in the generated stream
+DEFAULT_EVENT_MIX = {b"35": 80, b"31": 5, b"37": 5, b"39": 5, b"109": 5}
+DEFAULT_INTERVAL = 30
+DEFAULT_ORIGIN = (-33.815786, 151.200165)
+FIRST_IMEI = 864507032200000
+# Largest payload of a TCP segment on an ethernet link
+TCP_SEGMENT_SIZE = 1460
+# Seconds to wait on a worker queue before checking the worker is still running
+WORKER_POLL_SECONDS = 1.0
+KM_PER_DEGREE = 111.32
+MAX_SPEED_KMH = 110
+# Size in degrees of the grid squares served by one cell and one location area
+CELL_SIZE = 0.01
+AREA_SIZE = 0.1
+# Ignition input reported in the io port status while a vehicle is moving
+IGNITION_MASK = 0x0400
+
+# Fields following the analog inputs for each event layout
+EVENT_TAILS = {
+    b"35": b",00000001,,3,,,%d,%d",
+    b"31": b",00000001,,3,,,%d,%d",
+    b"37": b",%s,,108,0000,,3,0,,0|0000|0000|0000|0000|0000",
+    b"39": b",%s,,108,0000,,3,0,,0|0000|0000|0000|0000|0000",
+    b"109": b",,,108,0000,,6,0,,0|0000|0000|0000|0000|0000,,,20|%s",
+}
+REPORT_TEMPLATE = b"AAA,%s,%.6f,%.6f,%s,A,%d,%d,%d,%d,%.1f,%d,%d,%d,%s,%04X,0000|0000|0000|%04X|%04X"
+RFID_TEMPLATE = b"%%  ^CARD HOLDER %05d^^?;60075551%011d=999919770704=?+  3100  1  58005563  00101?"
+
+
+def encode_frame(imei, payload, data_identifier=b"D", prefix=CLIENT_TO_SERVER_PREFIX):
+    """
+    Function to frame a command payload with its length field and checksum
+    :param imei: The imei of the device as a byte string
+    :param payload: The command and its parameters as a byte string
+    :param data_identifier: The data identifier of the frame
+    :param prefix: The direction prefix of the frame
+    :return: The frame as a byte string
+    >>> encode_frame(b'353358017784062', b'A11,OK', b'S')
+    b'$$S28,353358017784062,A11,OK*FE\\r\\n'
+    """
+    body = b"," + imei + b"," + payload + b"*"
+    data_length = b"%d" % (len(body) + 2 + len(END_OF_MESSAGE_STRING),)
+    checksum = (sum(prefix) + data_identifier[0] + sum(data_length) + sum(body)) & 0xFF
+    return b"".join((prefix, data_identifier, data_length, body, CHECKSUM_HEX[checksum], END_OF_MESSAGE_STRING))
+
+
+def parse_event_mix(mix):
+    """
+    Function to parse an event mix given as comma separated code=weight pairs
+    :param mix: The event mix as a string
+    :return: Dictionary of event code to weight
+    >>> parse_event_mix("35=90,109=10")
+    {b'35': 90.0, b'109': 10.0}
+    """
+    weights = {}
+    for item in mix.split(","):
+        code, _, weight = item.partition("=")
+        code = code.strip().encode()
+        if code not in EVENT_TAILS:
+            raise ValueError("Unsupported event code %s" % (code,))
+        weights[code] = float(weight or 1)
+    return weights
+
+
+class SimulatedDevice:
+    """
+    Movement track and counters of one simulated device.
+    """
+    __slots__ = (
+        "imei", "latitude", "longitude", "heading", "speed", "altitude", "mileage", "run_time",
+        "battery", "power", "counter", "photos",
+    )
+
+    def __init__(self, imei, latitude, longitude, rng):
+        """
+        Constructor for the simulated device
+        :param imei: The imei of the device as a byte string
+        :param latitude: The starting latitude
+        :param longitude: The starting longitude
+        :param rng: The random.Random instance driving the track
+        """
+        self.imei = imei
+        self.latitude = latitude
+        self.longitude = longitude
+        self.heading = rng.uniform(0, 360)
+        self.speed = 0
+        self.altitude = rng.randint(10, 120)
+        self.mileage = rng.randint(0, 500000000)
+        self.run_time = rng.randint(0, 5000000)
+        self.battery = rng.randint(380, 420)
+        self.power = rng.randint(1200, 1420)
+        self.counter = 0
+        self.photos = 0
+
+    def step(self, seconds, rng):
+        """
+        Function to advance the device along its track
+        :param seconds: The time since the last step
+        :param rng: The random.Random instance driving the track
+        :return: None
+        """
+        # random() with arithmetic rather than randint, which dominates the generation time
+        sample = rng.random
+        if self.speed == 0:
+            if sample() < 0.3:
+                self.speed = 5 + int(sample() * 36)
+        elif sample() < 0.05:
+            self.speed = 0
+        else:
+            self.speed = min(max(self.speed + int(sample() * 31) - 15, 1), MAX_SPEED_KMH)
+        self.heading = (self.heading + sample() * 50 - 25) % 360
+        self.battery = min(max(self.battery + int(sample() * 3) - 1, 360), 420)
+        self.power = min(max(self.power + int(sample() * 7) - 3, 1150), 1450)
+        if not self.speed:
+            return
+        distance = self.speed * seconds / 3600
+        radians = math.radians(self.heading)
+        self.latitude += distance * math.cos(radians) / KM_PER_DEGREE
+        self.longitude += distance * math.sin(radians) / (KM_PER_DEGREE * math.cos(math.radians(self.latitude)))
+        self.altitude = max(self.altitude + int(sample() * 5) - 2, 0)
+        self.mileage += int(distance * 1000)
+        self.run_time += seconds
+
+
+def base_station_info(latitude, longitude, mnc):
+    """
+    Function to build the base station info field of the cell serving a position
+    :param latitude: The latitude of the device
+    :param longitude: The longitude of the device
+    :param mnc: The mobile network code of the device
+    :return: The mcc|mnc|lac|ci field as bytes
+    >>> base_station_info(-33.815786, 151.200165, 3) == base_station_info(-33.8158, 151.2002, 3)
+    True
+    """
+    lac = int(latitude // AREA_SIZE) * 37 + int(longitude // AREA_SIZE) & 0xFFFF
+    ci = int(latitude // CELL_SIZE) * 7919 + int(longitude // CELL_SIZE) & 0xFFFFFFF
+    return b"505|%d|%04X|%08X" % (mnc, lac, ci)
+
+
+class TrafficGenerator:
+    """
+    Class to generate a time ordered stream of AAA reports from a fleet of simulated devices.
+
+    One generator produces around 5 million frames a minute. Use parallel_blocks,
+    or mtgen --workers, for rates in the tens of millions.
+    """
+    def __init__(
+            self, devices=10, hours=1.0, interval=DEFAULT_INTERVAL, event_mix=None, start=None, seed=None,
+            origin=DEFAULT_ORIGIN, first_imei=FIRST_IMEI
+    ):
+        """
+        Constructor for the traffic generator
+        :param devices: The number of devices reporting
+        :param hours: The length of the stream in hours of device time
+        :param interval: The seconds between reports from each device
+        :param event_mix: Dictionary of event code to relative weight. Defaults to DEFAULT_EVENT_MIX.
+        :param start: The datetime of the first report. Defaults to the start of the current hour.
+        :param seed: Seed for the random tracks and events so a stream can be reproduced
+        :param origin: The latitude and longitude the devices start around
+        :param first_imei: The imei of the first device. Devices are numbered on from it.
+        >>> from meitrack.gprs_protocol import parse_many
+        >>> generator = TrafficGenerator(devices=3, hours=0.5, interval=60, seed=1)
+        >>> frames = list(parse_many(b"".join(generator.frames())))
+        >>> len(frames) == len(generator) == 90, all(frame.enclosed_data is not None for frame in frames)
+        (True, True)
+        """
+        self.rng = random.Random(seed)
+        self.fragment_rng = random.Random(seed)
+        if event_mix is None:
+            event_mix = DEFAULT_EVENT_MIX
+        self.event_codes = list(event_mix)
+        self.cumulative_weights = []
+        total = 0
+        for code in self.event_codes:
+            total += event_mix[code]
+            self.cumulative_weights.append(total)
+        if start is None:
+            start = datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.start = start
+        self.interval = interval
+        self.ticks = int(hours * 3600 // interval)
+        self.devices = [
+            SimulatedDevice(
+                b"%d" % (first_imei + number,),
+                origin[0] + self.rng.uniform(-0.2, 0.2),
+                origin[1] + self.rng.uniform(-0.2, 0.2),
+                self.rng,
+            )
+            for number in range(devices)
+        ]
+        self.mnc = {device.imei: self.rng.choice((1, 2, 3)) for device in self.devices}
+
+    def __len__(self):
+        return self.ticks * len(self.devices)
+
+    def choose_event(self):
+        """
+        Function to pick the event code of the next report from the event mix
+        :return: The event code as bytes
+        """
+        return self.event_codes[
+            bisect.bisect_right(self.cumulative_weights, self.rng.random() * self.cumulative_weights[-1])
+        ]
+
+    def build_payload(self, device, event_code, date_time):
+        """
+        Function to build the AAA payload of a report for the current state of a device
+        :param device: The SimulatedDevice reporting
+        :param event_code: The event code of the report
+        :param date_time: The meitrack date of the report as bytes
+        :return: The AAA payload as bytes
+        """
+        sample = self.rng.random
+        io_mask = IGNITION_MASK if device.speed else 0
+        payload = REPORT_TEMPLATE % (
+            event_code, device.latitude, device.longitude, date_time, 4 + int(sample() * 9), 8 + int(sample() * 24),
+            device.speed, device.heading, 0.7 + sample() * 1.8, device.altitude, device.mileage,
+            device.run_time, base_station_info(device.latitude, device.longitude, self.mnc[device.imei]),
+            io_mask, device.battery, device.power,
+        )
+        tail = EVENT_TAILS[event_code]
+        if event_code == b"37":
+            return payload + tail % (RFID_TEMPLATE % (int(device.imei[-5:]), int(device.imei[-11:])),)
+        if event_code == b"39":
+            device.photos += 1
+            return payload + tail % (b"%s_C1E%d_N%dU1D1.jpg" % (date_time, device.photos % 4 + 1, device.photos),)
+        if event_code == b"109":
+            return payload + tail % (date_time,)
+        return payload + tail % (int(sample() * 61), int(sample() * 61))
+
+    def frames(self):
+        """
+        Generator of the frames of the stream in time order
+        :return: Generator of frames as byte strings
+        """
+        seconds = datetime.timedelta(seconds=self.interval)
+        when = self.start
+        for _ in range(self.ticks):
+            date_time = format_meitrack_date(when)
+            for device in self.devices:
+                device.step(self.interval, self.rng)
+                device.counter += 1
+                yield encode_frame(
+                    device.imei,
+                    self.build_payload(device, self.choose_event(), date_time),
+                    counter_to_identifier(device.counter),
+                )
+            when += seconds
+
+    def blocks(self, frames_per_block=1000):
+        """
+        Generator of the stream joined into blocks of frames
+        :param frames_per_block: The number of frames in each block
+        :return: Generator of byte strings
+        """
+        block = []
+        for frame in self.frames():
+            block.append(frame)
+            if len(block) >= frames_per_block:
+                yield b"".join(block)
+                block = []
+        if block:
+            yield b"".join(block)
+
+    def fragments(self, max_size=TCP_SEGMENT_SIZE, min_size=1):
+        """
+        Generator of the stream split at random points into TCP sized fragments
+        :param max_size: The largest fragment in bytes
+        :param min_size: The smallest fragment in bytes, other than the last
+        :return: Generator of byte strings
+        >>> fragments = list(TrafficGenerator(devices=2, hours=0.1, seed=1).fragments(max_size=50))
+        >>> max(len(fragment) for fragment in fragments) <= 50
+        True
+        >>> b"".join(fragments) == b"".join(TrafficGenerator(devices=2, hours=0.1, seed=1).frames())
+        True
+        """
+        return fragment_stream(self.blocks(), self.fragment_rng, max_size, min_size)
+
+    def write(self, output):
+        """
+        Function to write the stream to a binary file object
+        :param output: The file object to write to
+        :return: The number of frames written
+        """
+        for block in self.blocks():
+            output.write(block)
+        return len(self)
+
+
+def fragment_stream(blocks, rng, max_size=TCP_SEGMENT_SIZE, min_size=1):
+    """
+    Generator to split a stream of blocks at random points into fragments
+    :param blocks: Iterable of byte strings making up the stream
+    :param rng: The random.Random instance choosing the fragment sizes
+    :param max_size: The largest fragment in bytes
+    :param min_size: The smallest fragment in bytes, other than the last
+    :return: Generator of byte strings
+    """
+    pending = b""
+    for block in blocks:
+        pending += block
+        position = 0
+        while len(pending) - position >= max_size:
+            size = rng.randint(min_size, max_size)
+            yield pending[position:position + size]
+            position += size
+        pending = pending[position:]
+    if pending:
+        yield pending
+
+
+def shard_worker(queue, kwargs):
+    """
+    Function run in a worker process to generate the blocks of one shard of the fleet
+    :param queue: The queue to put the blocks on, followed by None, or by the traceback as a string on failure
+    :param kwargs: The keyword arguments of the TrafficGenerator for the shard
+    :return: None
+    """
+    try:
+        for block in TrafficGenerator(**kwargs).blocks():
+            queue.put(block)
+    except Exception:
+        queue.put(traceback.format_exc())
+        return
+    queue.put(None)
+
+
+def next_block(queue, process, index):
+    """
+    Function to take the next item from a worker queue, failing if the worker died without finishing
+    :param queue: The queue of the worker
+    :param process: The worker process
+    :param index: The index of the worker
+    :return: The next block, or None at the end of the shard
+    """
+    while True:
+        try:
+            item = queue.get(timeout=WORKER_POLL_SECONDS)
+            break
+        except Empty:
+            if process.is_alive():
+                continue
+        # Anything the worker put before exiting is already in the pipe
+        try:
+            item = queue.get(timeout=WORKER_POLL_SECONDS)
+            break
+        except Empty:
+            raise GPRSError("Generator worker %s exited with code %s" % (index, process.exitcode))
+    if isinstance(item, str):
+        raise GPRSError("Generator worker %s failed:\n%s" % (index, item))
+    return item
+
+
+def parallel_blocks(workers, devices=10, seed=None, first_imei=FIRST_IMEI, start=None, **kwargs):
+    """
+    Generator of the blocks of a stream generated across worker processes.
+
+    The fleet is split into one shard of devices per worker. Blocks are taken
+    from the workers in turn, so the stream is in time order within each block.
+    :param workers: The number of worker processes
+    :param devices: The number of devices reporting
+    :param seed: Seed for the shards. Each shard is seeded with seed plus its index.
+    :param first_imei: The imei of the first device
+    :param start: The datetime of the first report. Defaults to the start of the current hour.
+    :param kwargs: Other keyword arguments of the TrafficGenerator
+    :return: Generator of byte strings
+    >>> len(b"".join(parallel_blocks(2, devices=3, hours=0.1, seed=1)).split(b"\\r\\n")) - 1
+    36
+    >>> list(parallel_blocks(2, devices=2, hours=0.1, event_mix={b"99": 1}))
+    Traceback (most recent call last):
+        ...
+    meitrack.error.GPRSError: Generator worker 0 failed:
+    ...KeyError: b'99'
+    <BLANKLINE>
+    """
+    if start is None:
+        start = datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    workers = max(min(workers, devices), 1)
+    queues = []
+    processes = []
+    first = first_imei
+    for index in range(workers):
+        shard_devices = devices // workers + (index < devices % workers)
+        shard = dict(
+            kwargs, devices=shard_devices, first_imei=first, start=start,
+            seed=None if seed is None else seed + index,
+        )
+        first += shard_devices
+        queue = multiprocessing.Queue(maxsize=8)
+        process = multiprocessing.Process(target=shard_worker, args=(queue, shard), daemon=True)
+        process.start()
+        queues.append(queue)
+        processes.append(process)
+
+    try:
+        active = list(range(workers))
+        while active:
+            for index in list(active):
+                block = next_block(queues[index], processes[index], index)
+                if block is None:
+                    active.remove(index)
+                else:
+                    yield block
+        for index, process in enumerate(processes):
+            process.join()
+            if process.exitcode:
+                raise GPRSError("Generator worker %s exited with code %s" % (index, process.exitcode))
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    import time
+
+    from meitrack.gprs_protocol import parse_many
+
+    generator = TrafficGenerator(devices=100, hours=1, seed=1)
+    start = time.perf_counter()
+    frame_count = sum(1 for _ in generator.frames())
+    elapsed = time.perf_counter() - start
+    print("{} frames in {:.3f} seconds, {:.0f} frames per minute".format(
+        frame_count, elapsed, frame_count / elapsed * 60
+    ))
+    for gprs in parse_many(b"".join(TrafficGenerator(devices=2, hours=0.05, seed=1).frames())):
+        print(gprs.as_bytes())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+"""
+Library of parser metrics with a Prometheus text rendering and a dict snapshot.
+
+The parse path updates the metrics of the module registry only while
+registry.enabled is set, so with metrics disabled each update site costs one
+attribute check.
+"""
+import bisect
+import logging
+import time
+
+from meitrack.common import DIRECTION_CLIENT_TO_SERVER, DIRECTION_SERVER_TO_CLIENT
+from meitrack.error import GPRSParameterError
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.01, 0.1)
+# Causes of parse errors
+ERROR_INVALID_LENGTH = "invalid_length"
+ERROR_DATA_LENGTH = "data_length"
+ERROR_END_OF_MESSAGE = "end_of_message"
+ERROR_FIELD_COUNT = "field_count"
+
+DROP_QUEUE_FULL = "queue_full"
+DROP_EXPIRED = "expired"
+# Label of the command types not in the command list, so labels taken from the wire stay bounded
+OTHER_COMMAND = b"other"
+
+
+def label_value(value):
+    """
+    Helper function to convert a label value to a string
+    :param value: The label value as bytes, memoryview, int or str
+    :return: The label value as a string
+    >>> label_value(b'AAA'), label_value(1)
+    ('AAA', '1')
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("ascii", "replace")
+    return str(value)
+
+
+def format_labels(label_names, labels, extra=""):
+    """
+    Helper function to format the labels of a sample in the Prometheus text format
+    :param label_names: The names of the labels
+    :param labels: Tuple of the label values
+    :param extra: Optional extra label already formatted, such as the le label of a bucket
+    :return: The labels in braces, or an empty string without labels
+    >>> format_labels(("command",), (b'AAA',), 'le="0.1"')
+    '{command="AAA",le="0.1"}'
+    """
+    parts = [
+        '%s="%s"' % (name, label_value(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(label_names, labels)
+    ]
+    if extra:
+        parts.append(extra)
+    if not parts:
+        return ""
+    return "{%s}" % (",".join(parts),)
+
+
+def snapshot_key(labels):
+    """
+    Helper function to build the key of a sample in a snapshot
+    :param labels: Tuple of the label values
+    :return: The label values joined with commas
+    """
+    return ",".join(label_value(value) for value in labels)
+
+
+class Counter:
+    """
+    Monotonic counter with a value for each combination of label values.
+    """
+    __slots__ = ("name", "help", "label_names", "values")
+    metric_type = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        """
+        Constructor for the counter
+        :param name: The metric name
+        :param help_text: Description of the metric
+        :param label_names: Tuple of the label names
+        >>> counter = Counter("frames_total", "Frames", ("direction",))
+        >>> counter.inc((1,)); counter.inc((1,), 2)
+        >>> counter.values
+        {(1,): [3]}
+        """
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+
+    def cell(self, labels=()):
+        """
+        Function to get the mutable cell holding the count for a combination of label values.
+
+        Hot paths keep the cell and add to cell[0] directly.
+        :param labels: Tuple of the label values
+        :return: Single item list holding the count
+        """
+        cell = self.values.get(labels)
+        if cell is None:
+            cell = self.values[labels] = [0]
+        return cell
+
+    def inc(self, labels=(), amount=1):
+        """
+        Function to increase the counter
+        :param labels: Tuple of the label values
+        :param amount: The amount to add
+        :return: None
+        """
+        self.cell(labels)[0] += amount
+
+    def total(self):
+        """
+        Function to sum the counter over every combination of label values
+        :return: The total count
+        """
+        return sum(cell[0] for cell in self.values.values())
+
+    def reset(self):
+        """
+        Function to zero the counter. Cells held by hot paths stay valid.
+        :return: None
+        """
+        for cell in self.values.values():
+            cell[0] = 0
+
+    def render(self):
+        """
+        Function to render the samples of the counter in the Prometheus text format
+        :return: List of sample lines
+        """
+        return [
+            "%s%s %s" % (self.name, format_labels(self.label_names, labels), cell[0])
+            for labels, cell in sorted(self.values.items(), key=lambda item: snapshot_key(item[0]))
+        ]
+
+    def snapshot(self):
+        """
+        Function to copy the counter into a plain dictionary
+        :return: Dictionary of the joined label values to the count
+        """
+        return {snapshot_key(labels): cell[0] for labels, cell in self.values.items()}
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket bounds and a set of buckets for each combination of label values.
+    """
+    __slots__ = ("name", "help", "label_names", "buckets", "values")
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        """
+        Constructor for the histogram
+        :param name: The metric name
+        :param help_text: Description of the metric
+        :param label_names: Tuple of the label names
+        :param buckets: Sorted upper bounds of the buckets
+        >>> histogram = Histogram("parse_seconds", "Parse time", ("command",), buckets=(0.001, 0.01))
+        >>> histogram.observe(0.0005, (b'AAA',)); histogram.observe(0.005, (b'AAA',))
+        >>> histogram.values[(b'AAA',)]
+        [[1, 1, 0], 0.0055, 2]
+        """
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def cell(self, labels=()):
+        """
+        Function to get the mutable cell holding the observations for a combination of label values
+        :param labels: Tuple of the label values
+        :return: List of the bucket counts, with a final +Inf bucket, the sum and the count
+        """
+        cell = self.values.get(labels)
+        if cell is None:
+            cell = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        return cell
+
+    def observe(self, value, labels=()):
+        """
+        Function to add an observation to the histogram
+        :param value: The observed value
+        :param labels: Tuple of the label values
+        :return: None
+        """
+        cell = self.cell(labels)
+        cell[0][bisect.bisect_left(self.buckets, value)] += 1
+        cell[1] += value
+        cell[2] += 1
+
+    def reset(self):
+        """
+        Function to zero the histogram. Cells held by hot paths stay valid.
+        :return: None
+        """
+        for cell in self.values.values():
+            cell[0][:] = [0] * len(cell[0])
+            cell[1] = 0.0
+            cell[2] = 0
+
+    def cumulative(self, counts):
+        """
+        Function to convert bucket counts to the cumulative counts of each upper bound
+        :param counts: List of the bucket counts
+        :return: List of (upper bound, cumulative count) tuples ending with +Inf
+        """
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def render(self):
+        """
+        Function to render the samples of the histogram in the Prometheus text format
+        :return: List of sample lines
+        """
+        lines = []
+        for labels, (counts, total, count) in sorted(self.values.items(), key=lambda item: snapshot_key(item[0])):
+            for bound, running in self.cumulative(counts):
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound),)
+                lines.append("%s_bucket%s %s" % (self.name, format_labels(self.label_names, labels, le), running))
+            lines.append("%s_sum%s %r" % (self.name, format_labels(self.label_names, labels), total))
+            lines.append("%s_count%s %s" % (self.name, format_labels(self.label_names, labels), count))
+        return lines
+
+    def snapshot(self):
+        """
+        Function to copy the histogram into a plain dictionary
+        :return: Dictionary of the joined label values to the count, sum and cumulative bucket counts
+        """
+        return {
+            snapshot_key(labels): {
+                "count": count,
+                "sum": total,
+                "buckets": {
+                    "+Inf" if bound == float("inf") else bound: running
+                    for bound, running in self.cumulative(counts)
+                },
+            }
+            for labels, (counts, total, count) in self.values.items()
+        }
+
+
+class MetricsRegistry:
+    """
+    Registry of named metrics with a flag to switch updates on and off.
+    """
+    def __init__(self, enabled=False):
+        """
+        Constructor for the metrics registry
+        :param enabled: Whether the parse path updates the metrics
+        """
+        self.enabled = enabled
+        self.metrics = {}
+        self.started = time.monotonic()
+
+    def register(self, metric):
+        """
+        Function to add a metric to the registry
+        :param metric: Counter or Histogram
+        :return: The metric
+        """
+        if metric.name in self.metrics:
+            raise GPRSParameterError("Metric %s is already registered" % (metric.name,))
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        """
+        Function to create and register a counter
+        :param name: The metric name
+        :param help_text: Description of the metric
+        :param label_names: Tuple of the label names
+        :return: The Counter
+        """
+        return self.register(Counter(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        """
+        Function to create and register a histogram
+        :param name: The metric name
+        :param help_text: Description of the metric
+        :param label_names: Tuple of the label names
+        :param buckets: Sorted upper bounds of the buckets
+        :return: The Histogram
+        """
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def reset(self):
+        """
+        Function to clear every metric and restart the rate clock
+        :return: None
+        """
+        for metric in self.metrics.values():
+            metric.reset()
+        self.started = time.monotonic()
+
+    def rate(self, name):
+        """
+        Function to get the per second rate of a counter since the registry was created or reset
+        :param name: The counter name
+        :return: The total count divided by the elapsed seconds
+        """
+        elapsed = time.monotonic() - self.started
+        if elapsed <= 0:
+            return 0.0
+        return self.metrics[name].total() / elapsed
+
+    def render_prometheus(self):
+        """
+        Function to render every metric in the Prometheus text exposition format
+        :return: The metrics as a string
+        >>> local_registry = MetricsRegistry()
+        >>> local_registry.counter("meitrack_frames_total", "Frames found", ("direction",)).inc((1,))
+        >>> print(local_registry.render_prometheus(), end="")
+        # HELP meitrack_frames_total Frames found
+        # TYPE meitrack_frames_total counter
+        meitrack_frames_total{direction="1"} 1
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append("# HELP %s %s" % (metric.name, metric.help))
+            lines.append("# TYPE %s %s" % (metric.name, metric.metric_type))
+            lines.extend(metric.render())
+        return "".join(line + "\n" for line in lines)
+
+    def snapshot(self):
+        """
+        Function to copy every metric into a plain dictionary
+        :return: Dictionary of metric name to the metric snapshot
+        >>> local_registry = MetricsRegistry()
+        >>> local_registry.histogram("parse_seconds", "Parse time", ("command",), (0.001,)).observe(0.0005, (b'AAA',))
+        >>> local_registry.snapshot()
+        {'parse_seconds': {'AAA': {'count': 1, 'sum': 0.0005, 'buckets': {0.001: 1, '+Inf': 1}}}}
+        """
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+
+registry = MetricsRegistry()
+frames_total = registry.counter(
+    "meitrack_frames_total", "Frames accepted after checksum verification on every ingest path", ("direction",)
+)
+parse_errors_total = registry.counter(
+    "meitrack_parse_errors_total", "Frames and commands that could not be parsed", ("cause",)
+)
+command_bytes_total = registry.counter(
+    "meitrack_command_bytes_total", "Bytes of command payload converted to command objects", ("command",)
+)
+encoded_bytes_total = registry.counter(
+    "meitrack_encoded_bytes_total", "Bytes of gprs messages encoded", ("command",)
+)
+command_parse_seconds = registry.histogram(
+    "meitrack_command_parse_seconds", "Time spent converting command payloads to command objects", ("command",)
+)
+dropped_messages_total = registry.counter(
+    "meitrack_dropped_messages_total", "Outbound messages dropped by the gateway before they were sent", ("reason",)
+)
+
+
+def enable_metrics(enabled=True):
+    """
+    Function to switch updates of the module registry on or off
+    :param enabled: Whether the parse path updates the metrics
+    :return: None
+    >>> from meitrack.gprs_protocol import StreamFramer
+    >>> enable_metrics(); before = frames_total.total()
+    >>> frames = list(StreamFramer(DIRECTION_SERVER_TO_CLIENT).feed(b'@@Q25,353358017784062,A10*6A\\r\\n'))
+    >>> enable_metrics(False); frames_total.total() - before
+    1
+    """
+    registry.enabled = enabled
+
+
+# Frame counter cells keyed by the first byte of the frame prefix
+frame_cells = {
+    ord("@"): frames_total.cell((DIRECTION_SERVER_TO_CLIENT,)),
+    ord("$"): frames_total.cell((DIRECTION_CLIENT_TO_SERVER,)),
+}
+# Tuple of the latency histogram cell and the payload byte counter cell keyed by command label
+command_cells = {}
+# Command types given their own label, filled from the command list by command_to_object
+known_command_types = set()
+
+
+def count_frames(direction, count=1):
+    """
+    Function to count frames found by the parser
+    :param direction: The direction of the frames
+    :param count: The number of frames
+    :return: None
+    """
+    frames_total.cell((direction,))[0] += count
+
+
+def register_command_types(command_types):
+    """
+    Function to give command types their own label in the per command metrics
+    :param command_types: Iterable of command types as bytes
+    :return: None
+    """
+    known_command_types.update(bytes(command_type) for command_type in command_types)
+
+
+def command_label(command_type):
+    """
+    Function to get the label of a command type, folding unknown types into one label
+    :param command_type: The command type as bytes or memoryview
+    :return: The label as bytes
+    >>> register_command_types([b"A10"])
+    >>> command_label(memoryview(b"A10")), command_label(b"Z99")
+    (b'A10', b'other')
+    """
+    command_type = bytes(command_type or b"")
+    return command_type if command_type in known_command_types else OTHER_COMMAND
+
+
+def count_parse_error(cause):
+    """
+    Function to count a parse error
+    :param cause: The cause, such as ERROR_FIELD_COUNT
+    :return: None
+    """
+    parse_errors_total.inc((cause,))
+
+
+def count_dropped_messages(reason, count=1):
+    """
+    Function to count outbound messages dropped by the gateway
+    :param reason: The reason, such as DROP_QUEUE_FULL
+    :param count: The number of messages
+    :return: None
+    """
+    dropped_messages_total.inc((reason,), count)
+
+
+def observe_command(command_type, payload_length, seconds):
+    """
+    Function to record the conversion of a command payload to a command object
+    :param command_type: The command type
+    :param payload_length: The length of the payload in bytes
+    :param seconds: The time taken to build the command object
+    :return: None
+    >>> register_command_types([b"A10"])
+    >>> previous = command_parse_seconds.values.get((b'A10',), [None, 0.0, 0])[2]
+    >>> observe_command(memoryview(b'A10'), 3, 0.00002)
+    >>> command_parse_seconds.values[(b'A10',)][2] - previous
+    1
+    """
+    cells = command_cells.get(command_type)
+    if cells is None:
+        label = command_label(command_type)
+        cells = command_cells.get(label)
+        if cells is None:
+            cells = command_cells[label] = (command_parse_seconds.cell((label,)), command_bytes_total.cell((label,)))
+    latency, payload_bytes = cells
+    latency[0][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    latency[1] += seconds
+    latency[2] += 1
+    payload_bytes[0] += payload_length
+
+
+def count_encoded(command_type, length):
+    """
+    Function to count the bytes of an encoded gprs message
+    :param command_type: The command type of the message
+    :param length: The length of the message in bytes
+    :return: None
+    """
+    encoded_bytes_total.inc((command_label(command_type),), length)
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    from meitrack.gprs_protocol import SAMPLE_FRAMES, parse_many
+
+    enable_metrics()
+    registry.reset()
+    for gprs in parse_many(b"".join(SAMPLE_FRAMES) * 100):
+        gprs.enclosed_data
+        gprs.as_bytes()
+    enable_metrics(False)
+    print(registry.render_prometheus(), end="")
+    print("{:.0f} frames per second".format(registry.rate(frames_total.name)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+"""
+Library for parsing gprs messages across a pool of worker processes.
+
+Frames are sharded by IMEI so that all of the frames from one device are
+parsed by the same worker in the order they were received. Workers return
+compact FrameRecord tuples rather than GPRS objects to keep the cost of
+passing results between processes down.
+"""
+import collections
+import logging
+import mmap
+import multiprocessing
+import zlib
+
+from meitrack.error import GPRSParseError
+from meitrack.gprs_protocol import parse_many
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# Bytes read after an error offset to find the imei, so a mapped file is not copied to its end
+IMEI_SCAN_SIZE = 64
+
+FrameRecord = collections.namedtuple("FrameRecord", ["imei", "command_type", "fields", "error"])
+
+
+def frame_imei(frame):
+    """
+    Function to read the imei from a frame without parsing it
+    :param frame: The frame as a byte string
+    :return: The imei as a byte string, or None if the frame is cut off before the end of the imei
+    >>> frame_imei(b'$$S28,353358017784062,A11,OK*FE\\r\\n')
+    b'353358017784062'
+    >>> frame_imei(b'$$S28,35') is None
+    True
+    """
+    imei_start = frame.find(b',') + 1
+    if not imei_start:
+        return None
+    imei_end = frame.find(b',', imei_start)
+    if imei_end < 0:
+        return None
+    return frame[imei_start:imei_end]
+
+
+def shard_for_imei(imei, shards):
+    """
+    Function to select the shard for a device.
+
+    A crc is used rather than hash() so the result is the same in every process.
+    :param imei: The imei as a byte string
+    :param shards: The number of shards
+    :return: The shard number
+    >>> shard_for_imei(b'353358017784062', 4) == shard_for_imei(b'353358017784062', 4)
+    True
+    """
+    return zlib.crc32(imei) % shards
+
+
+def gprs_to_record(gprs):
+    """
+    Function to convert a parsed gprs object to a compact record
+    :param gprs: GPRS or GPRSFrame object
+    :return: FrameRecord for the message
+    >>> from meitrack.gprs_protocol import GPRS
+    >>> gprs_to_record(GPRS(b'$$S28,353358017784062,A11,OK*FE\\r\\n'))
+    FrameRecord(imei=b'353358017784062', command_type=b'A11', fields={}, error=None)
+    >>> class BrokenFrame:
+    ...     imei, command_type = b'0407', b'AAA'
+    ...     @property
+    ...     def enclosed_data(self):
+    ...         raise ValueError("bad field")
+    >>> gprs_to_record(BrokenFrame())
+    FrameRecord(imei=b'0407', command_type=b'AAA', fields=None, error='bad field')
+    """
+    imei = bytes(gprs.imei)
+    command_type = bytes(gprs.command_type)
+    try:
+        enclosed_data = gprs.enclosed_data
+    except (GPRSParseError, ValueError, IndexError) as err:
+        # Commands are parsed on first access, so converter errors surface here
+        return FrameRecord(imei, command_type, None, str(err))
+    fields = dict(enclosed_data.field_dict) if enclosed_data is not None else {}
+    return FrameRecord(imei, command_type, fields, None)
+
+
+def parse_frame_batch(frames, device_type=None):
+    """
+    Function run in a worker to parse a batch of frames into records
+    :param frames: List of frames as byte strings
+    :param device_type: The string representation of the device type.
+    :return: List of FrameRecord tuples
+    """
+    records = []
+    for frame in frames:
+        errors = []
+        for gprs in parse_many(frame, device_type=device_type, errors=errors):
+            records.append(gprs_to_record(gprs))
+        for position, reason in errors:
+            records.append(FrameRecord(frame_imei(frame[position:]), None, None, reason))
+    return records
+
+
+def parse_capture_file(path, device_type=None):
+    """
+    Function run in a worker to parse every frame in a capture file into records
+    :param path: The path of the capture file
+    :param device_type: The string representation of the device type.
+    :return: List of FrameRecord tuples in file order, with an error record for each frame that could not be parsed
+    >>> import os, tempfile
+    >>> with tempfile.NamedTemporaryFile(delete=False) as capture:
+    ...     _ = capture.write(b'$$Qab,1,A10\\r\\n$$S28,353358017784062,A11,OK*FE\\r\\n$$S28,35')
+    >>> for record in parse_capture_file(capture.name): record.imei, record.command_type, record.error
+    (b'1', None, 'invalid length field')
+    (b'353358017784062', b'A11', None)
+    (None, None, 'incomplete frame')
+    >>> os.remove(capture.name)
+    """
+    with open(path, "rb") as capture:
+        try:
+            buffer = mmap.mmap(capture.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            return []
+        try:
+            records = []
+            errors = []
+            reported = 0
+            for gprs in parse_many(buffer, device_type=device_type, errors=errors):
+                # Errors found before this frame are recorded ahead of it to keep file order
+                reported = error_records(records, buffer, errors, reported)
+                records.append(gprs_to_record(gprs))
+            error_records(records, buffer, errors, reported)
+            return records
+        finally:
+            buffer.close()
+
+
+def error_records(records, buffer, errors, reported=0):
+    """
+    Helper function to append a record for each error not yet recorded
+    :param records: The list of FrameRecord tuples to append to
+    :param buffer: The buffer the errors were found in
+    :param errors: List of (offset, reason) tuples from parse_many
+    :param reported: The number of errors already recorded
+    :return: The number of errors recorded
+    """
+    for position, reason in errors[reported:]:
+        records.append(FrameRecord(frame_imei(buffer[position:position + IMEI_SCAN_SIZE]), None, None, reason))
+    return len(errors)
+
+
+def parse_batch_args(args):
+    """
+    Helper function to unpack the arguments of a batch for Pool.imap
+    :param args: Tuple of the batch and device type
+    :return: List of FrameRecord tuples
+    """
+    return parse_frame_batch(*args)
+
+
+def parse_file_args(args):
+    """
+    Helper function to unpack the arguments of a file for Pool.imap
+    :param args: Tuple of the path and device type
+    :return: List of FrameRecord tuples
+    """
+    return parse_capture_file(*args)
+
+
+class ParallelParser:
+    """
+    Class to parse frames or capture files across a multiprocessing pool.
+
+    With one worker or fewer everything is parsed in the calling process.
+    """
+    def __init__(self, workers=None, device_type=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Constructor for the parallel parser
+        :param workers: The number of worker processes. Defaults to the number of cpus.
+        :param device_type: The string representation of the device type.
+        :param batch_size: The number of frames sent to a worker at a time.
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self.workers = workers
+        self.device_type = device_type
+        self.batch_size = batch_size
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_pool(self):
+        """
+        Function to start the worker pool on first use
+        :return: The multiprocessing pool
+        """
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+        return self.pool
+
+    def close(self):
+        """
+        Function to stop the worker pool
+        :return: None
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def shard(self, frames):
+        """
+        Function to split frames into shards by imei, keeping the order of each device.
+
+        Frames cut off before the end of the imei go to the first shard, where they are recorded as errors.
+        :param frames: Iterable of frames as byte strings
+        :return: List of lists of frames, one per worker
+        >>> ParallelParser(workers=1).shard([b'$$S28,353358017784062,A11,OK*FE\\r\\n'])
+        [[b'$$S28,353358017784062,A11,OK*FE\\r\\n']]
+        >>> ParallelParser(workers=2).shard([b'$$S28,35'])
+        [[b'$$S28,35'], []]
+        """
+        shards = [[] for _ in range(max(self.workers, 1))]
+        for frame in frames:
+            imei = frame_imei(frame)
+            shards[0 if imei is None else shard_for_imei(imei, len(shards))].append(frame)
+        return shards
+
+    def parse(self, frames):
+        """
+        Function to parse frames into records.
+
+        Records are returned grouped by shard. The records of each device are in
+        the order the frames were given.
+        :param frames: Iterable of frames as byte strings
+        :return: List of FrameRecord tuples
+        >>> records = ParallelParser(workers=1).parse([
+        ...     b'$$S28,353358017784062,A11,OK*FE\\r\\n', b'$$Qab,353358017784062,A10*6A\\r\\n'
+        ... ])
+        >>> [(record.command_type, record.error) for record in records]
+        [(b'A11', None), (None, 'invalid length field')]
+        """
+        if self.workers <= 1:
+            return parse_frame_batch(list(frames), self.device_type)
+
+        batches = []
+        for shard in self.shard(frames):
+            for start in range(0, len(shard), self.batch_size):
+                batches.append((shard[start:start + self.batch_size], self.device_type))
+        records = []
+        for batch_records in self.get_pool().imap(parse_batch_args, batches):
+            records.extend(batch_records)
+        return records
+
+    def parse_files(self, paths):
+        """
+        Function to parse whole capture files, one file per worker task.
+
+        Each file is memory mapped and parsed in one scan by a worker. Records
+        are returned in file order.
+        :param paths: List of capture file paths
+        :return: List of FrameRecord tuples
+        """
+        tasks = [(path, self.device_type) for path in paths]
+        if self.workers <= 1:
+            results = map(parse_file_args, tasks)
+        else:
+            results = self.get_pool().imap(parse_file_args, tasks)
+        records = []
+        for file_records in results:
+            records.extend(file_records)
+        return records
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    main_logger = logging.getLogger('')
+    main_logger.setLevel(logging.DEBUG)
+    char_handler = logging.StreamHandler()
+    char_handler.setLevel(logging.DEBUG)
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    char_handler.setFormatter(formatter)
+    main_logger.addHandler(char_handler)
+
+    from meitrack.gprs_protocol import SAMPLE_FRAMES
+    with ParallelParser(workers=2) as parser:
+        for record in parser.parse(SAMPLE_FRAMES):
+            print(record)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+"""
+Library for simulating a fleet of meitrack devices against a gateway.
+
+Each simulated device holds an asyncio TCP connection to the gateway, sends
+periodic AAA reports from a TrafficGenerator track and answers the commands it
+receives with the replies of its own StubDevice, which serves the photo listing
+once per device. OTA data sent with FC1 is counted until the update is cancelled.
+Latency, frame loss and dropped connections can be added to the device side.
+Frames from one device are delayed in order, as they would be on one TCP
+connection. The turnaround from each reply to the next command from the
+gateway is recorded per command so its percentiles can be reported.
+"""
+import asyncio
+import collections
+import datetime
+import logging
+import math
+import random
+import time
+
+from meitrack.command.date_codec import format_meitrack_date
+from meitrack.common import DIRECTION_SERVER_TO_CLIENT
+from meitrack.generator import DEFAULT_INTERVAL, FIRST_IMEI, TrafficGenerator, encode_frame
+from meitrack.gprs_protocol import StreamFramer, counter_to_identifier
+from meitrack.stub_processor import StubDevice
+
+logger = logging.getLogger(__name__)
+
+# The FC1 payload is the command, a four byte offset and a two byte length ahead of the data
+OTA_DATA_OFFSET = len(b"FC1,") + 6
+PERCENTILES = (50, 90, 99)
+READ_SIZE = 65536
+
+
+def percentiles(samples, points=PERCENTILES):
+    """
+    Function to calculate nearest rank percentiles of a list of samples
+    :param samples: List of numbers
+    :param points: The percentiles to calculate
+    :return: Dictionary of percentile to value, empty if there are no samples
+    >>> percentiles([5, 1, 4, 2, 3])
+    {50: 3, 90: 5, 99: 5}
+    >>> percentiles([])
+    {}
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {point: ordered[max(int(math.ceil(point / 100 * len(ordered))), 1) - 1] for point in points}
+
+
+class DeviceState:
+    """
+    Connection and protocol state of one simulated device.
+    """
+    __slots__ = ("device", "stub", "writer", "outbox", "pending", "ota_bytes")
+
+    def __init__(self, device):
+        """
+        Constructor for the device state
+        :param device: The SimulatedDevice providing the imei and track
+        """
+        self.device = device
+        self.stub = StubDevice(device.imei)
+        self.writer = None
+        # Frames waiting for their send time as (send time, writer, frame), in the order sent
+        self.outbox = collections.deque()
+        # The command answered by the last reply and the time the reply was sent
+        self.pending = None
+        self.ota_bytes = 0
+
+
+class FleetSimulator:
+    """
+    Class to run a fleet of simulated devices against a gateway.
+    """
+    def __init__(
+            self, host, port, devices=100, report_interval=DEFAULT_INTERVAL, latency=0.0, jitter=0.0, loss=0.0,
+            disconnect_rate=0.0, reconnect_delay=1.0, event_mix=None, seed=None, first_imei=FIRST_IMEI
+    ):
+        """
+        Constructor for the fleet simulator
+        :param host: The address of the gateway
+        :param port: The port of the gateway
+        :param devices: The number of devices to simulate
+        :param report_interval: Seconds between AAA reports from each device
+        :param latency: Seconds added before each frame a device sends
+        :param jitter: Largest random number of seconds added on top of the latency
+        :param loss: Probability of a frame sent by a device being dropped
+        :param disconnect_rate: Probability of a device dropping its connection after each report
+        :param reconnect_delay: Seconds a device waits before reconnecting
+        :param event_mix: Dictionary of event code to relative weight of the reports
+        :param seed: Seed for the device tracks, loss and disconnects
+        :param first_imei: The imei of the first device. Devices are numbered on from it.
+        >>> from meitrack.build_message import stc_set_heartbeat_interval
+        >>> from meitrack.gateway import Gateway
+        >>> async def run_fleet():
+        ...     gateway = Gateway()
+        ...     gateway.on_connect = lambda imei: gateway.send(imei, stc_set_heartbeat_interval(imei, 1))
+        ...     server = await gateway.start("127.0.0.1", 0)
+        ...     simulator = FleetSimulator(
+        ...         "127.0.0.1", server.sockets[0].getsockname()[1], devices=5, report_interval=0.1, seed=1
+        ...     )
+        ...     stats = await simulator.run(0.5)
+        ...     await gateway.close()
+        ...     return stats
+        >>> stats = asyncio.run(run_fleet())
+        >>> stats["connections"], stats["commands_received"], stats["replies_sent"], stats["reports_sent"] >= 5
+        (5, 5, 5, True)
+        """
+        self.host = host
+        self.port = port
+        self.report_interval = report_interval
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.disconnect_rate = disconnect_rate
+        self.reconnect_delay = reconnect_delay
+        self.rng = random.Random(seed)
+        self.traffic = TrafficGenerator(
+            devices=devices, hours=0, interval=report_interval, event_mix=event_mix, seed=seed, first_imei=first_imei
+        )
+        self.states = [DeviceState(device) for device in self.traffic.devices]
+        self.counts = collections.Counter()
+        self.turnarounds = {}
+        self.running = False
+
+    async def run(self, duration):
+        """
+        Coroutine to run the fleet for a number of seconds. Device start times are spread over one report interval.
+        :param duration: The seconds to run for
+        :return: The statistics of the run, see stats
+        """
+        self.running = True
+        stagger = min(self.report_interval, duration)
+        tasks = [
+            asyncio.ensure_future(self.run_device(state, self.rng.random() * stagger)) for state in self.states
+        ]
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            self.running = False
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        for state, result in zip(self.states, results):
+            if isinstance(result, Exception) and not isinstance(result, asyncio.CancelledError):
+                logger.error("Device %s stopped: %r", state.device.imei, result)
+        return self.stats()
+
+    async def run_device(self, state, start_delay):
+        """
+        Coroutine to keep one device connected, reconnecting after the connection is lost
+        :param state: The DeviceState of the device
+        :param start_delay: Seconds to wait before the first connection
+        :return: None
+        """
+        await asyncio.sleep(start_delay)
+        while self.running:
+            try:
+                reader, state.writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as err:
+                logger.error("Device %s failed to connect: %s", state.device.imei, err)
+                self.counts["connect_errors"] += 1
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self.counts["connections"] += 1
+            reporter = asyncio.ensure_future(self.report_loop(state))
+            try:
+                await self.read_loop(state, reader)
+            except (OSError, asyncio.IncompleteReadError) as err:
+                logger.error("Device %s lost its connection: %s", state.device.imei, err)
+                self.counts["connection_errors"] += 1
+            finally:
+                reporter.cancel()
+                state.writer.close()
+                state.writer = None
+                state.outbox.clear()
+                state.pending = None
+            if self.running:
+                self.counts["reconnects"] += 1
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def report_loop(self, state):
+        """
+        Coroutine sending AAA reports from a device until its connection is dropped
+        :param state: The DeviceState of the device
+        :return: None
+        """
+        traffic = self.traffic
+        device = state.device
+        while True:
+            device.step(self.report_interval, traffic.rng)
+            device.counter += 1
+            date_time = format_meitrack_date(datetime.datetime.now(datetime.timezone.utc))
+            self.transmit(state, encode_frame(
+                device.imei,
+                traffic.build_payload(device, traffic.choose_event(), date_time),
+                counter_to_identifier(device.counter),
+            ))
+            self.counts["reports_sent"] += 1
+            await asyncio.sleep(self.report_interval)
+            if self.disconnect_rate and self.rng.random() < self.disconnect_rate:
+                logger.log(13, "Device %s dropping its connection", device.imei)
+                self.counts["disconnects"] += 1
+                state.writer.close()
+                return
+
+    async def read_loop(self, state, reader):
+        """
+        Coroutine reading commands for a device until the connection is closed
+        :param state: The DeviceState of the device
+        :param reader: The StreamReader of the connection
+        :return: None
+        """
+        framer = StreamFramer(DIRECTION_SERVER_TO_CLIENT)
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                return
+            for gprs in framer.feed(data):
+                self.handle_command(state, gprs)
+
+    def handle_command(self, state, gprs):
+        """
+        Function to record a command received by a device and send the replies to it
+        :param state: The DeviceState of the device
+        :param gprs: The GPRS command received
+        :return: None
+        """
+        self.counts["commands_received"] += 1
+        if state.pending is not None:
+            answered, sent = state.pending
+            self.turnarounds.setdefault(answered, []).append(time.perf_counter() - sent)
+            state.pending = None
+        request = gprs.leftover
+        replies = self.replies(state, request)
+        if not replies:
+            logger.log(13, "Device %s has no reply to %s", state.device.imei, request)
+            return
+        for reply in replies:
+            self.transmit(state, reply)
+            self.counts["replies_sent"] += 1
+        state.pending = (request[:3], time.perf_counter())
+
+    def replies(self, state, request):
+        """
+        Function to build the replies of a device to a command
+        :param state: The DeviceState of the device
+        :param request: The command and its parameters as bytes
+        :return: List of reply frames as byte strings, empty if the command has no reply
+        """
+        command_type = request[:3]
+        if command_type == b"FC1":
+            state.ota_bytes += len(request) - OTA_DATA_OFFSET
+        elif command_type == b"FC4":
+            state.ota_bytes = 0
+        return state.stub.respond(request) or []
+
+    def transmit(self, state, frame):
+        """
+        Function to send a frame from a device after the configured latency, or drop it.
+
+        A frame is never sent before a frame the device sent earlier, so jitter
+        can hold frames back but does not reorder them.
+        :param state: The DeviceState of the device
+        :param frame: The frame as bytes
+        :return: None
+        """
+        if self.loss and self.rng.random() < self.loss:
+            self.counts["dropped"] += 1
+            return
+        delay = self.latency + self.rng.random() * self.jitter if self.jitter else self.latency
+        if delay <= 0 and not state.outbox:
+            self.write(state.writer, frame)
+            return
+        loop = asyncio.get_running_loop()
+        send_time = loop.time() + delay
+        if state.outbox:
+            send_time = max(send_time, state.outbox[-1][0])
+        else:
+            loop.call_at(send_time, self.flush, state)
+        state.outbox.append((send_time, state.writer, frame))
+
+    def flush(self, state):
+        """
+        Function to write the frames of a device that are due, scheduling the next flush if frames remain
+        :param state: The DeviceState of the device
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        outbox = state.outbox
+        while outbox and outbox[0][0] <= now:
+            _, writer, frame = outbox.popleft()
+            self.write(writer, frame)
+        if outbox:
+            loop.call_at(outbox[0][0], self.flush, state)
+
+    @staticmethod
+    def write(writer, frame):
+        """
+        Function to write a frame unless the connection it was sent on has closed
+        :param writer: The StreamWriter of the connection
+        :param frame: The frame as bytes
+        :return: None
+        """
+        if writer is not None and not writer.is_closing():
+            writer.write(frame)
+
+    def stats(self):
+        """
+        Function to summarise the counts and gateway turnaround of the run.
+
+        The turnaround of a command is the time from the device handing its reply
+        to the next command arriving from the gateway. It covers the simulated
+        latency of the reply and the time the gateway takes to send its next
+        command, so it is not a network round trip.
+        :return: Dictionary of counts, with turnaround holding the count, percentiles and max in seconds per command
+        """
+        stats = {name: self.counts[name] for name in (
+            "connections", "reconnects", "disconnects", "connect_errors", "connection_errors", "reports_sent",
+            "commands_received", "replies_sent", "dropped",
+        )}
+        stats["ota_bytes"] = sum(state.ota_bytes for state in self.states)
+        turnaround = {}
+        for command_type, samples in sorted(self.turnarounds.items()):
+            summary = {"count": len(samples), "max": max(samples)}
+            for point, value in percentiles(samples).items():
+                summary["p%d" % (point,)] = value
+            turnaround[command_type.decode()] = summary
+        stats["turnaround"] = turnaround
+        return stats
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    main_logger = logging.getLogger('')
+    main_logger.setLevel(logging.INFO)
+    char_handler = logging.StreamHandler()
+    char_handler.setLevel(logging.INFO)
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    char_handler.setFormatter(formatter)
+    main_logger.addHandler(char_handler)
+
+    from meitrack.build_message import stc_request_device_info, stc_request_get_file, stc_request_photo_list
+    from meitrack.firmware_update import stc_auth_ota_update, stc_cancel_ota_update, stc_obtain_ota_checksum
+    from meitrack.firmware_update import stc_send_ota_data, stc_start_ota_update
+    from meitrack.gateway import Gateway
+
+    firmware = bytes(range(256)) * 8
+    scripts = {}
+
+    def handshake(imei):
+        # The commands sent to each device, each one after the reply to the one before
+        return iter([
+            stc_request_device_info(imei),
+            stc_request_photo_list(imei),
+            stc_request_get_file(imei, b"180520032140_C1E1_N4U1D1.jpg"),
+            stc_auth_ota_update(imei),
+        ] + stc_send_ota_data(imei, firmware, 512) + [
+            stc_obtain_ota_checksum(imei, 0, len(firmware)),
+            stc_start_ota_update(imei),
+            stc_cancel_ota_update(imei),
+        ])
+
+    async def run():
+        gateway = Gateway()
+
+        def on_connect(imei):
+            scripts[imei] = handshake(imei)
+            gateway.send(imei, next(scripts[imei]))
+
+        def on_frame(imei, gprs):
+            if gprs.command_type != b"AAA":
+                message = next(scripts[imei], None)
+                if message is not None:
+                    gateway.send(imei, message)
+
+        gateway.on_connect = on_connect
+        gateway.on_frame = on_frame
+        server = await gateway.start("127.0.0.1", 0)
+        simulator = FleetSimulator(
+            "127.0.0.1", server.sockets[0].getsockname()[1], devices=200, report_interval=1,
+            latency=0.01, jitter=0.02, loss=0.01, disconnect_rate=0.01, reconnect_delay=0.5, seed=1,
+        )
+        stats = await simulator.run(5)
+        await gateway.close()
+        return stats
+
+    stats = asyncio.run(run())
+    for name, value in stats.items():
+        if name != "turnaround":
+            print("{:<18} {}".format(name, value))
+    for command_type, summary in stats["turnaround"].items():
+        print("{} {:>6} replies  p50 {:.4f}  p90 {:.4f}  p99 {:.4f}  max {:.4f}".format(
+            command_type, summary["count"], summary["p50"], summary["p90"], summary["p99"], summary["max"]
+        ))
+
+
+if __name__ == '__main__':
+    main()
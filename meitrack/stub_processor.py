@@ -6,6 +6,8 @@ import binascii
 import logging
 
 from meitrack.build_message import cts_build_file_list
+from meitrack.command_template import CommandTemplate, template_for
+from meitrack.common import s2b
 from meitrack.gprs_protocol import GPRS
 
 
@@ -187,49 +189,111 @@ class NotMyIMEIError(Exception):
     pass
 
 
+def build_response_index(request_to_response_map):
+    """
+    Function to index canned replies by the command code of the request
+    :param request_to_response_map: Dictionary of request prefix to reply frame
+    :return: Dictionary of command code to a tuple of (request prefix, reply template) in the order of the map
+    >>> index = build_response_index({
+    ...     b'A15,6': b'$$E28,353358017784062,A15,OK*F4\\r\\n', b'A15': b'$$F24,1,A15,1*00\\r\\n'
+    ... })
+    >>> [(request_prefix, template.render(b'0407')) for request_prefix, template in index[b'A15']]
+    [(b'A15,6', b'$$E17,0407,A15,OK*AF\\r\\n'), (b'A15', b'$$F16,0407,A15,1*46\\r\\n')]
+    """
+    index = {}
+    for request_prefix, reply in request_to_response_map.items():
+        index.setdefault(request_prefix[:3], []).append(
+            (request_prefix, CommandTemplate.from_gprs(GPRS(reply)))
+        )
+    return {command_type: tuple(replies) for command_type, replies in index.items()}
+
+
+RESPONSE_INDEX = build_response_index(REQUEST_TO_RESPONSE)
+FILE_LISTING_TEMPLATES = tuple(CommandTemplate.from_gprs(GPRS(segment)) for segment in file_listing)
+# The file sent in reply to every D00 download request
+IMAGE_BYTES = binascii.unhexlify(
+    "FFD8FFE000104A46494600010101004800480000"
+    "FFDB004300FFFFFFFFFFFFFFFFFFFFFFFFFFFFFF"
+    "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF"
+    "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF"
+    "FFFFFFFFFFFFFFFFFFFFC2000B08000100010101"
+    "1100FFC400141001000000000000000000000000"
+    "00000000FFDA0008010100013F10"
+)
+
+
+class StubDevice:
+    """
+    Class answering requests for one simulated device.
+
+    Canned replies are parsed once at import and only the imei, length and
+    checksum are built for each reply. The photo listing still to be sent is
+    held per device, so many devices can be stubbed in one process.
+    """
+    __slots__ = ("imei", "file_listing")
+
+    def __init__(self, imei, file_listing=FILE_LISTING_TEMPLATES):
+        """
+        Constructor for the stub device
+        :param imei: The imei to use in the responses
+        :param file_listing: Tuple of CommandTemplate objects sent in reply to the first photo list request
+        """
+        self.imei = s2b(imei)
+        self.file_listing = file_listing
+
+    def respond(self, request_command, imei=None):
+        """
+        Function to convert a request into the fixed response frames
+        :param request_command: The command and its parameters from the headend
+        :param imei: The imei to use in the response. Defaults to the imei of the device.
+        :return: List of response frames as byte strings, or None if the request has no response
+        >>> device = StubDevice(b'0407')
+        >>> device.respond(b'A11,1')
+        [b'$$S17,0407,A11,OK*B9\\r\\n']
+        >>> len(device.respond(b'D01,0')), device.respond(b'D01,0')
+        (1, [])
+        >>> device.respond(b'D00,180514120246_C1E1_N5U1D1.jpg,0')[0][:38]
+        b'$$A182,0407,D00,180514120246_C1E1_N5U1'
+        >>> device.respond(b'Z99,1') is None
+        True
+        """
+        if imei is None:
+            imei = self.imei
+        if request_command == b'D01,0':
+            listing = [template.render(imei) for template in self.file_listing]
+            # Reset file list so we only send once
+            self.file_listing = ()
+            return listing
+        if request_command[0:3] == b'D00':
+            file_name = request_command.split(b",")[1]
+            return [
+                template.render(imei) for template in template_for(cts_build_file_list, file_name, IMAGE_BYTES)
+            ]
+        for request_prefix, template in RESPONSE_INDEX.get(bytes(request_command[0:3]), ()):
+            if request_command.startswith(request_prefix):
+                return [template.render(imei)]
+        return None
+
+
+shared_device = StubDevice(b"")
+
+
 def request_to_response(request_command, imei):
     """
-    Function to convert an incoming gprs message into a fixed response message
+    Function to convert an incoming gprs message into a fixed response message.
+
+    Kept for existing callers. All callers share one StubDevice, so the photo
+    listing is only sent once per process. Use a StubDevice per device instead.
     :param request_command: The incoming message from the headend
     :param imei: The imei to use in the response
     :return: gprs message to send back to the headend
+    >>> [gprs.as_bytes() for gprs in request_to_response(b'A12,1', b'0407')]
+    [b'$$V17,0407,A12,OK*BD\\r\\n']
     """
-    global file_listing
-    if request_command == b'D01,0':
-        file_list_arr = []
-        for segment in file_listing:
-            gprs = GPRS(segment)
-            gprs.imei = imei
-            file_list_arr.append(gprs)
-        # Reset file list so we only send once
-        file_listing = []
-        return file_list_arr
-    if request_command[0:3] == b'D00':
-        print("Request command is %s", request_command)
-        detail_list = request_command.split(b",")
-        file_name = detail_list[1]
-        start_packet = detail_list[2]
-        # file_name, num_packets, packet_number, file_bytes = gprs.enclosed_data.get_file_data()
-        image_as_bytes = binascii.unhexlify(
-            "FFD8FFE000104A46494600010101004800480000"
-            "FFDB004300FFFFFFFFFFFFFFFFFFFFFFFFFFFFFF"
-            "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF"
-            "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF"
-            "FFFFFFFFFFFFFFFFFFFFC2000B08000100010101"
-            "1100FFC400141001000000000000000000000000"
-            "00000000FFDA0008010100013F10"
-        )
-        response = cts_build_file_list(imei, file_name, image_as_bytes)
-        return response
-
-    for key in REQUEST_TO_RESPONSE:
-        command_length = len(key)
-        if request_command[0:command_length] == key:
-            return_gprs = GPRS(REQUEST_TO_RESPONSE[key])
-            return_gprs.imei = imei
-            print(return_gprs)
-            return [return_gprs]
-    return None
+    responses = shared_device.respond(request_command, s2b(imei))
+    if responses is None:
+        return None
+    return [GPRS(response) for response in responses]
 
 
 def main():
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Library of trace hooks for the parse and encode paths.
+
+Hooks are attached to named hook points and are called with the objects at
+that point of the parse. Call sites check tracer.enabled before building any
+arguments, so with no hooks attached tracing costs one attribute check and
+nothing is formatted.
+"""
+import contextlib
+import logging
+
+from meitrack.error import GPRSParameterError
+
+logger = logging.getLogger(__name__)
+
+# Called with the buffer and the start and end offsets of a frame
+FRAME_FOUND = "frame_found"
+# Called with the direction, command type and payload before building a command object
+DISPATCH = "dispatch"
+# Called with the schema label, the payload and the parsed field values
+FIELD_SPLIT = "field_split"
+# Called with the raw date and the converted datetime
+DATE_PARSE = "date_parse"
+# Called with the object being encoded and the encoded bytes
+ENCODE = "encode"
+HOOK_POINTS = (FRAME_FOUND, DISPATCH, FIELD_SPLIT, DATE_PARSE, ENCODE)
+TRACE_LOG_LEVEL = 13
+
+
+class Tracer:
+    """
+    Registry of the hooks attached to each hook point.
+    """
+    __slots__ = ("enabled", "hooks")
+
+    def __init__(self):
+        """
+        Constructor for the tracer
+        >>> events = []
+        >>> local_tracer = Tracer()
+        >>> local_tracer.enabled
+        False
+        >>> local_tracer.attach(DISPATCH, lambda *args: events.append(args))
+        >>> local_tracer.enabled
+        True
+        >>> local_tracer.emit(DISPATCH, 1, b"A10", b"A10"); local_tracer.emit(ENCODE, None, b"")
+        >>> events
+        [(1, b'A10', b'A10')]
+        """
+        self.enabled = False
+        self.hooks = {point: [] for point in HOOK_POINTS}
+
+    def attach(self, point, hook):
+        """
+        Function to attach a hook to a hook point
+        :param point: The name of the hook point
+        :param hook: Callable taking the arguments of the hook point
+        :return: None
+        >>> Tracer().attach("frame_lost", print)
+        Traceback (most recent call last):
+            ...
+        meitrack.error.GPRSParameterError: Unknown hook point frame_lost
+        """
+        if point not in self.hooks:
+            raise GPRSParameterError("Unknown hook point %s" % (point,))
+        self.hooks[point].append(hook)
+        self.enabled = True
+
+    def detach(self, point, hook):
+        """
+        Function to detach a hook from a hook point. Tracing is disabled once no hooks are left.
+        :param point: The name of the hook point
+        :param hook: The callable passed to attach
+        :return: None
+        """
+        if hook in self.hooks.get(point, []):
+            self.hooks[point].remove(hook)
+        self.enabled = any(self.hooks.values())
+
+    def clear(self):
+        """
+        Function to detach every hook
+        :return: None
+        """
+        for hooks in self.hooks.values():
+            hooks.clear()
+        self.enabled = False
+
+    def emit(self, point, *args):
+        """
+        Function to call the hooks attached to a hook point
+        :param point: The name of the hook point
+        :param args: The arguments of the hook point
+        :return: None
+        """
+        for hook in self.hooks[point]:
+            hook(*args)
+
+    @contextlib.contextmanager
+    def attached(self, point, hook):
+        """
+        Context manager attaching a hook for the duration of a block
+        :param point: The name of the hook point
+        :param hook: Callable taking the arguments of the hook point
+        :return: The hook
+        >>> from meitrack.command.date_codec import parse_meitrack_date
+        >>> dates = []
+        >>> with tracer.attached(DATE_PARSE, lambda raw, parsed: dates.append(raw)):
+        ...     parsed = parse_meitrack_date(b'180323023615')
+        >>> dates, tracer.enabled
+        ([b'180323023615'], False)
+        """
+        self.attach(point, hook)
+        try:
+            yield hook
+        finally:
+            self.detach(point, hook)
+
+
+tracer = Tracer()
+
+
+def log_hook(point, level=TRACE_LOG_LEVEL):
+    """
+    Function to build a hook logging the arguments of a hook point
+    :param point: The name of the hook point
+    :param level: The log level to log at
+    :return: Callable to attach to the hook point
+    """
+    def hook(*args):
+        if logger.isEnabledFor(level):
+            logger.log(level, "%s: %s", point, args)
+    return hook
+
+
+def attach_logging(points=HOOK_POINTS, level=TRACE_LOG_LEVEL):
+    """
+    Function to log the arguments of hook points through the module logger
+    :param points: The names of the hook points to log
+    :param level: The log level to log at
+    :return: Dictionary of hook point to the attached hook, for passing to detach_hooks
+    """
+    hooks = {}
+    for point in points:
+        hooks[point] = log_hook(point, level)
+        tracer.attach(point, hooks[point])
+    return hooks
+
+
+def detach_hooks(hooks):
+    """
+    Function to detach hooks returned by attach_logging
+    :param hooks: Dictionary of hook point to hook
+    :return: None
+    """
+    for point, hook in hooks.items():
+        tracer.detach(point, hook)
+
+
+def main():
+    """
+    Main section for running interactive testing.
+    """
+    main_logger = logging.getLogger('')
+    main_logger.setLevel(logging.DEBUG)
+    char_handler = logging.StreamHandler()
+    char_handler.setLevel(logging.DEBUG)
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    char_handler.setFormatter(formatter)
+    main_logger.addHandler(char_handler)
+
+    from meitrack.gprs_protocol import SAMPLE_FRAMES, parse_many
+
+    hooks = attach_logging()
+    for gprs in parse_many(b"".join(SAMPLE_FRAMES[:2])):
+        gprs.enclosed_data
+        gprs.as_bytes()
+    detach_hooks(hooks)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,8 @@ setup(
     packages=find_packages(),
     scripts=[
         'scripts/mtparse',
+        'scripts/mtbench',
+        'scripts/mtgen',
     ],
     install_requires=[
         'licenseparser',